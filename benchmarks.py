@@ -0,0 +1,986 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks do Sistema de Formulário DIU
+Mede o desempenho das operações do banco de dados com dados sintéticos
+
+Uso:
+    python3 benchmarks.py busca --registros 1000000
+    python3 benchmarks.py concorrencia --leitores 4 --segundos 10
+    python3 benchmarks.py planos --db formulario_diu.db
+    python3 benchmarks.py paginacao --registros 200000
+    python3 benchmarks.py servidor --clientes 16 --segundos 10
+    python3 benchmarks.py duplicados --registros 200000
+    python3 benchmarks.py cifragem --registros 100000
+    python3 benchmarks.py backup --registros 200000
+    python3 benchmarks.py suite --registros 100000 --salvar baseline.json
+    python3 benchmarks.py suite --registros 100000 --comparar baseline.json
+"""
+
+import argparse
+import collections
+import contextlib
+import csv
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import sys
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+from formulario_diu import (CAMPOS, COLUNAS_GRAVADAS, CONFIGURACAO_PADRAO, FORMULARIO, SQL_INSERIR_PACIENTE,
+                            FormularioDIU, RegistroPaciente, ServidorDIU, campo_aplicavel, formatar_data,
+                            normalizar_texto)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+PRIMEIROS_NOMES = [
+    'Ana', 'Maria', 'Júlia', 'Letícia', 'Fernanda', 'Patrícia', 'Luíza', 'Beatriz',
+    'Camila', 'Débora', 'Érica', 'Gabriela', 'Helena', 'Íris', 'Jéssica', 'Larissa',
+    'Márcia', 'Natália', 'Otávia', 'Priscila', 'Raquel', 'Sônia', 'Tânia', 'Vitória',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Costa',
+    'Rodrigues', 'Almeida', 'Nascimento', 'Araújo', 'Gonçalves', 'Conceição', 'Ribeiro',
+    'Simões', 'Magalhães', 'Brandão', 'Assunção', 'Conceição', 'Falcão', 'Gusmão',
+]
+
+
+def gerar_nome(rng):
+    """Gera um nome completo aleatório com acentuação realista"""
+    partes = [rng.choice(PRIMEIROS_NOMES)]
+    if rng.random() < 0.5:
+        partes.append(rng.choice(PRIMEIROS_NOMES))
+    partes.extend(rng.choice(SOBRENOMES) for _ in range(rng.randint(1, 3)))
+    return ' '.join(partes)
+
+
+def popular_nomes(app, quantidade, semente=42, tamanho_lote=10000):
+    """Insere registros contendo apenas o nome, em lotes"""
+    rng = random.Random(semente)
+    inseridos = 0
+    while inseridos < quantidade:
+        lote = [gerar_nome(rng) for _ in range(min(tamanho_lote, quantidade - inseridos))]
+        app.cursor.executemany(
+            "INSERT INTO pacientes (nome_completo, nome_normalizado) VALUES (?, ?)",
+            [(nome, normalizar_texto(nome)) for nome in lote]
+        )
+        app.conn.commit()
+        inseridos += len(lote)
+
+
+LOCAIS = ['UBS Centro', 'UBS Norte', 'UBS Sul', 'Hospital Universitário', 'Policlínica']
+DIUS = ['TCU', 'Levonorgestrel']
+
+
+def popular_registros(app, quantidade, semente=42, tamanho_lote=10000):
+    """Insere registros com nome, local, DIU e datas de inserção/revisão, em lotes"""
+    rng = random.Random(semente)
+    inicio = date(2018, 1, 1)
+    inseridos = 0
+    while inseridos < quantidade:
+        lote = []
+        for _ in range(min(tamanho_lote, quantidade - inseridos)):
+            nome = gerar_nome(rng)
+            insercao = inicio + timedelta(days=rng.randint(0, 3000))
+            lote.append((nome, normalizar_texto(nome), rng.choice(LOCAIS), rng.choice(DIUS),
+                         insercao.isoformat(), (insercao + timedelta(days=rng.randint(30, 45))).isoformat()))
+        app.cursor.executemany('''
+            INSERT INTO pacientes (nome_completo, nome_normalizado, local_atendimento, diu_escolhido,
+                                   data_insercao, data_primeira_revisao)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', lote)
+        app.conn.commit()
+        inseridos += len(lote)
+
+
+def medir(funcao, repeticoes):
+    """Executa a função várias vezes e retorna as latências em milissegundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def percentis(tempos):
+    """Resume latências em percentis, máximo e média (milissegundos)"""
+    ordenados = sorted(tempos)
+    
+    def percentil(fracao):
+        return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fracao))]
+    
+    return {
+        'p50_ms': statistics.median(ordenados),
+        'p90_ms': percentil(0.90),
+        'p99_ms': percentil(0.99),
+        'max_ms': ordenados[-1],
+        'media_ms': statistics.mean(ordenados),
+    }
+
+
+def resumo(tempos):
+    """Resume latências em mediana, p99 e média"""
+    ordenados = sorted(tempos)
+    p99 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.99))]
+    return f"p50={statistics.median(ordenados):.3f}ms p99={p99:.3f}ms média={statistics.mean(ordenados):.3f}ms"
+
+
+def benchmark_busca(registros, consultas, semente=42):
+    """Compara a busca indexada com a busca antiga por LIKE '%nome%'"""
+    with tempfile.TemporaryDirectory() as pasta:
+        app = FormularioDIU(os.path.join(pasta, 'benchmark.db'))
+        
+        inicio = time.perf_counter()
+        popular_nomes(app, registros, semente)
+        print(f"{registros} registros inseridos em {time.perf_counter() - inicio:.1f}s")
+        
+        rng = random.Random(semente + 1)
+        # Como no balcão: início do primeiro nome e de um sobrenome
+        termos = [
+            f"{rng.choice(PRIMEIROS_NOMES)[:rng.randint(3, 6)]} {rng.choice(SOBRENOMES)[:rng.randint(3, 6)]}"
+            for _ in range(consultas)
+        ]
+        termos_iter = iter(termos * 2)
+        
+        def busca_like():
+            primeiro, sobrenome = next(termos_iter).split()
+            app.cursor.execute('''
+                SELECT id, nome_completo, data_nascimento, telefone, cpf, data_insercao
+                FROM pacientes
+                WHERE nome_completo LIKE ? AND nome_completo LIKE ?
+                ORDER BY nome_completo
+                LIMIT 100
+            ''', (f'%{primeiro}%', f'%{sobrenome}%'))
+            app.cursor.fetchall()
+        
+        def busca_indexada():
+            app.buscar_por_nome(next(termos_iter))
+        
+        print(f"LIKE '%nome%':  {resumo(medir(busca_like, consultas))}")
+        print(f"Busca indexada: {resumo(medir(busca_indexada, consultas))}")
+        app.conn.close()
+
+
+# Configuração equivalente à conexão original (journal em modo DELETE, sem pool)
+CONFIGURACAO_ORIGINAL = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 5000,
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'leitores': 0,
+}
+
+
+def processo_escritor(db_name, configuracao, segundos, resultados):
+    """Insere registros um a um, com commit, como um terminal de recepção"""
+    rng = random.Random(os.getpid())
+    tempos, erros = {'insercao': []}, 0
+    try:
+        app = FormularioDIU(db_name, configuracao)
+    except sqlite3.OperationalError:
+        resultados.put((tempos, 1))
+        return
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        nome = gerar_nome(rng)
+        inicio = time.perf_counter()
+        try:
+            app.cursor.execute(
+                "INSERT INTO pacientes (nome_completo, nome_normalizado) VALUES (?, ?)",
+                (nome, normalizar_texto(nome))
+            )
+            app.conn.commit()
+            tempos['insercao'].append((time.perf_counter() - inicio) * 1000)
+        except sqlite3.OperationalError:
+            app.conn.rollback()
+            erros += 1
+    resultados.put((tempos, erros))
+
+
+def processo_leitor(db_name, configuracao, segundos, resultados):
+    """Alterna buscas por nome e exportações, como os demais terminais"""
+    rng = random.Random(os.getpid())
+    tempos, erros = {'busca': [], 'exportacao': []}, 0
+    try:
+        app = FormularioDIU(db_name, configuracao)
+    except sqlite3.OperationalError:
+        resultados.put((tempos, 1))
+        return
+    destino = os.path.join(os.path.dirname(db_name), f'export_{os.getpid()}.csv')
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        operacao = 'exportacao' if rng.random() < 0.05 else 'busca'
+        inicio = time.perf_counter()
+        try:
+            if operacao == 'exportacao':
+                app.exportar_registros(destino)
+            else:
+                app.buscar_por_nome(rng.choice(SOBRENOMES))
+            tempos[operacao].append((time.perf_counter() - inicio) * 1000)
+        except sqlite3.OperationalError:
+            erros += 1
+    resultados.put((tempos, erros))
+
+
+def benchmark_concorrencia(registros, leitores, segundos):
+    """Compara a configuração original com a padrão (WAL + pool) sob disputa
+    
+    Um processo escritor grava continuamente enquanto outros processos
+    buscam e exportam no mesmo arquivo.
+    """
+    for nome, configuracao in (('original', CONFIGURACAO_ORIGINAL), ('WAL + pool', CONFIGURACAO_PADRAO)):
+        with tempfile.TemporaryDirectory() as pasta:
+            db_name = os.path.join(pasta, 'benchmark.db')
+            app = FormularioDIU(db_name, configuracao)
+            popular_nomes(app, registros)
+            app.conn.close()
+            
+            resultados = multiprocessing.Queue()
+            processos = [multiprocessing.Process(target=processo_escritor,
+                                                 args=(db_name, configuracao, segundos, resultados))]
+            processos += [multiprocessing.Process(target=processo_leitor,
+                                                  args=(db_name, configuracao, segundos, resultados))
+                          for _ in range(leitores)]
+            for processo in processos:
+                processo.start()
+            coletados = [resultados.get() for _ in processos]
+            for processo in processos:
+                processo.join()
+            
+            erros = sum(e for _, e in coletados)
+            print(f"\n[{nome}] {erros} erro(s) 'database is locked'")
+            for operacao in ('insercao', 'busca', 'exportacao'):
+                tempos = [t for ts, _ in coletados for t in ts.get(operacao, [])]
+                if tempos:
+                    print(f"{operacao}: {len(tempos)} operações, {resumo(tempos)}")
+                else:
+                    print(f"{operacao}: nenhuma operação concluída")
+
+
+def verificar_planos(db_name=None, registros=10000):
+    """Falha (código de saída 1) se alguma consulta crítica fizer varredura completa
+    
+    Sem db_name, verifica um banco temporário recém-criado com dados sintéticos.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        if db_name is None:
+            db_name = os.path.join(pasta, 'benchmark.db')
+            app = FormularioDIU(db_name)
+            popular_nomes(app, registros)
+            app.cursor.execute("ANALYZE")
+        else:
+            app = FormularioDIU(db_name)
+        
+        problemas = app.verificar_planos_consulta()
+        app.conn.close()
+    
+    for descricao, plano in problemas:
+        print(f"✗ {descricao}: {' / '.join(plano)}")
+    if problemas:
+        sys.exit(1)
+    print("✓ Todas as consultas críticas usam índice.")
+
+
+def benchmark_paginacao(registros, paginas, limite=10):
+    """Compara a latência por página da paginação por chave com LIMIT/OFFSET
+    
+    Percorre as páginas em sequência e mede páginas em profundidades
+    crescentes (1, 10, 100, ...), nas duas ordens de navegação.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        app = FormularioDIU(os.path.join(pasta, 'benchmark.db'))
+        popular_registros(app, registros)
+        
+        profundidades = []
+        pagina = 1
+        while pagina <= paginas:
+            profundidades.append(pagina)
+            pagina *= 10
+        
+        for ordem, filtros in (('id', {}), ('data_insercao', {'local_atendimento': LOCAIS[0]})):
+            print(f"\n[ordem={ordem} filtros={filtros or 'nenhum'}]")
+            tempos_chave = {}
+            registros_pagina = None
+            for pagina in range(1, profundidades[-1] + 1):
+                apos = app.chave_registro(registros_pagina[-1], ordem) if registros_pagina else None
+                inicio = time.perf_counter()
+                registros_pagina = app.paginar_registros(ordem, apos=apos, limite=limite, **filtros)
+                if pagina in profundidades:
+                    tempos_chave[pagina] = (time.perf_counter() - inicio) * 1000
+                if not registros_pagina:
+                    break
+            
+            ordenacao = "id DESC" if ordem == 'id' else "data_insercao DESC, id DESC"
+            where = "WHERE local_atendimento = ?" if filtros else ""
+            for pagina, tempo in tempos_chave.items():
+                tempos_offset = medir(lambda: app.cursor.execute(
+                    f"SELECT * FROM pacientes {where} ORDER BY {ordenacao} LIMIT ? OFFSET ?",
+                    list(filtros.values()) + [limite, (pagina - 1) * limite]
+                ).fetchall(), 3)
+                print(f"página {pagina:>6}: chave={tempo:.3f}ms  offset={statistics.median(tempos_offset):.3f}ms")
+        app.conn.close()
+
+
+def cliente_http(porta, registros, segundos, semente, tempos, erros):
+    """Mistura de buscas, detalhes e inserções até o tempo acabar"""
+    rng = random.Random(semente)
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        sorteio = rng.random()
+        if sorteio < 0.5:
+            rota, metodo, corpo = 'busca', 'GET', None
+            caminho = f"/registros?nome={quote(gerar_nome(rng).split()[0])}&limite=20"
+        elif sorteio < 0.9:
+            rota, metodo, corpo = 'detalhes', 'GET', None
+            caminho = f"/registros/{rng.randint(1, registros)}"
+        else:
+            rota, metodo, caminho = 'inserir', 'POST', '/registros'
+            corpo = json.dumps({'nome_completo': gerar_nome(rng), 'local_atendimento': rng.choice(LOCAIS)})
+        
+        inicio = time.perf_counter()
+        try:
+            conexao.request(metodo, caminho, body=corpo, headers={'Content-Type': 'application/json'})
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status >= 400:
+                erros.append(f"{rota}: HTTP {resposta.status}")
+        except (OSError, http.client.HTTPException) as erro:
+            erros.append(f"{rota}: {erro}")
+            conexao.close()
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+            continue
+        tempos[rota].append((time.perf_counter() - inicio) * 1000)
+    conexao.close()
+
+
+def benchmark_servidor(registros, clientes, segundos, threads=8):
+    """Teste de carga do servidor HTTP com vários clientes simultâneos"""
+    with tempfile.TemporaryDirectory() as pasta:
+        app = FormularioDIU(os.path.join(pasta, 'benchmark.db'))
+        popular_registros(app, registros)
+        
+        servidor = ServidorDIU(('127.0.0.1', 0), app, threads, silencioso=True)
+        porta = servidor.server_address[1]
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        
+        tempos = {'busca': [], 'detalhes': [], 'inserir': []}
+        erros = []
+        threads_clientes = [threading.Thread(target=cliente_http,
+                                             args=(porta, registros, segundos, semente, tempos, erros))
+                            for semente in range(clientes)]
+        for thread in threads_clientes:
+            thread.start()
+        for thread in threads_clientes:
+            thread.join()
+        servidor.shutdown()
+        servidor.server_close()
+        
+        total = sum(len(lista) for lista in tempos.values())
+        print(f"\n[{clientes} clientes, {threads} threads no servidor, {segundos}s]")
+        print(f"{total / segundos:.0f} requisições/s, {len(erros)} erros")
+        for rota, lista in tempos.items():
+            if lista:
+                print(f"{rota:>9}: {len(lista):>6} requisições  {resumo(lista)}")
+        for erro in sorted(set(erros))[:5]:
+            print(f"  erro: {erro}")
+
+
+def variar_nome(rng, nome):
+    """Simula um erro de digitação: troca, remove ou duplica uma letra"""
+    i = rng.randrange(1, len(nome) - 1)
+    operacao = rng.choice(('trocar', 'remover', 'duplicar'))
+    if operacao == 'trocar':
+        return nome[:i] + nome[i + 1] + nome[i] + nome[i + 2:]
+    if operacao == 'remover':
+        return nome[:i] + nome[i + 1:]
+    return nome[:i] + nome[i] + nome[i:]
+
+
+def benchmark_duplicados(registros, fracao=0.02, consultas=2000, semente=42):
+    """Mede a verificação de duplicidade na inserção e o agrupamento em lote
+    
+    Uma fração dos registros é gravada de novo com o CPF pontuado de outro
+    jeito, com o SUS com espaços ou com um erro de digitação no nome (mesma
+    data de nascimento); o agrupamento deve reunir cada cópia à original.
+    """
+    rng = random.Random(semente)
+    with tempfile.TemporaryDirectory() as pasta:
+        app = FormularioDIU(os.path.join(pasta, 'benchmark.db'))
+        originais = []
+        lote = []
+        for id_registro in range(1, registros + 1):
+            nascimento = date(1970, 1, 1) + timedelta(days=rng.randint(0, 14600))
+            registro = RegistroPaciente(nome_completo=gerar_nome(rng), data_nascimento=nascimento.isoformat())
+            if rng.random() < 0.7:
+                registro.cpf = f"{rng.randrange(10 ** 11):011d}"
+            if rng.random() < 0.5:
+                registro.sus = f"{rng.randrange(10 ** 15):015d}"
+            originais.append(registro)
+            lote.append(registro.valores_insercao())
+        
+        copias = []
+        for id_original in rng.sample(range(1, registros + 1), int(registros * fracao)):
+            original = originais[id_original - 1]
+            copia = RegistroPaciente(nome_completo=original.nome_completo,
+                                     data_nascimento=original.data_nascimento)
+            if original.cpf and rng.random() < 0.4:
+                cpf = original.cpf
+                copia.cpf = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+            elif original.sus and rng.random() < 0.5:
+                copia.sus = ' '.join(original.sus[i:i + 4] for i in range(0, 15, 4))
+            else:
+                copia.nome_completo = variar_nome(rng, original.nome_completo)
+            copias.append((id_original, registros + len(copias) + 1))
+            lote.append(copia.valores_insercao())
+        
+        for inicio in range(0, len(lote), 10000):
+            app.cursor.executemany(SQL_INSERIR_PACIENTE, lote[inicio:inicio + 10000])
+            app.conn.commit()
+        print(f"{registros} registros + {len(copias)} cópias com variações")
+        
+        amostra = [originais[rng.randrange(registros)] for _ in range(consultas)]
+        tempos = medir(lambda: app.possiveis_duplicados(amostra[rng.randrange(consultas)]), consultas)
+        print(f"verificação na inserção: {resumo(tempos)}")
+        
+        inicio = time.perf_counter()
+        grupos = app.agrupar_duplicados()
+        segundos = time.perf_counter() - inicio
+        grupo_de = {id_registro: numero for numero, grupo in enumerate(grupos) for id_registro in grupo}
+        encontrados = sum(1 for original, copia in copias
+                          if original in grupo_de and grupo_de.get(copia) == grupo_de[original])
+        print(f"agrupamento em lote: {segundos:.2f}s, {len(grupos)} grupos, "
+              f"{encontrados}/{len(copias)} cópias reunidas à original ({encontrados / len(copias):.1%})")
+        app.conn.close()
+
+
+def gerar_registro(rng):
+    """Gera um registro com os campos identificadores e alguns campos clínicos"""
+    insercao = date(2018, 1, 1) + timedelta(days=rng.randint(0, 3000))
+    registro = RegistroPaciente(
+        nome_completo=gerar_nome(rng),
+        data_nascimento=(date(1970, 1, 1) + timedelta(days=rng.randint(0, 14600))).isoformat(),
+        telefone=f"(11) 9{rng.randrange(10 ** 8):08d}",
+        cpf=f"{rng.randrange(10 ** 11):011d}",
+        endereco=f"Rua {rng.choice(SOBRENOMES)}, {rng.randint(1, 2000)}",
+        local_atendimento=rng.choice(LOCAIS),
+        diu_escolhido=rng.choice(DIUS),
+        data_insercao=insercao.isoformat(),
+        hiv_aids=rng.choice('sn'),
+        gesta=rng.randint(0, 5),
+    )
+    if rng.random() < 0.5:
+        registro.sus = f"{rng.randrange(10 ** 15):015d}"
+    return registro
+
+
+def benchmark_cifragem(registros, consultas=1000, semente=42):
+    """Compara carga, inserção, busca e exportação com e sem cifragem dos campos identificadores
+    
+    Os dois bancos recebem os mesmos registros; no segundo a cifragem é
+    ativada antes da carga. A exportação escreve o CSV completo em
+    os.devnull, para medir a leitura e a decifragem e não o disco.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        medidas = {}
+        for modo in ('texto', 'cifrado'):
+            app = FormularioDIU(os.path.join(pasta, f'{modo}.db'), chave='')
+            if modo == 'cifrado':
+                app.ativar_cifragem('senha do benchmark')
+            rng = random.Random(semente)
+            amostra = [gerar_registro(rng) for _ in range(registros)]
+            
+            inicio = time.perf_counter()
+            for i in range(0, registros, 10000):
+                app.cursor.executemany(SQL_INSERIR_PACIENTE, [registro.valores_insercao(app.cifra)
+                                                              for registro in amostra[i:i + 10000]])
+                app.conn.commit()
+            carga = registros / (time.perf_counter() - inicio)
+            
+            novos = iter([gerar_registro(rng) for _ in range(consultas)])
+            insercao = medir(lambda: app.inserir_registro(next(novos)), consultas)
+            
+            rng_consulta = random.Random(semente + 1)
+            termos = [
+                f"{rng_consulta.choice(PRIMEIROS_NOMES)[:rng_consulta.randint(3, 6)]} "
+                f"{rng_consulta.choice(SOBRENOMES)[:rng_consulta.randint(3, 6)]}"
+                for _ in range(consultas)
+            ]
+            termos_iter = iter(termos)
+            busca = medir(lambda: app.buscar_por_nome(next(termos_iter), 20), consultas)
+            
+            documentos = iter([{'cpf': amostra[rng_consulta.randrange(registros)].cpf} for _ in range(consultas)])
+            cpf = medir(lambda: app.possiveis_duplicados(next(documentos)), consultas)
+            
+            inicio = time.perf_counter()
+            with open(os.devnull, 'w', newline='', encoding='utf-8') as destino:
+                exportados = app.escrever_csv(destino)
+            exportacao = exportados / (time.perf_counter() - inicio)
+            
+            medidas[modo] = (carga, insercao, busca, cpf, exportacao)
+            print(f"\n{modo}:")
+            print(f"  carga em lote: {carga:,.0f} registros/s")
+            print(f"  inserir_registro: {resumo(insercao)}")
+            print(f"  busca por nome (20 resultados): {resumo(busca)}")
+            print(f"  busca por CPF: {resumo(cpf)}")
+            print(f"  exportação CSV: {exportacao:,.0f} registros/s")
+            app.conn.close()
+        
+        texto, cifrado = medidas['texto'], medidas['cifrado']
+        print("\nCusto da cifragem:")
+        print(f"  carga em lote: {texto[0] / cifrado[0] - 1:+.1%} de tempo")
+        for descricao, i in (("inserir_registro", 1), ("busca por nome", 2), ("busca por CPF", 3)):
+            print(f"  {descricao}: {statistics.median(cifrado[i]) / statistics.median(texto[i]) - 1:+.1%} na mediana")
+        print(f"  exportação CSV: {texto[4] / cifrado[4] - 1:+.1%} de tempo")
+
+
+def benchmark_backup(registros, paginas=256, pausa=0.005, semente=42):
+    """Mede a latência das inserções enquanto um backup é feito
+    
+    Compara a cópia em um único passo (pages=-1) com a cópia em passos de
+    paginas páginas e pausa entre eles. Um thread insere registros sem
+    parar, como no atendimento, durante cada backup.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        app = FormularioDIU(os.path.join(pasta, 'benchmark.db'))
+        rng = random.Random(semente)
+        for inicio in range(0, registros, 10000):
+            app.cursor.executemany(SQL_INSERIR_PACIENTE, [gerar_registro(rng).valores_insercao()
+                                                          for _ in range(min(10000, registros - inicio))])
+            app.conn.commit()
+        tamanho = os.path.getsize(os.path.join(pasta, 'benchmark.db')) / 1024 ** 2
+        print(f"{registros} registros ({tamanho:.0f} MB)")
+        
+        def inserir_durante(funcao):
+            tempos = []
+            parar = threading.Event()
+            
+            def inserir():
+                while not parar.is_set():
+                    registro = gerar_registro(rng)
+                    inicio = time.perf_counter()
+                    app.inserir_registro(registro)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+            
+            thread = threading.Thread(target=inserir)
+            thread.start()
+            time.sleep(0.2)
+            inicio = time.perf_counter()
+            resultado = funcao()
+            segundos = time.perf_counter() - inicio
+            time.sleep(0.2)
+            parar.set()
+            thread.join()
+            return resultado, segundos, tempos
+        
+        _, _, tempos = inserir_durante(lambda: time.sleep(1))
+        print(f"inserções sem backup: {resumo(tempos)}")
+        for descricao, passo, espera in (("em um passo", -1, 0), (f"{paginas} páginas por passo", paginas, pausa)):
+            destino = os.path.join(pasta, f'backup_{passo}.db')
+            resultado, segundos, tempos = inserir_durante(lambda: app.backup(destino, passo, espera))
+            print(f"backup {descricao}: {segundos:.2f}s ({resultado['integridade']}), "
+                  f"inserções durante o backup: {resumo(tempos)} máx={max(tempos):.1f}ms")
+        app.conn.close()
+
+
+# Valores das colunas de texto e categoria dos registros sintéticos completos
+PROFISSOES = ['Do lar', 'Estudante', 'Auxiliar administrativa', 'Vendedora', 'Professora', 'Diarista',
+              'Técnica de enfermagem', 'Autônoma', 'Desempregada', 'Cozinheira', 'Operadora de caixa']
+BAIRROS = ['Centro', 'Vila Nova', 'Jardim América', 'São José', 'Boa Vista', 'Santa Luzia', 'Industrial']
+VALORES_CATEGORIA = {
+    'cor': (['Branca', 'Parda', 'Preta', 'Amarela', 'Indígena'], [43, 45, 10, 1, 1]),
+    'religiao': (['Católica', 'Evangélica', 'Sem religião', 'Espírita', 'Outra'], [50, 31, 10, 3, 6]),
+    'escolaridade': (['Fundamental incompleto', 'Fundamental completo', 'Médio incompleto', 'Médio completo',
+                      'Superior incompleto', 'Superior completo'], [15, 10, 12, 38, 10, 15]),
+    'local_atendimento': (LOCAIS, None),
+    'cm_regularidade': (['regular', 'irregular'], [75, 25]),
+    'diu_escolhido': (DIUS, [70, 30]),
+    'exame_pelvico': (['normal', 'anormal'], [95, 5]),
+    'posicao_uterina': (['AVF', 'MVF', 'RVF'], [70, 15, 15]),
+    'dor_momento': (['Histerometria', 'Liberação do DIU', 'Fixação do colo do útero', 'Outro'], [45, 30, 20, 5]),
+    'inserido_por': (['staff', 'residente', 'enfermeira', 'estudante', 'MFC', 'supervisor'], [20, 35, 15, 10, 15, 5]),
+}
+# Probabilidade de 's' em cada pergunta sim/não e de marcar cada motivo
+PROBABILIDADE_SIM = {
+    'teve_ist': 0.15, 'parceiro_fixo': 0.7, 'alto_risco_ist': 0.1, 'uso_mac': 0.6, 'anemia': 0.12,
+    'sangramento_aumentado': 0.2, 'dipa_3meses': 0.01, 'ist_ativa': 0.02, 'hiv_aids': 0.01,
+    'sangramento_nao_investigado': 0.01, 'cancer_cervical': 0.002, 'infeccao_pos_parto_aborto': 0.03,
+    'informada_contraindicacoes': 0.98, 'cervicite_purulenta': 0.01, 'confirma_elegibilidade': 0.97,
+    'reflexo_vaginal': 0.1, 'uso_analgesia': 0.4, 'uso_dilatadores': 0.05,
+    'motivo_contracepcao': 0.85, 'motivo_pos_aborto': 0.05, 'motivo_sua': 0.08,
+    'motivo_doenca_hematologica': 0.01, 'motivo_transplantada': 0.002, 'motivo_mioma': 0.03,
+    'motivo_endometriose': 0.03, 'motivo_dor_pelvica': 0.03, 'motivo_tpm': 0.02,
+    'motivo_terapia_pos_menopausa': 0.01,
+}
+VALORES_CONDICIONAIS = {
+    'uso_mac_qual': ['Anticoncepcional oral', 'Injetável trimestral', 'Injetável mensal', 'Preservativo',
+                     'Implante subdérmico'],
+    'ist_ativa_qual': ['Clamídia', 'Gonorreia', 'Tricomoníase', 'Sífilis', 'HPV'],
+    'antirretrovirais_quais': ['Tenofovir + lamivudina + dolutegravir', 'Zidovudina + lamivudina + efavirenz'],
+    'analgesia_qual': ['Dipirona', 'Ibuprofeno', 'Lidocaína intracervical', 'Bloqueio paracervical'],
+    'motivo_dificuldade': ['Estenose cervical', 'Útero muito fletido', 'Dor', 'Reflexo vagal'],
+}
+# Resultado da inserção -> (dificuldade, motivos)
+DESFECHOS_INSERCAO = {
+    'fácil': (['sem dificuldade'], ['']),
+    'difícil': (['dificuldade esperada', 'mais difícil que o esperado'],
+                ['Colo estenótico', 'Útero retrovertido', 'Dor intensa', 'Ansiedade da paciente']),
+    'não realizada': (['não foi possível inserir'],
+                      ['Colo estenótico', 'Desistência da paciente', 'Histerometria menor que 6 cm']),
+}
+
+
+def gerar_paciente(rng, hoje=date(2026, 1, 1)):
+    """Gera um registro com todas as colunas preenchidas de forma coerente
+    
+    Os campos condicionais (uso_mac_qual, ist_ativa_qual, ...) só são
+    preenchidos quando a resposta do campo de controle os torna aplicáveis,
+    como no formulário; datas, história obstétrica e desfecho da inserção
+    são consistentes entre si.
+    """
+    dados = {}
+    for coluna, (valores, pesos) in VALORES_CATEGORIA.items():
+        dados[coluna] = rng.choices(valores, pesos)[0]
+    for coluna, probabilidade in PROBABILIDADE_SIM.items():
+        sim = rng.random() < probabilidade
+        dados[coluna] = int(sim) if coluna.startswith('motivo_') else 'sn'[not sim]
+    if dados['hiv_aids'] == 's':
+        dados['uso_antirretrovirais'] = 's' if rng.random() < 0.85 else 'n'
+    else:
+        dados['uso_antirretrovirais'] = 'n'
+    
+    nascimento = date(1972, 1, 1) + timedelta(days=rng.randint(0, 365 * 36))
+    insercao = min(hoje, max(nascimento + timedelta(days=365 * 15), date(2018, 1, 1))
+                   + timedelta(days=rng.randint(0, 2900)))
+    gesta = rng.choices(range(7), [25, 25, 25, 12, 7, 4, 2])[0]
+    para = rng.randint(0, gesta)
+    abortos = rng.randint(0, gesta - para)
+    resultado = rng.choices(list(DESFECHOS_INSERCAO), [80, 15, 5])[0]
+    dificuldades, motivos = DESFECHOS_INSERCAO[resultado]
+    
+    dados.update(
+        nome_completo=gerar_nome(rng),
+        data_nascimento=nascimento.isoformat(),
+        telefone=f"({rng.randint(11, 99)}) 9{rng.randrange(10 ** 8):08d}",
+        cpf=f"{rng.randrange(10 ** 11):011d}",
+        sus=f"{rng.randrange(10 ** 15):015d}" if rng.random() < 0.6 else None,
+        profissao=rng.choice(PROFISSOES),
+        endereco=f"Rua {rng.choice(SOBRENOMES)}, {rng.randint(1, 2000)} - {rng.choice(BAIRROS)}",
+        motivo_outro='Desejo da paciente' if rng.random() < 0.03 else None,
+        dum=(insercao - timedelta(days=rng.randint(0, 28))).isoformat(),
+        ultima_co=f"{rng.randint(insercao.year - 3, insercao.year)} - normal",
+        cm_duracao_dias=rng.randint(3, 8),
+        gesta=gesta,
+        para=para,
+        cesarea=rng.randint(0, para),
+        abortos=abortos,
+        data_ultimo_parto=(insercao - timedelta(days=rng.randint(45, 3650))).isoformat() if para else None,
+        data_ultimo_aborto=(insercao - timedelta(days=rng.randint(1, 3650))).isoformat() if abortos else None,
+        peso_kg=round(rng.gauss(68, 12), 1),
+        altura_cm=round(rng.gauss(160, 7), 1),
+        pa_mmhg=f"{rng.randrange(100, 141, 10)}x{rng.randrange(60, 91, 10)}",
+        data_insercao=insercao.isoformat(),
+        data_primeira_revisao=(insercao + timedelta(days=rng.randint(30, 45))).isoformat(),
+        insercao_resultado=resultado,
+        insercao_motivo=rng.choice(motivos) or None,
+        histerometria_cm=round(rng.uniform(6.0, 9.0), 1),
+        dor_nota=rng.randint(1, 10),
+        dificuldade_insercao=rng.choice(dificuldades),
+        data_registro=f"{insercao.isoformat()} {rng.randint(7, 18):02d}:{rng.randint(0, 59):02d}:00",
+    )
+    for coluna, valores in VALORES_CONDICIONAIS.items():
+        dados[coluna] = rng.choice(valores)
+    if dados['dificuldade_insercao'] == 'sem dificuldade':
+        dados['motivo_dificuldade'] = None
+    
+    for campo in CAMPOS:
+        if not campo_aplicavel(campo.nome, dados):
+            dados[campo.nome] = None
+    return RegistroPaciente(**dados)
+
+
+def escrever_csv_sintetico(caminho, rng, quantidade):
+    """Grava quantidade registros sintéticos completos em CSV, no formato da importação"""
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        writer = csv.writer(arquivo)
+        writer.writerow(COLUNAS_GRAVADAS)
+        for _ in range(quantidade):
+            registro = gerar_paciente(rng)
+            writer.writerow(['' if valor is None else valor
+                             for valor in (getattr(registro, coluna) for coluna in COLUNAS_GRAVADAS)])
+
+
+def respostas_formulario(registro):
+    """Mapeia cada pergunta do formulário à resposta digitada para o registro
+    
+    Usado para conduzir novo_registro() como se a recepção digitasse a
+    ficha inteira; também responde à escolha de rascunho, ao aviso de
+    duplicidade e à confirmação final.
+    """
+    respostas = {
+        "Número do rascunho para continuar [Enter = novo registro]: ": '',
+        "Continuar o novo registro mesmo assim? (s/n): ": 's',
+        "Deseja salvar este registro? (s/n): ": 's',
+    }
+    for _, _, campos in FORMULARIO:
+        for campo in campos:
+            valor = getattr(registro, campo.nome)
+            if valor is None:
+                valor = ''
+            elif campo.tipo == 'data':
+                valor = formatar_data(valor)
+            elif campo.tipo == 'flag':
+                valor = 's' if valor else 'n'
+            respostas[campo.pergunta] = str(valor)
+    return respostas
+
+
+def medir_operacao(funcao, repeticoes):
+    """Mede latências e o pico de memória alocada de uma operação
+    
+    As repetições cronometradas rodam sem tracemalloc, que deixaria o
+    Python mais lento; o pico de memória vem de uma execução extra rastreada.
+    """
+    tempos = medir(funcao, repeticoes)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'repeticoes': repeticoes, **percentis(tempos), 'memoria_pico_kb': pico / 1024}
+
+
+def memoria_processo_kb():
+    """Pico de memória residente do processo em KB (None fora do Unix)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 1024 if sys.platform == 'darwin' else pico
+
+
+# Métricas comparadas com a linha de base: nome -> True se maior é melhor
+METRICAS_COMPARADAS = {'p50_ms': False, 'p99_ms': False, 'memoria_pico_kb': False, 'registros_por_segundo': True}
+# Diferenças absolutas abaixo destas não contam como regressão (ruído de medida)
+FOLGAS_COMPARACAO = {'p50_ms': 0.05, 'p99_ms': 0.2, 'memoria_pico_kb': 64, 'registros_por_segundo': 0}
+
+
+def comparar_baseline(resultado, baseline, tolerancia):
+    """Compara o resultado com a linha de base; retorna a lista de regressões"""
+    if baseline.get('registros') != resultado['registros']:
+        print(f"⚠ Linha de base medida com {baseline.get('registros')} registros, "
+              f"esta execução com {resultado['registros']}.")
+    regressoes = []
+    for operacao, medidas in resultado['operacoes'].items():
+        anteriores = baseline.get('operacoes', {}).get(operacao)
+        if not anteriores:
+            continue
+        for metrica, maior_melhor in METRICAS_COMPARADAS.items():
+            if metrica not in medidas or metrica not in anteriores:
+                continue
+            atual, anterior = medidas[metrica], anteriores[metrica]
+            variacao = atual / anterior - 1 if anterior else 0.0
+            piorou = (anterior - atual if maior_melhor else atual - anterior) > FOLGAS_COMPARACAO[metrica]
+            if piorou and abs(variacao) > tolerancia:
+                regressoes.append((operacao, metrica, anterior, atual, variacao))
+    return regressoes
+
+
+def benchmark_suite(registros, consultas=1000, insercoes=100, exportacoes=3, salvar=None, comparar=None,
+                    tolerancia=0.25, tamanho_lote=100000, semente=42):
+    """Mede as operações do dia a dia sobre registros sintéticos completos
+    
+    Carrega registros pela importação em lote (CSVs de tamanho_lote
+    registros, para não ocupar o disco com um arquivo só) e mede, pelos
+    mesmos caminhos usados no menu: novo_registro (ficha digitada inteira,
+    com rascunho), buscar_paciente, ver_detalhes_registro, listar_registros
+    e exportar_csv. Grava percentis de latência e picos de memória em JSON
+    (salvar) e compara com uma linha de base (comparar): sai com código 1
+    se alguma métrica piorar mais que tolerancia.
+    """
+    rng = random.Random(semente)
+    resultado = {
+        'registros': registros,
+        'semente': semente,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'sqlite': sqlite3.sqlite_version,
+        'operacoes': {},
+    }
+    operacoes = resultado['operacoes']
+    
+    with tempfile.TemporaryDirectory() as pasta, open(os.devnull, 'w', encoding='utf-8') as nulo:
+        app = FormularioDIU(os.path.join(pasta, 'benchmark.db'), chave='')
+        arquivo_lote = os.path.join(pasta, 'lote.csv')
+        
+        segundos = 0.0
+        for inicio in range(0, registros, tamanho_lote):
+            escrever_csv_sintetico(arquivo_lote, rng, min(tamanho_lote, registros - inicio))
+            importacao = app.importar_registros(arquivo_lote)
+            if importacao['rejeitados']:
+                raise RuntimeError(f"{importacao['rejeitados']} registros sintéticos rejeitados na importação")
+            segundos += importacao['segundos']
+        # Pico de memória da importação, rastreado em um lote à parte (não depende do total)
+        escrever_csv_sintetico(arquivo_lote, rng, min(tamanho_lote, 10000))
+        memoria = FormularioDIU(os.path.join(pasta, 'memoria.db'), chave='')
+        tracemalloc.start()
+        try:
+            memoria.importar_registros(arquivo_lote)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            memoria.conn.close()
+        operacoes['importacao_em_lote'] = {'segundos': segundos, 'registros_por_segundo': registros / segundos,
+                                           'memoria_pico_kb': pico / 1024}
+        tamanho = os.path.getsize(os.path.join(pasta, 'benchmark.db')) / 1024 ** 2
+        print(f"{registros} registros ({tamanho:.0f} MB) importados em {segundos:.1f}s "
+              f"({registros / segundos:,.0f} registros/s)")
+        
+        def digitar(respostas):
+            app.entrada = lambda pergunta: respostas[pergunta]
+        
+        def novo_registro():
+            digitar(respostas_formulario(gerar_paciente(rng)))
+            app.novo_registro()
+        
+        def buscar_paciente():
+            termo = f"{rng.choice(PRIMEIROS_NOMES)[:rng.randint(3, 6)]} {rng.choice(SOBRENOMES)[:rng.randint(3, 6)]}"
+            digitar({"Digite o nome (ou parte do nome) para buscar: ": termo,
+                     "\nDeseja ver os detalhes completos de algum registro? (s/n): ": 'n'})
+            app.buscar_paciente()
+        
+        def exportar_csv():
+            digitar(collections.defaultdict(str, {
+                "Nome do arquivo (sem extensão) [export]: ": os.path.join(pasta, 'export'),
+            }))
+            app.exportar_csv()
+            for nome in os.listdir(pasta):
+                if nome.startswith('export_'):
+                    os.remove(os.path.join(pasta, nome))
+        
+        medicoes = (
+            ('novo_registro', novo_registro, insercoes),
+            ('buscar_paciente', buscar_paciente, consultas),
+            ('ver_detalhes_registro', lambda: app.ver_detalhes_registro(rng.randint(1, registros)), consultas),
+            ('listar_registros', app.listar_registros, consultas),
+            ('exportar_csv', exportar_csv, exportacoes),
+        )
+        for nome, funcao, repeticoes in medicoes:
+            with contextlib.redirect_stdout(nulo):
+                operacoes[nome] = medir_operacao(funcao, repeticoes)
+        app.conn.close()
+    resultado['memoria_processo_kb'] = memoria_processo_kb()
+    
+    print(f"\n{'operação':<24}{'p50':>12}{'p90':>12}{'p99':>12}{'máx':>12}{'memória':>12}")
+    for nome, medidas in operacoes.items():
+        if 'p50_ms' in medidas:
+            print(f"{nome:<24}" + ''.join(f"{medidas[m]:>10.2f}ms" for m in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms'))
+                  + f"{medidas['memoria_pico_kb']:>9.0f} KB")
+    if resultado['memoria_processo_kb']:
+        print(f"pico de memória do processo: {resultado['memoria_processo_kb'] / 1024:.0f} MB")
+    
+    if salvar:
+        with open(salvar, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em {salvar}")
+    if comparar:
+        with open(comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar_baseline(resultado, json.load(arquivo), tolerancia)
+        for operacao, metrica, anterior, atual, variacao in regressoes:
+            print(f"✗ {operacao} {metrica}: {anterior:.2f} -> {atual:.2f} ({variacao:+.0%})")
+        if regressoes:
+            sys.exit(1)
+        print(f"✓ Nenhuma regressão acima de {tolerancia:.0%} em relação a {comparar}.")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmarks do Sistema de Formulário DIU")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    
+    parser_busca = subparsers.add_parser('busca', help="Busca por nome: LIKE x índice")
+    parser_busca.add_argument('--registros', type=int, default=100000)
+    parser_busca.add_argument('--consultas', type=int, default=200)
+    
+    parser_concorrencia = subparsers.add_parser('concorrencia', help="Leituras e gravações simultâneas em vários processos")
+    parser_concorrencia.add_argument('--registros', type=int, default=50000)
+    parser_concorrencia.add_argument('--leitores', type=int, default=4)
+    parser_concorrencia.add_argument('--segundos', type=float, default=10)
+    
+    parser_planos = subparsers.add_parser('planos', help="Verifica se as consultas críticas usam índice")
+    parser_planos.add_argument('--db', help="Banco a verificar (padrão: banco temporário)")
+    
+    parser_paginacao = subparsers.add_parser('paginacao', help="Paginação por chave x OFFSET")
+    parser_paginacao.add_argument('--registros', type=int, default=200000)
+    parser_paginacao.add_argument('--paginas', type=int, default=10000)
+    
+    parser_servidor = subparsers.add_parser('servidor', help="Teste de carga do servidor HTTP")
+    parser_servidor.add_argument('--registros', type=int, default=50000)
+    parser_servidor.add_argument('--clientes', type=int, default=16)
+    parser_servidor.add_argument('--segundos', type=float, default=10)
+    parser_servidor.add_argument('--threads', type=int, default=8)
+    
+    parser_duplicados = subparsers.add_parser('duplicados', help="Detecção de pacientes duplicadas")
+    parser_duplicados.add_argument('--registros', type=int, default=200000)
+    parser_duplicados.add_argument('--fracao', type=float, default=0.02)
+    
+    parser_cifragem = subparsers.add_parser('cifragem', help="Custo da cifragem dos campos identificadores")
+    parser_cifragem.add_argument('--registros', type=int, default=100000)
+    parser_cifragem.add_argument('--consultas', type=int, default=1000)
+    
+    parser_backup = subparsers.add_parser('backup', help="Latência das inserções durante o backup online")
+    parser_backup.add_argument('--registros', type=int, default=200000)
+    parser_backup.add_argument('--paginas', type=int, default=256)
+    parser_backup.add_argument('--pausa', type=float, default=0.005)
+    
+    parser_suite = subparsers.add_parser('suite', help="Operações do dia a dia, com linha de base em JSON")
+    parser_suite.add_argument('--registros', type=int, default=100000)
+    parser_suite.add_argument('--consultas', type=int, default=1000)
+    parser_suite.add_argument('--insercoes', type=int, default=100)
+    parser_suite.add_argument('--exportacoes', type=int, default=3)
+    parser_suite.add_argument('--salvar', metavar='ARQUIVO', help="Grava os resultados em JSON")
+    parser_suite.add_argument('--comparar', metavar='ARQUIVO', help="Linha de base JSON para comparar")
+    parser_suite.add_argument('--tolerancia', type=float, default=0.25,
+                              help="Piora relativa aceita antes de acusar regressão (padrão: 0.25)")
+    
+    args = parser.parse_args()
+    
+    if args.comando == 'busca':
+        benchmark_busca(args.registros, args.consultas)
+    elif args.comando == 'concorrencia':
+        benchmark_concorrencia(args.registros, args.leitores, args.segundos)
+    elif args.comando == 'planos':
+        verificar_planos(args.db)
+    elif args.comando == 'paginacao':
+        benchmark_paginacao(args.registros, args.paginas)
+    elif args.comando == 'servidor':
+        benchmark_servidor(args.registros, args.clientes, args.segundos, args.threads)
+    elif args.comando == 'duplicados':
+        benchmark_duplicados(args.registros, args.fracao)
+    elif args.comando == 'cifragem':
+        benchmark_cifragem(args.registros, args.consultas)
+    elif args.comando == 'backup':
+        benchmark_backup(args.registros, args.paginas, args.pausa)
+    elif args.comando == 'suite':
+        benchmark_suite(args.registros, args.consultas, args.insercoes, args.exportacoes,
+                        args.salvar, args.comparar, args.tolerancia)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,121 +6,1984 @@ Gerencia informações de pacientes para inserção de DIU
 """
 
 import sqlite3
+import argparse
+import bisect
+import collections
+import contextlib
 import csv
+import difflib
+import functools
+import gzip
+import hashlib
+import hmac
+import io
+import json
 import os
-from datetime import datetime
+import pathlib
+import queue
+import re
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+
+class TabelaSemAcentos(dict):
+    """Tabela de str.translate: cada caractere decomposto (NFKD) sem os acentos
+    
+    Preenchida conforme os caracteres aparecem; equivale a decompor o texto
+    inteiro e remover os caracteres combinantes, sem percorrê-lo em Python.
+    """
+    
+    def __missing__(self, codigo):
+        texto = ''.join(c for c in unicodedata.normalize('NFKD', chr(codigo)) if not unicodedata.combining(c))
+        self[codigo] = texto
+        return texto
+
+
+SEM_ACENTOS = TabelaSemAcentos()
+NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar_texto(texto):
+    """Normaliza texto para busca: minúsculas, sem acentos e sem pontuação"""
+    if not texto:
+        return ''
+    return NAO_ALFANUMERICO.sub(' ', texto.translate(SEM_ACENTOS).lower()).strip()
+
+
+def normalizar_documento(valor):
+    """Mantém só os dígitos de um CPF/SUS (None se não houver nenhum)"""
+    digitos = re.sub(r'\D', '', str(valor)) if valor else ''
+    return digitos or None
+
+
+def converter_valor(valor, tipo="texto", min_val=None, max_val=None):
+    """Converte um valor digitado conforme o tipo do campo
+    
+    Levanta ValueError com a mensagem a ser exibida se o valor for inválido.
+    """
+    if tipo == "numero":
+        try:
+            num = int(valor)
+        except ValueError:
+            raise ValueError("Por favor, digite um número válido!")
+        if min_val is not None and num < min_val:
+            raise ValueError(f"Por favor, digite um número maior ou igual a {min_val}!")
+        if max_val is not None and num > max_val:
+            raise ValueError(f"Por favor, digite um número menor ou igual a {max_val}!")
+        return num
+    elif tipo == "decimal":
+        try:
+            return float(valor)
+        except ValueError:
+            raise ValueError("Por favor, digite um número decimal válido!")
+    elif tipo == "flag":
+        # Motivos: marcados como 1/0 ou s/n, gravados como 1/0
+        if valor in ('1', '0'):
+            return int(valor)
+        return 1 if converter_valor(valor, "sim_nao") == 's' else 0
+    elif tipo == "sim_nao":
+        if valor.lower() in ['s', 'sim', 'n', 'não', 'nao']:
+            return 's' if valor.lower() in ['s', 'sim'] else 'n'
+        raise ValueError("Por favor, digite 's' ou 'n'!")
+    elif tipo == "data":
+        data = interpretar_data(valor)
+        if data is None:
+            raise ValueError("Por favor, digite uma data válida (DD/MM/AAAA)!")
+        # Gravada como AAAA-MM-DD, que ordena e compara corretamente no índice
+        return data.isoformat()
+    elif tipo == "timestamp":
+        momento = interpretar_timestamp(valor)
+        if momento is None:
+            raise ValueError("Por favor, informe data e hora válidas (AAAA-MM-DD HH:MM:SS)!")
+        # Mesmo formato do CURRENT_TIMESTAMP do SQLite
+        return momento.strftime('%Y-%m-%d %H:%M:%S')
+    
+    return valor
+
+
+def interpretar_data(texto):
+    """Converte uma data DD/MM/AAAA ou AAAA-MM-DD em date (None se inválida)"""
+    if not texto or not isinstance(texto, str):
+        return None
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto.strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def interpretar_timestamp(texto):
+    """Converte data e hora AAAA-MM-DD HH:MM:SS em datetime (None se inválida)
+    
+    Também aceita DD/MM/AAAA HH:MM:SS e uma data sem hora (meia-noite),
+    como em fichas antigas.
+    """
+    if not texto or not isinstance(texto, str):
+        return None
+    for formato in ('%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(texto.strip(), formato)
+        except ValueError:
+            continue
+    return None
+
+
+def formatar_data(valor):
+    """Exibe uma data gravada como AAAA-MM-DD no formato DD/MM/AAAA"""
+    data = interpretar_data(valor) if isinstance(valor, str) else None
+    return data.strftime('%d/%m/%Y') if data else valor
+
+
+# Colunas derivadas, mantidas pelo sistema e omitidas na exibição/exportação
+COLUNAS_INTERNAS = {'nome_normalizado', 'cpf_normalizado', 'sus_normalizado', 'dados_cifrados'}
+
+
+class Campo:
+    """Definição de um campo do formulário (uma pergunta e uma coluna)
+    
+    tipo: texto, categoria, data, numero, decimal, sim_nao ou flag (motivos,
+    gravados como 0/1). limites: (mínimo, máximo) de um número. condicao:
+    (campo de controle, função); o campo só é perguntado e gravado quando a
+    função retorna verdadeiro para a resposta do campo de controle.
+    cifrado: dado identificador ou sensível, gravado cifrado quando o banco
+    tem cifragem ativa (ver CifraCampos).
+    """
+    
+    __slots__ = ('nome', 'tipo', 'pergunta', 'obrigatorio', 'limites', 'condicao', 'cifrado')
+    
+    def __init__(self, nome, tipo, pergunta, obrigatorio=False, limites=None, condicao=None,
+                 cifrado=False):
+        self.nome = nome
+        self.tipo = tipo
+        self.pergunta = pergunta
+        self.obrigatorio = obrigatorio
+        self.limites = limites
+        self.condicao = condicao
+        self.cifrado = cifrado
+    
+    def tipo_sql(self):
+        """Tipo da coluna no CREATE TABLE"""
+        tipo = TIPOS_SQL.get(self.tipo, 'TEXT')
+        return f"{tipo} NOT NULL" if self.obrigatorio else tipo
+
+
+TIPOS_SQL = {'flag': 'INTEGER DEFAULT 0', 'numero': 'INTEGER', 'decimal': 'REAL'}
+
+# Formulário: (seção, instrução, campos), na ordem das perguntas e das colunas
+# da tabela. Um campo novo é uma linha aqui: a coluna, a pergunta e a
+# validação saem desta definição.
+FORMULARIO = [
+    ("IDENTIFICAÇÃO", None, [
+        Campo('nome_completo', 'texto', "Nome completo: ", obrigatorio=True, cifrado=True),
+        Campo('data_nascimento', 'data', "Data de nascimento (DD/MM/AAAA): "),
+        Campo('telefone', 'texto', "Telefone: ", cifrado=True),
+        Campo('cpf', 'texto', "CPF: ", cifrado=True),
+        Campo('sus', 'texto', "SUS: ", cifrado=True),
+        Campo('cor', 'categoria', "Cor: "),
+        Campo('religiao', 'categoria', "Religião: "),
+        Campo('profissao', 'texto', "Profissão: "),
+        Campo('escolaridade', 'categoria', "Escolaridade: "),
+        Campo('endereco', 'texto', "Endereço: ", cifrado=True),
+        Campo('local_atendimento', 'categoria', "Local de atendimento: "),
+    ]),
+    ("MOTIVAÇÃO PARA INSERÇÃO DO DIU", "Marque as opções aplicáveis (s/n):", [
+        Campo('motivo_contracepcao', 'flag', "1. Contracepção (s/n): "),
+        Campo('motivo_pos_aborto', 'flag', "2. Pós aborto (s/n): "),
+        Campo('motivo_sua', 'flag', "3. SUA (s/n): "),
+        Campo('motivo_doenca_hematologica', 'flag', "4. Doença hematológica (s/n): "),
+        Campo('motivo_transplantada', 'flag', "5. Transplantada (s/n): "),
+        Campo('motivo_mioma', 'flag', "6. Mioma (s/n): "),
+        Campo('motivo_endometriose', 'flag', "7. Endometriose (s/n): "),
+        Campo('motivo_dor_pelvica', 'flag', "8. Dor pélvica (s/n): "),
+        Campo('motivo_tpm', 'flag', "9. TPM (s/n): "),
+        Campo('motivo_terapia_pos_menopausa', 'flag', "10. Terapia pós menopausa (s/n): "),
+        Campo('motivo_outro', 'texto', "Outro motivo (descreva): "),
+    ]),
+    ("DADOS GINECOLÓGICOS", None, [
+        Campo('dum', 'data', "Data da última menstruação (DUM) (DD/MM/AAAA): "),
+        Campo('ultima_co', 'texto', "Última C.O: "),
+        Campo('cm_regularidade', 'categoria', "C.M (regular/irregular): "),
+        Campo('cm_duracao_dias', 'numero', "Duração em dias: "),
+        Campo('teve_ist', 'sim_nao', "Já teve IST? (s/n): "),
+        Campo('parceiro_fixo', 'sim_nao', "Possui parceiro fixo? (s/n): "),
+        Campo('alto_risco_ist', 'sim_nao', "Alto risco de IST? (s/n): "),
+        Campo('uso_mac', 'sim_nao', "Uso de MAC? (s/n): "),
+        Campo('uso_mac_qual', 'texto', "Qual MAC: ", condicao=('uso_mac', lambda v: v == 's')),
+        Campo('anemia', 'sim_nao', "Anemia? (s/n): "),
+        Campo('sangramento_aumentado', 'sim_nao', "Sangramento uterino aumentado na menstruação? (s/n): "),
+        Campo('dipa_3meses', 'sim_nao', "DIPA nos últimos 3 meses? (s/n): "),
+        Campo('ist_ativa', 'sim_nao', "IST ativa? (s/n): "),
+        Campo('ist_ativa_qual', 'texto', "Qual IST: ", condicao=('ist_ativa', lambda v: v == 's')),
+        Campo('hiv_aids', 'sim_nao', "HIV/AIDS? (s/n): ", cifrado=True),
+        Campo('uso_antirretrovirais', 'sim_nao', "Uso de antirretrovirais? (s/n): ", cifrado=True),
+        Campo('antirretrovirais_quais', 'texto', "Quais antirretrovirais: ",
+              condicao=('uso_antirretrovirais', lambda v: v == 's'), cifrado=True),
+        Campo('sangramento_nao_investigado', 'sim_nao', "Sangramento uterino não investigado? (s/n): "),
+        Campo('cancer_cervical', 'sim_nao', "Câncer cervical? (s/n): "),
+    ]),
+    ("HISTÓRIA OBSTÉTRICA", None, [
+        Campo('gesta', 'numero', "Gesta: "),
+        Campo('para', 'numero', "Para: "),
+        Campo('cesarea', 'numero', "Cesárea: "),
+        Campo('abortos', 'numero', "Abortos: "),
+        Campo('data_ultimo_parto', 'data', "Data do último parto (DD/MM/AAAA): "),
+        Campo('data_ultimo_aborto', 'data', "Data do último aborto (DD/MM/AAAA): "),
+        Campo('infeccao_pos_parto_aborto', 'sim_nao', "Teve infecção pós-parto ou pós-aborto? (s/n): "),
+    ]),
+    ("INSERÇÃO DO DIU", None, [
+        Campo('informada_contraindicacoes', 'sim_nao', "Foi informada sobre contraindicações e efeitos? (s/n): "),
+        Campo('diu_escolhido', 'categoria', "DIU escolhido (TCU/Levonorgestrel): "),
+        Campo('peso_kg', 'decimal', "Peso (kg): "),
+        Campo('altura_cm', 'decimal', "Altura (cm): "),
+        Campo('pa_mmhg', 'texto', "PA (mmHg): "),
+        Campo('data_insercao', 'data', "Data de inserção (DD/MM/AAAA): "),
+        Campo('data_primeira_revisao', 'data', "Data da primeira revisão (DD/MM/AAAA): "),
+        Campo('exame_pelvico', 'categoria', "Exame pélvico (normal/anormal): "),
+        Campo('cervicite_purulenta', 'sim_nao', "Cervicite purulenta? (s/n): "),
+        Campo('confirma_elegibilidade', 'sim_nao', "Confirma elegibilidade para o DIU? (s/n): "),
+        Campo('insercao_resultado', 'categoria', "Inserção (fácil/difícil/não realizada): "),
+        Campo('insercao_motivo', 'texto', "Motivo: ",
+              condicao=('insercao_resultado', lambda v: v in ['difícil', 'dificil', 'não realizada', 'nao realizada'])),
+        Campo('posicao_uterina', 'categoria', "Posição uterina (AVF/MVF/RVF): "),
+        Campo('reflexo_vaginal', 'sim_nao', "Reflexo vaginal? (s/n): "),
+        Campo('uso_analgesia', 'sim_nao', "Uso de analgesia? (s/n): "),
+        Campo('analgesia_qual', 'texto', "Qual analgesia: ", condicao=('uso_analgesia', lambda v: v == 's')),
+        Campo('uso_dilatadores', 'sim_nao', "Uso de dilatadores cervicais? (s/n): "),
+        Campo('histerometria_cm', 'decimal', "Histerometria (cm): "),
+        Campo('dor_nota', 'numero', "Nota de dor na inserção (1-10): ", limites=(1, 10)),
+        Campo('dor_momento', 'categoria', "Em qual momento (Histerometria/Liberação do DIU/Fixação do colo do útero/Outro): "),
+        Campo('dificuldade_insercao', 'categoria', "Dificuldade na inserção (sem dificuldade/dificuldade esperada/mais difícil que o esperado/não foi possível inserir): "),
+        Campo('motivo_dificuldade', 'categoria', "Motivo da dificuldade: ",
+              condicao=('dificuldade_insercao',
+                        lambda v: 'dificuldade' in (v or '').lower() or 'difícil' in (v or '').lower())),
+        Campo('inserido_por', 'categoria', "Inserido por (staff/residente/enfermeira/estudante/MFC/supervisor): "),
+    ]),
+]
+CAMPOS = [campo for _, _, campos in FORMULARIO for campo in campos]
+
+COLUNAS_MOTIVO = [campo.nome for campo in CAMPOS if campo.tipo == 'flag']
+COLUNAS_DATA = [campo.nome for campo in CAMPOS if campo.tipo == 'data']
+CAMPOS_OBRIGATORIOS = [campo.nome for campo in CAMPOS if campo.obrigatorio]
+# Limites aplicados na digitação e na importação
+LIMITES = {campo.nome: campo.limites for campo in CAMPOS if campo.limites}
+# Campos que só se aplicam conforme a resposta de outro campo: campo -> (controle, condição)
+CAMPOS_CONDICIONAIS = {campo.nome: campo.condicao for campo in CAMPOS if campo.condicao}
+# Campos gravados cifrados quando o banco tem cifragem ativa, na ordem em que
+# ficam juntos em dados_cifrados
+ORDEM_CIFRADA = tuple(campo.nome for campo in CAMPOS if campo.cifrado)
+COLUNAS_CIFRADAS = frozenset(ORDEM_CIFRADA)
+
+# Colunas da tabela de pacientes, na ordem da tabela (sem as internas)
+COLUNAS_PACIENTES = ('id', *(campo.nome for campo in CAMPOS), 'data_registro')
+# Colunas preenchidas pelo formulário; a importação e a API também aceitam
+# data_registro (registros antigos), e o id é sempre gerado pelo banco
+COLUNAS_FORMULARIO = COLUNAS_PACIENTES[1:-1]
+COLUNAS_GRAVADAS = COLUNAS_PACIENTES[1:]
+# Tipos das colunas, usados na importação e na exportação colunar
+TIPOS_COLUNAS = {'id': 'numero', **{campo.nome: campo.tipo for campo in CAMPOS}, 'data_registro': 'timestamp'}
+
+
+def tipo_coluna(coluna):
+    """Retorna o tipo lógico de uma coluna para a exportação colunar"""
+    return TIPOS_COLUNAS.get(coluna, 'texto')
+
+
+PADROES_REGISTRO = tuple(0 if coluna in COLUNAS_MOTIVO else None for coluna in COLUNAS_PACIENTES)
+
+SQL_INSERIR_PACIENTE = (
+    f"INSERT INTO pacientes ({', '.join(COLUNAS_GRAVADAS)}, "
+    f"nome_normalizado, cpf_normalizado, sus_normalizado, dados_cifrados) "
+    f"VALUES ({', '.join('?' * len(COLUNAS_FORMULARIO))}, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)"
+)
+# Campos usados para procurar a paciente entre os registros existentes
+CAMPOS_DUPLICIDADE = {'nome_completo', 'data_nascimento', 'cpf', 'sus'}
+
+# Colunas das listagens: navegação, busca por nome, revisões e possíveis duplicados
+COLUNAS_RESUMO = ('id', 'nome_completo', 'data_nascimento', 'telefone', 'data_insercao', 'data_registro',
+                  'local_atendimento', 'diu_escolhido')
+COLUNAS_BUSCA = ('id', 'nome_completo', 'data_nascimento', 'telefone', 'cpf', 'data_insercao')
+COLUNAS_REVISAO = ('id', 'nome_completo', 'telefone', 'data_primeira_revisao', 'data_insercao',
+                   'local_atendimento', 'diu_escolhido')
+COLUNAS_DUPLICADO = ('id', 'nome_completo', 'data_nascimento', 'cpf', 'sus', 'local_atendimento')
+
+
+class RegistroPaciente:
+    """Registro de paciente, com um atributo por coluna da tabela
+    
+    É o formato comum ao formulário, à importação, à API e às consultas. Usa
+    __slots__, sem dicionário por instância, então ocupa bem menos memória
+    que um dict com as mesmas colunas. Os valores seguem o formato gravado no
+    banco: 's'/'n', motivos 0/1, datas AAAA-MM-DD.
+    """
+    
+    __slots__ = COLUNAS_PACIENTES
+    
+    def __init__(self, **campos):
+        for coluna, padrao in zip(COLUNAS_PACIENTES, PADROES_REGISTRO):
+            setattr(self, coluna, padrao)
+        for coluna, valor in campos.items():
+            setattr(self, coluna, valor)
+    
+    @classmethod
+    def de_linha(cls, linha):
+        """Cria o registro a partir de uma linha com as colunas de COLUNAS_PACIENTES"""
+        registro = cls.__new__(cls)
+        for coluna, valor in zip(COLUNAS_PACIENTES, linha):
+            setattr(registro, coluna, valor)
+        return registro
+    
+    def get(self, coluna, padrao=None):
+        return getattr(self, coluna, padrao)
+    
+    def __iter__(self):
+        """Percorre os pares (coluna, valor) na ordem da tabela"""
+        for coluna in COLUNAS_PACIENTES:
+            yield coluna, getattr(self, coluna)
+    
+    def como_dicionario(self):
+        return dict(self)
+    
+    def valores_insercao(self, cifra=None):
+        """Valores na ordem de SQL_INSERIR_PACIENTE
+        
+        Com cifra, os campos de COLUNAS_CIFRADAS vão juntos para
+        dados_cifrados e as colunas deles recebem CifraCampos.OCULTO.
+        """
+        if cifra is None:
+            valores = [getattr(self, coluna) for coluna in COLUNAS_GRAVADAS]
+            return tuple(valores + chaves_indice(self) + [None])
+        valores = [CifraCampos.OCULTO if coluna in COLUNAS_CIFRADAS else getattr(self, coluna)
+                   for coluna in COLUNAS_GRAVADAS]
+        dados = cifra.cifrar_linha([getattr(self, coluna) for coluna in ORDEM_CIFRADA])
+        return tuple(valores + chaves_indice(self, cifra) + [dados])
+    
+    def __repr__(self):
+        return f"RegistroPaciente(id={self.id!r}, nome_completo={self.nome_completo!r})"
+
+
+def campo_aplicavel(campo, dados):
+    """Indica se um campo condicional se aplica às respostas já dadas"""
+    if campo not in CAMPOS_CONDICIONAIS:
+        return True
+    controle, condicao = CAMPOS_CONDICIONAIS[campo]
+    return condicao(dados.get(controle))
+
+
+def validar_registro(registro):
+    """Valida e converte um registro com as regras do formulário
+    
+    registro é um RegistroPaciente ou um dicionário coluna -> valor (JSON,
+    CSV). Usado pelo formulário, pela importação em lote e pela API. Retorna
+    um RegistroPaciente pronto para o INSERT ou levanta ValueError.
+    """
+    if isinstance(registro, RegistroPaciente):
+        itens = [(coluna, getattr(registro, coluna)) for coluna in COLUNAS_GRAVADAS]
+    else:
+        invalid_columns = set(registro) - set(COLUNAS_GRAVADAS)
+        if invalid_columns:
+            raise ValueError(f"Colunas inválidas: {invalid_columns}")
+        itens = registro.items()
+    
+    # Colunas não preenchidas ficam com o padrão (motivos não marcados = 0)
+    validado = RegistroPaciente()
+    for coluna, valor in itens:
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor is None or valor == '':
+            continue
+        
+        tipo = TIPOS_COLUNAS[coluna]
+        if isinstance(valor, bool) and tipo in ('flag', 'sim_nao'):
+            # true/false de JSON
+            valor = 's' if valor else 'n'
+        if tipo in ('texto', 'categoria'):
+            setattr(validado, coluna, str(valor))
+            continue
+        min_val, max_val = LIMITES.get(coluna, (None, None))
+        try:
+            setattr(validado, coluna, converter_valor(str(valor), tipo, min_val, max_val))
+        except ValueError as erro:
+            raise ValueError(f"{coluna}: {erro}")
+    
+    for campo in CAMPOS_OBRIGATORIOS:
+        if not getattr(validado, campo):
+            raise ValueError(f"{campo}: Este campo é obrigatório!")
+    for campo in CAMPOS_CONDICIONAIS:
+        if not campo_aplicavel(campo, validado):
+            setattr(validado, campo, None)
+    return validado
+
+
+# Prefixos de cada palavra do nome guardados no índice cego de busca
+# (de MINIMO a MAXIMO letras); palavras mais curtas não entram no índice
+PREFIXO_CEGO_MINIMO = 3
+PREFIXO_CEGO_MAXIMO = 4
+# Iterações do PBKDF2 que deriva a chave dos campos a partir da senha
+ITERACOES_CHAVE = 600000
+
+
+class CifraCampos:
+    """Cifragem dos campos marcados com cifrado=True em FORMULARIO
+    
+    Usa AES-256-GCM (pacote cryptography) com nonce aleatório de 96 bits.
+    Os campos cifrados de um registro são cifrados juntos, em um único
+    BLOB gravado em dados_cifrados (cifrar_linha), com a versão e a lista
+    das colunas como dado associado; as colunas dos campos guardam apenas
+    OCULTO. Ler um registro custa então uma decifragem, e não uma por campo.
+    As respostas dos rascunhos, gravadas campo a campo, são cifradas uma a
+    uma (cifrar), com a versão e o nome da coluna como dado associado. Em
+    ambos os casos alterar um byte, trocar o valor de coluna ou usar outra
+    chave faz a decifragem falhar com ValueError. O BLOB não inclui o id do
+    registro: quem grava no banco ainda pode trocar dados_cifrados inteiros
+    entre dois registros.
+    
+    As chaves (AES e índice cego) são derivadas da chave mestra uma única
+    vez, com HMAC-SHA256 e rótulos distintos; o objeto AESGCM guarda a
+    expansão da chave, reaproveitada em todas as operações.
+    
+    Os índices cegos são BLAKE2b com chave (um MAC, RFC 7693): o mesmo CPF
+    gera sempre o mesmo valor, então a comparação por igualdade continua
+    usando índice, mas sem a chave não é possível testar CPFs candidatos.
+    """
+    
+    # Primeiro byte do BLOB: valor de uma coluna, registro com os valores
+    # separados por SEPARADOR, ou registro em JSON (algum valor contém os
+    # caracteres de controle usados como separador e como nulo)
+    VERSAO = b'\x02'
+    VERSAO_LINHA = b'\x03'
+    VERSAO_JSON = b'\x04'
+    TAMANHO_NONCE = 12
+    SEPARADOR = '\x1f'
+    NULO = '\x1e'
+    # Conteúdo das colunas dos campos cifrados (NOT NULL é respeitado e não
+    # se revela quais campos estão preenchidos)
+    OCULTO = b''
+    
+    def __init__(self, chave):
+        if AESGCM is None:
+            raise ValueError("A cifragem dos campos requer o pacote cryptography (pip install cryptography)")
+        
+        def derivar(rotulo):
+            return hmac.new(chave, rotulo, hashlib.sha256).digest()
+        
+        self.aead = AESGCM(derivar(b'aes-256-gcm'))
+        self.indice = hashlib.blake2b(key=derivar(b'indice'), digest_size=16)
+        # Dados associados já codificados, por (versão, colunas)
+        self.associados = {}
+    
+    @classmethod
+    def de_senha(cls, senha, sal, iteracoes=ITERACOES_CHAVE):
+        """Deriva a chave da senha com PBKDF2-HMAC-SHA256"""
+        return cls(hashlib.pbkdf2_hmac('sha256', senha.encode('utf-8'), sal, iteracoes))
+    
+    def verificador(self):
+        """Valor gravado no banco para conferir a chave ao abrir"""
+        return self.indice_cego('verificador', 'formulario_diu')
+    
+    def associado(self, versao, colunas):
+        """Dado associado: a versão e o nome da coluna (str) ou a lista de colunas (tupla)"""
+        dado = self.associados.get((versao, colunas))
+        if dado is None:
+            texto = colunas if isinstance(colunas, str) else self.SEPARADOR.join(colunas)
+            dado = self.associados[versao, colunas] = versao + texto.encode('utf-8')
+        return dado
+    
+    def cifrar(self, coluna, valor):
+        """Cifra o valor de uma coluna (None continua None)"""
+        if valor is None:
+            return None
+        nonce = os.urandom(self.TAMANHO_NONCE)
+        return self.VERSAO + nonce + self.aead.encrypt(nonce, str(valor).encode('utf-8'),
+                                                              self.associado(self.VERSAO, coluna))
+    
+    def decifrar(self, coluna, valor):
+        """Decifra o valor de uma coluna
+        
+        Valores que não são BLOB (None, ou gravados antes da cifragem) são
+        devolvidos como estão. Levanta ValueError se o valor foi alterado,
+        é de outra coluna ou a chave está incorreta.
+        """
+        if not isinstance(valor, bytes):
+            return valor
+        inicio = 1 + self.TAMANHO_NONCE
+        try:
+            if valor[:1] != self.VERSAO:
+                raise InvalidTag
+            associado = self.associado(self.VERSAO, coluna)
+            return self.aead.decrypt(valor[1:inicio], valor[inicio:], associado).decode('utf-8')
+        except InvalidTag:
+            raise ValueError(f"{coluna}: valor cifrado inválido ou chave incorreta") from None
+    
+    def cifrar_linha(self, valores, colunas=None):
+        """Cifra juntos os valores de um registro, na ordem de colunas
+        
+        colunas é por padrão ORDEM_CIFRADA. Os valores são gravados como
+        texto (None continua None).
+        """
+        if colunas is None:
+            colunas = ORDEM_CIFRADA
+        textos = [self.NULO if valor is None else str(valor) for valor in valores]
+        texto = self.SEPARADOR.join(textos)
+        if texto.count(self.SEPARADOR) != len(textos) - 1 or texto.count(self.NULO) != valores.count(None):
+            versao = self.VERSAO_JSON
+            texto = json.dumps([None if valor is None else str(valor) for valor in valores])
+        else:
+            versao = self.VERSAO_LINHA
+        nonce = os.urandom(self.TAMANHO_NONCE)
+        return versao + nonce + self.aead.encrypt(nonce, texto.encode('utf-8'), self.associado(versao, colunas))
+    
+    def decifrar_linha(self, valor, colunas=None):
+        """Lista dos valores de um BLOB de cifrar_linha, na ordem de colunas
+        
+        Levanta ValueError se o BLOB foi alterado, foi gravado com outra
+        lista de colunas ou a chave está incorreta.
+        """
+        if colunas is None:
+            colunas = ORDEM_CIFRADA
+        inicio = 1 + self.TAMANHO_NONCE
+        versao = valor[:1]
+        try:
+            if versao not in (self.VERSAO_LINHA, self.VERSAO_JSON):
+                raise InvalidTag
+            associado = self.associado(versao, colunas)
+            texto = self.aead.decrypt(valor[1:inicio], valor[inicio:], associado).decode('utf-8')
+        except InvalidTag:
+            raise ValueError("dados_cifrados: valor cifrado inválido ou chave incorreta") from None
+        if versao == self.VERSAO_JSON:
+            return json.loads(texto)
+        return [None if texto == self.NULO else texto for texto in texto.split(self.SEPARADOR)]
+    
+    def decifrar_lote(self, linhas, colunas):
+        """Preenche as colunas cifradas de um lote de linhas lidas do banco
+        
+        colunas é o nome da coluna em cada posição das linhas. Se alguma é
+        de COLUNAS_CIFRADAS, cada linha traz dados_cifrados como último
+        valor (ver FormularioDIU.colunas_consulta); ele é decifrado e
+        removido. Linhas sem dados_cifrados (gravadas antes da cifragem)
+        ficam como estão. O caso comum é decifrado aqui mesmo, sem as
+        chamadas de decifrar_linha.
+        """
+        posicoes = [(i, ORDEM_CIFRADA.index(coluna)) for i, coluna in enumerate(colunas)
+                    if coluna in COLUNAS_CIFRADAS]
+        if not posicoes:
+            return linhas
+        decrypt, associado = self.aead.decrypt, self.associado(self.VERSAO_LINHA, ORDEM_CIFRADA)
+        versao, inicio, separador, nulo = self.VERSAO_LINHA, 1 + self.TAMANHO_NONCE, self.SEPARADOR, self.NULO
+        resultado = []
+        try:
+            for linha in linhas:
+                *linha, dados = linha
+                if dados is None:
+                    pass
+                elif dados[:1] == versao:
+                    valores = decrypt(dados[1:inicio], dados[inicio:], associado).decode('utf-8').split(separador)
+                    for i, j in posicoes:
+                        valor = valores[j]
+                        linha[i] = None if valor == nulo else valor
+                else:
+                    valores = self.decifrar_linha(dados)
+                    for i, j in posicoes:
+                        linha[i] = valores[j]
+                resultado.append(tuple(linha))
+        except InvalidTag:
+            raise ValueError("dados_cifrados: valor cifrado inválido ou chave incorreta") from None
+        return resultado
+    
+    def indice_cego(self, rotulo, valor):
+        """Hash com chave de um valor normalizado (None se vazio)"""
+        if not valor:
+            return None
+        h = self.indice.copy()
+        h.update(rotulo.encode('utf-8') + b'\x00' + valor.encode('utf-8'))
+        return h.hexdigest()
+    
+    def tokens_nome(self, nome):
+        """Valor de nome_normalizado em banco cifrado
+        
+        O hash do nome normalizado inteiro (igualdade, usada na verificação
+        de duplicidade) seguido dos hashes, em ordem, dos prefixos de
+        PREFIXO_CEGO_MINIMO a PREFIXO_CEGO_MAXIMO letras de cada palavra
+        (busca por prefixo). Os hashes são truncados (64 bits o do nome, 48
+        os dos prefixos): o valor entra em dois índices e no FTS, e o
+        tamanho pesa em cada inserção.
+        """
+        normalizado = normalizar_texto(nome)
+        if not normalizado:
+            return normalizado
+        prefixos = {palavra[:n] for palavra in normalizado.split()
+                    for n in range(PREFIXO_CEGO_MINIMO, min(len(palavra), PREFIXO_CEGO_MAXIMO) + 1)}
+        tokens = sorted(self.indice_cego('prefixo', prefixo)[:12] for prefixo in prefixos)
+        return ' '.join([self.token_nome(normalizado)] + tokens)
+    
+    def token_nome(self, normalizado):
+        """Token do índice cego do nome normalizado inteiro"""
+        return self.indice_cego('nome', normalizado)[:16]
+    
+    def token_busca(self, palavra):
+        """Token do índice cego dos nomes com uma palavra começando por palavra
+        
+        None se a palavra for curta demais para o índice.
+        """
+        if len(palavra) < PREFIXO_CEGO_MINIMO:
+            return None
+        return self.indice_cego('prefixo', palavra[:PREFIXO_CEGO_MAXIMO])[:12]
+
+
+def chaves_indice(registro, cifra=None):
+    """Valores de nome_normalizado, cpf_normalizado e sus_normalizado de um registro
+    
+    Com cifra, são os índices cegos no lugar do nome e dos documentos.
+    """
+    nome = registro.get('nome_completo')
+    cpf = normalizar_documento(registro.get('cpf'))
+    sus = normalizar_documento(registro.get('sus'))
+    if cifra is None:
+        return [normalizar_texto(nome), cpf, sus]
+    return [cifra.tokens_nome(nome), cifra.indice_cego('cpf', cpf), cifra.indice_cego('sus', sus)]
+
+
+def interpretar_numero(valor):
+    """Converte um valor gravado em coluna numérica em int (None se não for inteiro)"""
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def interpretar_decimal(valor):
+    """Converte um valor gravado em coluna decimal em float (None se inválido)
+    
+    Aceita vírgula decimal, comum em valores antigos digitados à mão.
+    """
+    if isinstance(valor, str):
+        valor = valor.strip().replace(',', '.')
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+# Conversão dos valores gravados no banco para o tipo lógico (análise)
+# Valores antigos que não podem ser convertidos viram None (ausentes)
+CONVERSORES_SAIDA = {
+    'flag': lambda v: None if v is None else bool(v),
+    'sim_nao': lambda v: None if v is None else v == 's',
+    'data': interpretar_data,
+    'timestamp': interpretar_timestamp,
+    'decimal': interpretar_decimal,
+    'numero': interpretar_numero,
+}
+
+
+def converter_coluna(tipo, valores, coluna=None, descartados=None):
+    """Converte os valores de uma coluna lidos do SQLite para o tipo lógico
+    
+    Com descartados (dicionário), conta em descartados[coluna] os valores
+    preenchidos que não puderam ser convertidos e viraram None.
+    """
+    conversor = CONVERSORES_SAIDA.get(tipo)
+    if conversor is None:
+        return list(valores)
+    convertidos = [conversor(v) for v in valores]
+    if descartados is not None:
+        invalidos = sum(1 for v, c in zip(valores, convertidos) if c is None and v not in (None, ''))
+        if invalidos:
+            descartados[coluna] = descartados.get(coluna, 0) + invalidos
+    return convertidos
+
+
+# Configuração das conexões com o banco
+# WAL permite que leitores e o escritor trabalhem ao mesmo tempo; leitores é o
+# número máximo de conexões somente leitura mantidas no pool (0 desativa).
+CONFIGURACAO_PADRAO = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'leitores': 4,
+    # Instruções SQL que levarem mais que isto (ms) são registradas como lentas,
+    # com o plano de execução; None desliga as medições
+    'consulta_lenta_ms': 100,
+}
+
+
+# Limites (ms) das faixas do histograma de duração das instruções; a última
+# faixa conta o que passar do maior limite
+FAIXAS_HISTOGRAMA_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Instruções distintas acompanhadas; as demais são somadas em OUTRAS_INSTRUCOES
+MAXIMO_INSTRUCOES = 500
+OUTRAS_INSTRUCOES = '(outras instruções)'
+# Operações lentas mantidas em memória para o diagnóstico
+MAXIMO_LENTAS = 50
+# Instruções para as quais EXPLAIN QUERY PLAN faz sentido
+INSTRUCOES_COM_PLANO = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+@functools.lru_cache(maxsize=1024)
+def chave_instrucao(sql):
+    """Normaliza o SQL para agrupar as medições (espaços e listas de ?)"""
+    return re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', ' '.join(sql.split()))
+
+
+def plano_consulta(conexao, sql, parametros):
+    """Plano de execução de uma instrução, ou None se não houver como obter"""
+    if not sql.lstrip().upper().startswith(INSTRUCOES_COM_PLANO):
+        return None
+    try:
+        # Cursor comum: a consulta do plano não entra nas medições
+        cursor = sqlite3.Cursor(conexao)
+        try:
+            return [linha[3] for linha in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+        finally:
+            cursor.close()
+    except sqlite3.Error:
+        return None
+
+
+def percentil_histograma(histograma, fracao, maximo):
+    """Estima um percentil pelo limite superior da faixa do histograma"""
+    alvo = sum(histograma) * fracao
+    acumulado = 0
+    for faixa, quantidade in enumerate(histograma):
+        acumulado += quantidade
+        if quantidade and acumulado >= alvo:
+            return min(FAIXAS_HISTOGRAMA_MS[faixa], maximo) if faixa < len(FAIXAS_HISTOGRAMA_MS) else maximo
+    return maximo
+
+
+class MetricasBanco:
+    """Tempos, linhas e histogramas por instrução SQL
+    
+    Compartilhada por todas as conexões do app (escrita e pool de leitura,
+    inclusive nas threads do servidor). As instruções são agrupadas pelo
+    texto normalizado; os valores dos parâmetros nunca são guardados, pois
+    podem conter dados das pacientes. Instruções acima de limite_lento_ms
+    vão para a lista de lentas com o plano de execução e, se informado,
+    para arquivo_lentas (uma linha JSON por ocorrência).
+    """
+    
+    def __init__(self, limite_lento_ms=100, arquivo_lentas=None):
+        self.limite_lento_ms = limite_lento_ms
+        self.arquivo_lentas = arquivo_lentas
+        self.inicio = datetime.now()
+        self.trava = threading.Lock()
+        # chave normalizada -> [chamadas, linhas, total_ms, max_ms, histograma, erros, lentas]
+        self.instrucoes = {}
+        # SQL como executado -> mesma lista, para não normalizar a cada execução
+        self.por_sql = {}
+        self.lentas = collections.deque(maxlen=MAXIMO_LENTAS)
+    
+    def medidas(self, sql):
+        """Lista de medidas da instrução, criada na primeira execução"""
+        medidas = self.por_sql.get(sql)
+        if medidas is None:
+            chave = chave_instrucao(sql)
+            with self.trava:
+                if chave not in self.instrucoes and len(self.instrucoes) >= MAXIMO_INSTRUCOES:
+                    chave = OUTRAS_INSTRUCOES
+                medidas = self.instrucoes.setdefault(
+                    chave, [0, 0, 0.0, 0.0, [0] * (len(FAIXAS_HISTOGRAMA_MS) + 1), 0, 0])
+                if len(self.por_sql) < MAXIMO_INSTRUCOES * 4:
+                    self.por_sql[sql] = medidas
+        return medidas
+    
+    def registrar(self, sql, segundos, linhas, conexao=None, parametros=None):
+        """Soma uma execução às medidas da instrução"""
+        medidas = self.medidas(sql)
+        ms = segundos * 1000
+        with self.trava:
+            medidas[0] += 1
+            medidas[1] += linhas
+            medidas[2] += ms
+            if ms > medidas[3]:
+                medidas[3] = ms
+            medidas[4][bisect.bisect_left(FAIXAS_HISTOGRAMA_MS, ms)] += 1
+        if ms >= self.limite_lento_ms:
+            plano = None
+            if conexao is not None and parametros is not None:
+                plano = plano_consulta(conexao, sql, parametros)
+            self.registrar_lenta(sql, medidas, ms, linhas, plano)
+    
+    def registrar_erro(self, sql):
+        """Conta uma execução que terminou em erro"""
+        medidas = self.medidas(sql)
+        with self.trava:
+            medidas[5] += 1
+    
+    def registrar_lenta(self, sql, medidas, ms, linhas, plano):
+        """Guarda uma operação lenta na memória e no arquivo de lentas"""
+        ocorrencia = {'quando': datetime.now().isoformat(timespec='seconds'), 'sql': chave_instrucao(sql),
+                      'ms': round(ms, 3), 'linhas': linhas, 'plano': plano}
+        with self.trava:
+            medidas[6] += 1
+            self.lentas.append(ocorrencia)
+            if self.arquivo_lentas:
+                try:
+                    with open(self.arquivo_lentas, 'a', encoding='utf-8') as arquivo:
+                        arquivo.write(json.dumps(ocorrencia, ensure_ascii=False) + '\n')
+                except OSError:
+                    pass
+    
+    def como_dicionario(self):
+        """Contadores e histogramas em um dicionário pronto para JSON
+        
+        As instruções vêm da que consumiu mais tempo para a que consumiu
+        menos; p50_ms e p99_ms são estimados pelo limite da faixa do
+        histograma.
+        """
+        with self.trava:
+            instrucoes = [
+                {'sql': sql, 'chamadas': chamadas, 'erros': erros, 'linhas': linhas, 'total_ms': total,
+                 'max_ms': maximo, 'lentas': lentas, 'histograma': list(histograma)}
+                for sql, (chamadas, linhas, total, maximo, histograma, erros, lentas) in self.instrucoes.items()
+            ]
+            lentas = list(self.lentas)
+        for medidas in instrucoes:
+            medidas['media_ms'] = medidas['total_ms'] / medidas['chamadas'] if medidas['chamadas'] else 0.0
+            medidas['p50_ms'] = percentil_histograma(medidas['histograma'], 0.5, medidas['max_ms'])
+            medidas['p99_ms'] = percentil_histograma(medidas['histograma'], 0.99, medidas['max_ms'])
+        instrucoes.sort(key=lambda medidas: medidas['total_ms'], reverse=True)
+        return {
+            'desde': self.inicio.isoformat(timespec='seconds'),
+            'limite_lento_ms': self.limite_lento_ms,
+            'faixas_histograma_ms': list(FAIXAS_HISTOGRAMA_MS),
+            'totais': {campo: sum(medidas[campo] for medidas in instrucoes)
+                       for campo in ('chamadas', 'erros', 'linhas', 'total_ms', 'lentas')},
+            'instrucoes': instrucoes,
+            'lentas': lentas,
+        }
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que mede cada instrução em connection.metricas
+    
+    O tempo de uma consulta soma o execute e as leituras das linhas
+    (fetchone/fetchmany/fetchall ou iteração), sem contar o que o chamador
+    faz entre elas. A medição é fechada quando as linhas acabam, no
+    próximo execute, no close() ou quando o cursor é descartado; instruções
+    sem linhas de resultado contam as linhas alteradas.
+    """
+    
+    # [sql, parâmetros, segundos, linhas] da consulta cujas linhas ainda estão sendo lidas
+    medicao = None
+    
+    def concluir(self):
+        """Registra a medição em andamento, se houver"""
+        medicao, self.medicao = self.medicao, None
+        metricas = self.connection.metricas
+        if medicao is not None and metricas is not None:
+            sql, parametros, segundos, linhas = medicao
+            metricas.registrar(sql, segundos, linhas, self.connection, parametros)
+    
+    def contar(self, inicio, linhas, fim):
+        """Soma uma leitura de linhas à medição em andamento"""
+        medicao = self.medicao
+        if medicao is not None:
+            medicao[2] += time.perf_counter() - inicio
+            medicao[3] += linhas
+            if fim:
+                self.concluir()
+    
+    def medir(self, sql, parametros, inicio):
+        """Abre a medição de uma consulta ou registra uma instrução sem linhas de resultado"""
+        segundos = time.perf_counter() - inicio
+        if self.description is not None:
+            self.medicao = [sql, parametros, segundos, 0]
+            return
+        metricas = self.connection.metricas
+        if metricas is not None:
+            metricas.registrar(sql, segundos, max(self.rowcount, 0), self.connection, parametros)
+    
+    def falhou(self, sql):
+        metricas = self.connection.metricas
+        if metricas is not None:
+            metricas.registrar_erro(sql)
+    
+    def execute(self, sql, parametros=()):
+        if self.medicao is not None:
+            self.concluir()
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parametros)
+        except sqlite3.Error:
+            self.falhou(sql)
+            raise
+        self.medir(sql, parametros, inicio)
+        return self
+    
+    def executemany(self, sql, parametros):
+        if self.medicao is not None:
+            self.concluir()
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, parametros)
+        except sqlite3.Error:
+            self.falhou(sql)
+            raise
+        # Sem plano: não há um conjunto de parâmetros que represente o lote
+        self.medir(sql, None, inicio)
+        return self
+    
+    def executescript(self, script):
+        if self.medicao is not None:
+            self.concluir()
+        inicio = time.perf_counter()
+        try:
+            super().executescript(script)
+        except sqlite3.Error:
+            self.falhou(script)
+            raise
+        self.medir(script, None, inicio)
+        return self
+    
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = super().fetchone()
+        self.contar(inicio, linha is not None, linha is None)
+        return linha
+    
+    def fetchmany(self, size=None):
+        tamanho = self.arraysize if size is None else size
+        inicio = time.perf_counter()
+        linhas = super().fetchmany(tamanho)
+        self.contar(inicio, len(linhas), len(linhas) < tamanho or not linhas)
+        return linhas
+    
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = super().fetchall()
+        self.contar(inicio, len(linhas), True)
+        return linhas
+    
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            linha = super().__next__()
+        except StopIteration:
+            self.contar(inicio, 0, True)
+            raise
+        self.contar(inicio, 1, False)
+        return linha
+    
+    def close(self):
+        self.concluir()
+        super().close()
+    
+    def __del__(self):
+        try:
+            self.concluir()
+        except sqlite3.Error:
+            pass
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos cursores, inclusive os de conn.execute, medem as instruções
+    
+    metricas recebe o MetricasBanco do app depois do connect; os commits
+    também são medidos.
+    """
+    
+    metricas = None
+    
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parametros=()):
+        return super().cursor(CursorInstrumentado).execute(sql, parametros)
+    
+    def executemany(self, sql, parametros):
+        return super().cursor(CursorInstrumentado).executemany(sql, parametros)
+    
+    def executescript(self, script):
+        return super().cursor(CursorInstrumentado).executescript(script)
+    
+    def commit(self):
+        inicio = time.perf_counter()
+        super().commit()
+        if self.metricas is not None:
+            self.metricas.registrar('COMMIT', time.perf_counter() - inicio, 0)
+
+
+def sql_tabela_pacientes():
+    """CREATE TABLE da tabela de pacientes, gerado a partir de FORMULARIO"""
+    linhas = ["id INTEGER PRIMARY KEY AUTOINCREMENT,"]
+    for titulo, _, campos in FORMULARIO:
+        linhas.append(f"-- {titulo}")
+        linhas.extend(f"{campo.nome} {campo.tipo_sql()}," for campo in campos)
+    linhas.append("data_registro TEXT DEFAULT CURRENT_TIMESTAMP")
+    return "CREATE TABLE IF NOT EXISTS pacientes (\n    " + "\n    ".join(linhas) + "\n)"
+
+
+def migracao_tabela_pacientes(cursor):
+    """Cria a tabela de pacientes"""
+    cursor.execute(sql_tabela_pacientes())
+
+
+def migracao_busca_por_nome(cursor, tamanho_lote=1000):
+    """Cria a coluna de nome normalizado e o índice de busca por nome
+    
+    O índice FTS5 (sem acentos, por palavra) é mantido sincronizado por
+    triggers. Se o SQLite não tiver FTS5, a busca usa apenas a coluna
+    normalizada.
+    """
+    cursor.execute("PRAGMA table_info(pacientes)")
+    colunas = [col[1] for col in cursor.fetchall()]
+    if 'nome_normalizado' not in colunas:
+        cursor.execute("ALTER TABLE pacientes ADD COLUMN nome_normalizado TEXT")
+    
+    # Preencher registros antigos em lotes
+    ultimo_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, nome_completo FROM pacientes
+            WHERE id > ? AND nome_normalizado IS NULL
+            ORDER BY id
+            LIMIT ?
+        ''', (ultimo_id, tamanho_lote))
+        pendentes = cursor.fetchall()
+        if not pendentes:
+            break
+        cursor.executemany(
+            "UPDATE pacientes SET nome_normalizado = ? WHERE id = ?",
+            [(normalizar_texto(nome), id_registro) for id_registro, nome in pendentes]
+        )
+        ultimo_id = pendentes[-1][0]
+    
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_nome_normalizado ON pacientes (nome_normalizado)"
+    )
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pacientes_busca'")
+    if cursor.fetchone():
+        return
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE pacientes_busca USING fts5(
+                nome_normalizado,
+                content='pacientes',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite compilado sem FTS5
+        return
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pacientes_busca_ai AFTER INSERT ON pacientes BEGIN
+            INSERT INTO pacientes_busca (rowid, nome_normalizado)
+            VALUES (new.id, new.nome_normalizado);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pacientes_busca_ad AFTER DELETE ON pacientes BEGIN
+            INSERT INTO pacientes_busca (pacientes_busca, rowid, nome_normalizado)
+            VALUES ('delete', old.id, old.nome_normalizado);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pacientes_busca_au AFTER UPDATE OF nome_normalizado ON pacientes BEGIN
+            INSERT INTO pacientes_busca (pacientes_busca, rowid, nome_normalizado)
+            VALUES ('delete', old.id, old.nome_normalizado);
+            INSERT INTO pacientes_busca (rowid, nome_normalizado)
+            VALUES (new.id, new.nome_normalizado);
+        END
+    ''')
+    cursor.execute("INSERT INTO pacientes_busca (pacientes_busca) VALUES ('rebuild')")
+
+
+def migracao_indices_consulta(cursor):
+    """Cria índices para as consultas frequentes"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_cpf ON pacientes (cpf)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_sus ON pacientes (sus)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_data_registro ON pacientes (data_registro)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_local_atendimento ON pacientes (local_atendimento)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_data_insercao ON pacientes (data_insercao)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_data_primeira_revisao ON pacientes (data_primeira_revisao)"
+    )
+
+
+def migracao_datas_iso(cursor):
+    """Prepara a conversão das datas para AAAA-MM-DD
+    
+    A conversão dos registros existentes é feita depois, em lotes, por
+    FormularioDIU.normalizar_datas, que guarda o progresso em
+    tarefas_manutencao para poder ser retomada.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tarefas_manutencao (
+            nome TEXT PRIMARY KEY,
+            ultimo_id INTEGER DEFAULT 0,
+            concluida INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO tarefas_manutencao (nome) VALUES ('normalizar_datas')")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_local_data_insercao "
+        "ON pacientes (local_atendimento, data_insercao)"
+    )
+
+
+def migracao_indices_navegacao(cursor):
+    """Cria índices para a navegação paginada por DIU e por data de inserção"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_diu_escolhido ON pacientes (diu_escolhido)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_diu_data_insercao "
+        "ON pacientes (diu_escolhido, data_insercao)"
+    )
+
+
+# Dimensões das estatísticas mensais: (dimensão, expressão do valor, condição)
+# {r} é substituído pelo registro (new/old nos triggers, p na reconstrução)
+DIMENSOES_ESTATISTICAS = [
+    ('total', "''", "1"),
+    ('diu_escolhido', "{r}.diu_escolhido", "1"),
+] + [
+    ('motivo', f"'{coluna}'", f"{{r}}.{coluna} = 1") for coluna in COLUNAS_MOTIVO
+] + [
+    ('dificuldade_insercao', "{r}.dificuldade_insercao", "1"),
+    ('dor_momento', "{r}.dor_momento", "1"),
+    ('inserido_por', "{r}.inserido_por", "1"),
+]
+
+
+# Colunas lidas pelas estatísticas (atualizações em outras colunas não as afetam)
+COLUNAS_ESTATISTICAS = [
+    'data_insercao', 'diu_escolhido', 'dificuldade_insercao', 'dor_momento', 'inserido_por',
+    'dor_nota', 'insercao_resultado',
+] + COLUNAS_MOTIVO
+
+
+def sql_valores_estatisticas(r, sinal='+'):
+    """Expressões SQL (mês, contadores) de um registro para as estatísticas
+    
+    Inserção bem-sucedida: resultado informado, diferente de "não realizada"
+    e sem "não foi possível inserir" na dificuldade.
+    """
+    mes = (f"CASE WHEN {r}.data_insercao GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' "
+           f"THEN substr({r}.data_insercao, 1, 7) ELSE '' END")
+    tentativa = f"({r}.insercao_resultado IS NOT NULL)"
+    sucesso = (f"({r}.insercao_resultado IS NOT NULL "
+               f"AND {r}.insercao_resultado NOT LIKE 'n%o realizada' "
+               f"AND COALESCE({r}.dificuldade_insercao, '') NOT LIKE 'n%o foi poss%vel inserir')")
+    contadores = [
+        f"{sinal}1",
+        f"{sinal}{tentativa}",
+        f"{sinal}{sucesso}",
+        f"{sinal}COALESCE({r}.dor_nota, 0)",
+        f"{sinal}({r}.dor_nota IS NOT NULL)",
+    ]
+    return mes, contadores
+
+
+def sql_atualizar_estatisticas(r, sinal):
+    """Comandos que somam (sinal '+') ou subtraem ('-') um registro das estatísticas"""
+    mes, contadores = sql_valores_estatisticas(r, sinal)
+    comandos = []
+    for dimensao, valor, condicao in DIMENSOES_ESTATISTICAS:
+        comandos.append(f'''
+            INSERT INTO estatisticas_mensais
+                (mes, dimensao, valor, total, tentativas, sucesso, soma_dor, qtd_dor)
+            SELECT {mes}, '{dimensao}', COALESCE({valor.format(r=r)}, ''), {', '.join(contadores)}
+            WHERE {condicao.format(r=r)}
+            ON CONFLICT (mes, dimensao, valor) DO UPDATE SET
+                total = total + excluded.total,
+                tentativas = tentativas + excluded.tentativas,
+                sucesso = sucesso + excluded.sucesso,
+                soma_dor = soma_dor + excluded.soma_dor,
+                qtd_dor = qtd_dor + excluded.qtd_dor;
+        ''')
+    return ''.join(comandos)
+
+
+def sql_calcular_estatisticas():
+    """Consulta que calcula as estatísticas mensais do zero, a partir de pacientes"""
+    mes, contadores = sql_valores_estatisticas('p', sinal='')
+    somas = ', '.join(f"SUM({contador})" for contador in contadores)
+    partes = []
+    for dimensao, valor, condicao in DIMENSOES_ESTATISTICAS:
+        partes.append(f'''
+            SELECT {mes} AS mes, '{dimensao}' AS dimensao, COALESCE({valor.format(r='p')}, '') AS valor,
+                   {somas}
+            FROM pacientes p
+            WHERE {condicao.format(r='p')}
+            GROUP BY 1, 3
+        ''')
+    return ' UNION ALL '.join(partes)
+
+
+def sql_gatilhos_estatisticas():
+    """Triggers que mantêm estatisticas_mensais: {nome: CREATE TRIGGER}
+    
+    O texto é o que o SQLite guarda em sqlite_master (sem espaços no
+    início nem IF NOT EXISTS), para comparar com os triggers do banco.
+    """
+    return {
+        'estatisticas_ai': (f"CREATE TRIGGER estatisticas_ai AFTER INSERT ON pacientes BEGIN"
+                            f"{sql_atualizar_estatisticas('new', '+')}END"),
+        'estatisticas_ad': (f"CREATE TRIGGER estatisticas_ad AFTER DELETE ON pacientes BEGIN"
+                            f"{sql_atualizar_estatisticas('old', '-')}END"),
+        'estatisticas_au': (f"CREATE TRIGGER estatisticas_au AFTER UPDATE OF {', '.join(COLUNAS_ESTATISTICAS)} "
+                            f"ON pacientes BEGIN{sql_atualizar_estatisticas('old', '-')}"
+                            f"{sql_atualizar_estatisticas('new', '+')}END"),
+    }
+
+
+def criar_gatilhos_estatisticas(cursor):
+    """Recria os triggers das estatísticas se diferirem dos gerados por FORMULARIO
+    
+    DIMENSOES_ESTATISTICAS e COLUNAS_ESTATISTICAS saem dos campos (um
+    motivo novo é uma dimensão nova), mas os triggers ficam gravados no
+    banco. Quando mudam, os triggers são recriados e estatisticas_mensais
+    é recalculada. Retorna True se recriou.
+    """
+    gatilhos = sql_gatilhos_estatisticas()
+    marcadores = ', '.join('?' * len(gatilhos))
+    cursor.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({marcadores})",
+                   tuple(gatilhos))
+    if dict(cursor.fetchall()) == gatilhos:
+        return False
+    for nome, sql in gatilhos.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        cursor.execute(sql)
+    cursor.execute("DELETE FROM estatisticas_mensais")
+    cursor.execute(f"INSERT INTO estatisticas_mensais {sql_calcular_estatisticas()}")
+    return True
+
+
+def migracao_estatisticas(cursor):
+    """Cria a tabela de estatísticas mensais, mantida por triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estatisticas_mensais (
+            mes TEXT NOT NULL,
+            dimensao TEXT NOT NULL,
+            valor TEXT NOT NULL,
+            total INTEGER DEFAULT 0,
+            tentativas INTEGER DEFAULT 0,
+            sucesso INTEGER DEFAULT 0,
+            soma_dor INTEGER DEFAULT 0,
+            qtd_dor INTEGER DEFAULT 0,
+            PRIMARY KEY (mes, dimensao, valor)
+        ) WITHOUT ROWID
+    ''')
+    criar_gatilhos_estatisticas(cursor)
+
+
+def migracao_rascunhos(cursor):
+    """Cria as tabelas de rascunhos do formulário
+    
+    Cada resposta é uma linha nova em rascunho_respostas (só INSERT), então
+    o salvamento automático é uma gravação pequena por pergunta.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rascunhos (
+            id INTEGER PRIMARY KEY,
+            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rascunho_respostas (
+            rascunho INTEGER NOT NULL,
+            campo TEXT NOT NULL,
+            valor,
+            respondido_em TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_rascunho_respostas_rascunho ON rascunho_respostas (rascunho)"
+    )
+
+
+def migracao_duplicidades(cursor, tamanho_lote=1000):
+    """Cria as chaves usadas para encontrar pacientes registradas mais de uma vez
+    
+    CPF e SUS são comparados só pelos dígitos (cpf_normalizado,
+    sus_normalizado); nome e data de nascimento pelo índice
+    (data_nascimento, nome_normalizado), que também ordena os blocos da
+    busca de duplicados em lote.
+    """
+    cursor.execute("PRAGMA table_info(pacientes)")
+    colunas = [col[1] for col in cursor.fetchall()]
+    for coluna in ('cpf_normalizado', 'sus_normalizado'):
+        if coluna not in colunas:
+            cursor.execute(f"ALTER TABLE pacientes ADD COLUMN {coluna} TEXT")
+    
+    # Preencher registros antigos em lotes
+    ultimo_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, cpf, sus FROM pacientes
+            WHERE id > ? AND (cpf IS NOT NULL OR sus IS NOT NULL)
+            ORDER BY id
+            LIMIT ?
+        ''', (ultimo_id, tamanho_lote))
+        pendentes = cursor.fetchall()
+        if not pendentes:
+            break
+        cursor.executemany(
+            "UPDATE pacientes SET cpf_normalizado = ?, sus_normalizado = ? WHERE id = ?",
+            [(normalizar_documento(cpf), normalizar_documento(sus), id_registro)
+             for id_registro, cpf, sus in pendentes]
+        )
+        ultimo_id = pendentes[-1][0]
+    
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_cpf_normalizado ON pacientes (cpf_normalizado)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_sus_normalizado ON pacientes (sus_normalizado)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pacientes_nascimento_nome "
+        "ON pacientes (data_nascimento, nome_normalizado)"
+    )
+
+
+def migracao_cifragem(cursor):
+    """Cria a tabela com os parâmetros da cifragem dos campos identificadores
+    
+    A tabela fica vazia enquanto a cifragem não for ativada
+    (FormularioDIU.ativar_cifragem); a conversão dos registros existentes é
+    uma tarefa de manutenção retomável, como a das datas.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cifragem (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            sal BLOB NOT NULL,
+            iteracoes INTEGER NOT NULL,
+            verificador TEXT NOT NULL
+        )
+    ''')
+    cursor.execute(
+        "INSERT OR IGNORE INTO tarefas_manutencao (nome, concluida) VALUES ('cifrar_registros', 1)"
+    )
+
+
+def migracao_registro_alteracoes(cursor):
+    """Cria o registro de alterações usado na replicação incremental
+    
+    Triggers acrescentam uma linha (operação, id do paciente) a cada
+    INSERT, UPDATE ou DELETE em pacientes; a tabela só recebe INSERTs. O
+    conteúdo dos registros é lido na exportação das alterações
+    (FormularioDIU.exportar_alteracoes). replicacao guarda o identificador
+    deste banco como origem das alterações.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            operacao TEXT NOT NULL,
+            paciente INTEGER NOT NULL,
+            alterado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for operacao, evento, registro in (('I', 'INSERT', 'new'), ('U', 'UPDATE', 'new'), ('D', 'DELETE', 'old')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS pacientes_alteracoes_{operacao.lower()}
+            AFTER {evento} ON pacientes BEGIN
+                INSERT INTO alteracoes (operacao, paciente) VALUES ('{operacao}', {registro}.id);
+            END
+        ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS replicacao (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            origem TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO replicacao (id, origem) VALUES (1, lower(hex(randomblob(16))))")
+
+
+def migracao_dados_cifrados(cursor):
+    """Cria a coluna com os campos cifrados de cada registro, cifrados juntos
+    
+    cifragem.colunas guarda a lista de colunas de dados_cifrados; quando os
+    campos marcados com cifrado=True mudam, os registros são cifrados de
+    novo na abertura do banco (FormularioDIU.cifrar_registros).
+    """
+    cursor.execute("PRAGMA table_info(pacientes)")
+    if 'dados_cifrados' not in {col[1] for col in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE pacientes ADD COLUMN dados_cifrados BLOB")
+    cursor.execute("PRAGMA table_info(cifragem)")
+    if 'colunas' not in {col[1] for col in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE cifragem ADD COLUMN colunas TEXT")
+
+
+# Migrações do esquema, em ordem: (versão, descrição, função)
+# Para alterar o esquema, acrescente uma nova versão ao final da lista.
+MIGRACOES = [
+    (1, "Tabela de pacientes", migracao_tabela_pacientes),
+    (2, "Busca por nome sem acentos", migracao_busca_por_nome),
+    (3, "Índices de consulta", migracao_indices_consulta),
+    (4, "Datas em AAAA-MM-DD", migracao_datas_iso),
+    (5, "Índices de navegação", migracao_indices_navegacao),
+    (6, "Estatísticas mensais", migracao_estatisticas),
+    (7, "Rascunhos do formulário", migracao_rascunhos),
+    (8, "Detecção de pacientes duplicadas", migracao_duplicidades),
+    (9, "Cifragem dos campos identificadores", migracao_cifragem),
+    (10, "Registro de alterações para replicação", migracao_registro_alteracoes),
+    (11, "Campos cifrados em uma coluna por registro", migracao_dados_cifrados),
+]
+
+# Consultas frequentes que devem usar índice (verificadas por verificar_planos_consulta)
+CONSULTAS_CRITICAS = [
+    ("Detalhes por id", "SELECT * FROM pacientes WHERE id = ?", (1,)),
+    ("Busca por CPF", "SELECT id FROM pacientes WHERE cpf = ?", ('',)),
+    ("Busca por SUS", "SELECT id FROM pacientes WHERE sus = ?", ('',)),
+    ("Exportação por local",
+     "SELECT id FROM pacientes WHERE id > ? AND local_atendimento = ? ORDER BY id LIMIT ?", (0, '', 1000)),
+    ("Inserções por período",
+     "SELECT id FROM pacientes WHERE data_insercao BETWEEN ? AND ?", ('', '')),
+    ("Inserções por local e período",
+     "SELECT id FROM pacientes WHERE local_atendimento = ? AND data_insercao BETWEEN ? AND ?", ('', '', '')),
+    ("Página por id",
+     "SELECT id FROM pacientes WHERE id < ? ORDER BY id DESC LIMIT ?", (0, 10)),
+    ("Página por local",
+     "SELECT id FROM pacientes WHERE local_atendimento = ? AND id < ? ORDER BY id DESC LIMIT ?", ('', 0, 10)),
+    ("Página por data de inserção",
+     "SELECT id FROM pacientes WHERE data_insercao IS NOT NULL AND (data_insercao, id) < (?, ?) "
+     "ORDER BY data_insercao DESC, id DESC LIMIT ?", ('', 0, 10)),
+    ("Página por DIU e data de inserção",
+     "SELECT id FROM pacientes WHERE diu_escolhido = ? AND data_insercao IS NOT NULL "
+     "AND (data_insercao, id) < (?, ?) ORDER BY data_insercao DESC, id DESC LIMIT ?", ('', '', 0, 10)),
+    ("Revisões por período",
+     "SELECT id FROM pacientes WHERE data_primeira_revisao BETWEEN ? AND ? "
+     "AND (data_primeira_revisao, id) > (?, ?) ORDER BY data_primeira_revisao, id LIMIT ?",
+     ('', '', '', 0, 50)),
+    ("Duplicidade por CPF", "SELECT id FROM pacientes WHERE cpf_normalizado = ?", ('',)),
+    ("Duplicidade por SUS", "SELECT id FROM pacientes WHERE sus_normalizado = ?", ('',)),
+    ("Duplicidade por nome e nascimento",
+     "SELECT id FROM pacientes WHERE data_nascimento = ? AND nome_normalizado = ?", ('', '')),
+    ("Blocos da busca de duplicados",
+     "SELECT data_nascimento, nome_normalizado, id FROM pacientes "
+     "WHERE data_nascimento IS NOT NULL AND (data_nascimento, nome_normalizado, id) > (?, ?, ?) "
+     "ORDER BY data_nascimento, nome_normalizado, id LIMIT ?", ('', '', 0, 1000)),
+]
+
+
+def valor_para_json(valor):
+    """Representa um valor do banco em JSON (BLOBs, como os campos cifrados, em hexadecimal)"""
+    return {'blob': valor.hex()} if isinstance(valor, bytes) else valor
+
+
+def valor_de_json(valor):
+    """Inverso de valor_para_json"""
+    return bytes.fromhex(valor['blob']) if isinstance(valor, dict) else valor
+
+
+def abrir_somente_leitura(caminho):
+    """Abre um arquivo de banco existente sem permitir alterações"""
+    if not os.path.exists(caminho):
+        raise ValueError(f"Arquivo não encontrado: {caminho}")
+    return sqlite3.connect(f"{pathlib.Path(os.path.abspath(caminho)).as_uri()}?mode=ro", uri=True)
+
+
+def verificar_banco(caminho):
+    """Confere um arquivo de banco (por exemplo, um backup) sem alterá-lo
+    
+    Roda PRAGMA integrity_check e retorna um dicionário com integridade
+    ('ok' ou a lista de problemas), versao_esquema, registros e
+    ultima_alteracao (último número do registro de alterações).
+    """
+    conn = abrir_somente_leitura(caminho)
+    try:
+        problemas = [linha[0] for linha in conn.execute("PRAGMA integrity_check")]
+        versao = conn.execute("PRAGMA user_version").fetchone()[0]
+        tabelas = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'pacientes' not in tabelas:
+            raise ValueError(f"{caminho} não é um banco do Formulário DIU")
+        registros = conn.execute("SELECT COUNT(*) FROM pacientes").fetchone()[0]
+        ultima_alteracao = None
+        if 'alteracoes' in tabelas:
+            ultima_alteracao = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+    except sqlite3.DatabaseError as erro:
+        raise ValueError(f"{caminho} não é um banco SQLite válido: {erro}")
+    finally:
+        conn.close()
+    return {
+        'arquivo': caminho,
+        'integridade': 'ok' if problemas == ['ok'] else problemas,
+        'versao_esquema': versao,
+        'registros': registros,
+        'ultima_alteracao': ultima_alteracao,
+    }
+
+
+def restaurar_backup(caminho, db_name="formulario_diu.db"):
+    """Restaura um backup verificado sobre o banco db_name
+    
+    O banco atual, se existir, é copiado antes para <db_name>.anterior. A
+    cópia é feita com a API de backup do SQLite, então funciona mesmo com o
+    banco em modo WAL. O banco restaurado recebe um novo identificador de
+    origem de replicação (as réplicas devem partir de um backup dele) e
+    guarda até onde já tinha recebido as alterações da origem anterior.
+    Retorna o resultado de verificar_banco do backup.
+    """
+    verificacao = verificar_banco(caminho)
+    if verificacao['integridade'] != 'ok':
+        raise ValueError(f"Backup com problemas de integridade: {verificacao['integridade'][:5]}")
+    if verificacao['versao_esquema'] > MIGRACOES[-1][0]:
+        raise ValueError("O backup é de uma versão mais nova do programa")
+    
+    existia = os.path.exists(db_name)
+    origem = abrir_somente_leitura(caminho)
+    destino = sqlite3.connect(db_name)
+    try:
+        if existia:
+            anterior = sqlite3.connect(f"{db_name}.anterior")
+            destino.backup(anterior)
+            anterior.close()
+        origem.backup(destino)
+        
+        tabelas = {linha[0] for linha in destino.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'replicacao' in tabelas:
+            origem_anterior = destino.execute("SELECT origem FROM replicacao").fetchone()[0]
+            destino.execute(
+                "INSERT OR REPLACE INTO tarefas_manutencao (nome, ultimo_id, concluida) VALUES (?, ?, 0)",
+                (f"replicacao:{origem_anterior}", verificacao['ultima_alteracao'])
+            )
+            destino.execute("UPDATE replicacao SET origem = lower(hex(randomblob(16)))")
+            destino.commit()
+    finally:
+        origem.close()
+        destino.close()
+    return verificacao
+
 
 class FormularioDIU:
-    def __init__(self, db_name="formulario_diu.db"):
+    def __init__(self, db_name="formulario_diu.db", configuracao=None, entrada=input, chave=None):
         self.db_name = db_name
+        self.entrada = entrada
+        self.configuracao = dict(CONFIGURACAO_PADRAO, **(configuracao or {}))
         self.conn = None
         self.cursor = None
-        self.init_database()
+        self.cifra = None
+        # Colunas de dados_cifrados gravadas em cifragem.colunas
+        self.colunas_cifradas_banco = ()
+        self.leitores = queue.LifoQueue()
+        self.trava_escrita = threading.RLock()
+        # Medições de todas as instruções SQL; as lentas também vão para
+        # <banco>.lentas.jsonl, para acompanhar o banco crescer entre sessões
+        self.metricas = MetricasBanco(self.configuracao['consulta_lenta_ms'],
+                                      None if db_name == ':memory:' else f"{db_name}.lentas.jsonl")
+        # A senha dos campos cifrados vem da variável de ambiente, para não
+        # aparecer na linha de comando nem no histórico
+        self.init_database(chave if chave is not None else os.environ.get('FORMULARIO_DIU_CHAVE'))
+    
+    def conectar(self, somente_leitura=False):
+        """Abre uma conexão com o banco aplicando a configuração"""
+        config = self.configuracao
+        fabrica = sqlite3.Connection if config['consulta_lenta_ms'] is None else ConexaoInstrumentada
+        if somente_leitura:
+            caminho = pathlib.Path(os.path.abspath(self.db_name)).as_uri()
+            conn = sqlite3.connect(f"{caminho}?mode=ro", uri=True, timeout=config['busy_timeout'] / 1000,
+                                   check_same_thread=False, factory=fabrica)
+        else:
+            # Pode ser usada por várias threads (servidor HTTP); as gravações são
+            # serializadas por self.trava_escrita
+            conn = sqlite3.connect(self.db_name, timeout=config['busy_timeout'] / 1000,
+                                   check_same_thread=False, factory=fabrica)
+            # journal_mode é gravado no arquivo; só alterar se for diferente
+            modo_atual = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            if modo_atual.lower() != config['journal_mode'].lower():
+                conn.execute(f"PRAGMA journal_mode = {config['journal_mode']}")
+            conn.execute(f"PRAGMA synchronous = {config['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(config['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(config['mmap_size'])}")
+        if fabrica is ConexaoInstrumentada:
+            conn.metricas = self.metricas
+        return conn
+    
+    @contextlib.contextmanager
+    def leitura(self):
+        """Fornece um cursor de uma conexão somente leitura do pool
+        
+        Em modo WAL as leituras não esperam por gravações em andamento. Sem
+        pool (leitores=0 ou banco em memória) usa a conexão principal.
+        """
+        if not self.configuracao['leitores'] or self.db_name == ':memory:':
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+        
+        try:
+            conn = self.leitores.get_nowait()
+        except queue.Empty:
+            conn = self.conectar(somente_leitura=True)
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            if self.leitores.qsize() < self.configuracao['leitores']:
+                self.leitores.put(conn)
+            else:
+                conn.close()
     
-    def init_database(self):
+    def init_database(self, chave=None):
         """Inicializa o banco de dados e cria as tabelas necessárias"""
-        self.conn = sqlite3.connect(self.db_name)
+        self.conn = self.conectar()
         self.cursor = self.conn.cursor()
         
-        # Criar tabela de pacientes
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pacientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- IDENTIFICAÇÃO
-                nome_completo TEXT NOT NULL,
-                data_nascimento TEXT,
-                telefone TEXT,
-                cpf TEXT,
-                sus TEXT,
-                cor TEXT,
-                religiao TEXT,
-                profissao TEXT,
-                escolaridade TEXT,
-                endereco TEXT,
-                local_atendimento TEXT,
-                
-                -- MOTIVAÇÃO PARA INSERÇÃO DO DIU
-                motivo_contracepcao INTEGER DEFAULT 0,
-                motivo_pos_aborto INTEGER DEFAULT 0,
-                motivo_sua INTEGER DEFAULT 0,
-                motivo_doenca_hematologica INTEGER DEFAULT 0,
-                motivo_transplantada INTEGER DEFAULT 0,
-                motivo_mioma INTEGER DEFAULT 0,
-                motivo_endometriose INTEGER DEFAULT 0,
-                motivo_dor_pelvica INTEGER DEFAULT 0,
-                motivo_tpm INTEGER DEFAULT 0,
-                motivo_terapia_pos_menopausa INTEGER DEFAULT 0,
-                motivo_outro TEXT,
-                
-                -- DADOS GINECOLÓGICOS
-                dum TEXT,
-                ultima_co TEXT,
-                cm_regularidade TEXT,
-                cm_duracao_dias INTEGER,
-                teve_ist TEXT,
-                parceiro_fixo TEXT,
-                alto_risco_ist TEXT,
-                uso_mac TEXT,
-                uso_mac_qual TEXT,
-                anemia TEXT,
-                sangramento_aumentado TEXT,
-                dipa_3meses TEXT,
-                ist_ativa TEXT,
-                ist_ativa_qual TEXT,
-                hiv_aids TEXT,
-                uso_antirretrovirais TEXT,
-                antirretrovirais_quais TEXT,
-                sangramento_nao_investigado TEXT,
-                cancer_cervical TEXT,
-                
-                -- HISTÓRIA OBSTÉTRICA
-                gesta INTEGER,
-                para INTEGER,
-                cesarea INTEGER,
-                abortos INTEGER,
-                data_ultimo_parto TEXT,
-                data_ultimo_aborto TEXT,
-                infeccao_pos_parto_aborto TEXT,
-                
-                -- INSERÇÃO DO DIU
-                informada_contraindicacoes TEXT,
-                diu_escolhido TEXT,
-                peso_kg REAL,
-                altura_cm REAL,
-                pa_mmhg TEXT,
-                data_insercao TEXT,
-                data_primeira_revisao TEXT,
-                exame_pelvico TEXT,
-                cervicite_purulenta TEXT,
-                confirma_elegibilidade TEXT,
-                insercao_resultado TEXT,
-                insercao_motivo TEXT,
-                posicao_uterina TEXT,
-                reflexo_vaginal TEXT,
-                uso_analgesia TEXT,
-                analgesia_qual TEXT,
-                uso_dilatadores TEXT,
-                histerometria_cm REAL,
-                dor_nota INTEGER,
-                dor_momento TEXT,
-                dificuldade_insercao TEXT,
-                motivo_dificuldade TEXT,
-                inserido_por TEXT,
-                
-                data_registro TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        self.aplicar_migracoes()
+        self.adicionar_campos_novos()
+        self.atualizar_gatilhos_estatisticas()
+        self.normalizar_datas()
         
-        self.conn.commit()
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pacientes_busca'"
+        )
+        self.fts_disponivel = self.cursor.fetchone() is not None
         
         # Obter lista de colunas válidas da tabela
         self.cursor.execute("PRAGMA table_info(pacientes)")
         self.valid_columns = set([col[1] for col in self.cursor.fetchall()])
+        
+        self.cifra = self.carregar_cifra(chave)
+        self.cifrar_registros()
+    
+    def adicionar_campos_novos(self):
+        """Cria as colunas de campos incluídos em FORMULARIO depois da criação do banco"""
+        self.cursor.execute("PRAGMA table_info(pacientes)")
+        existentes = {col[1] for col in self.cursor.fetchall()}
+        novos = [campo for campo in CAMPOS if campo.nome not in existentes]
+        for campo in novos:
+            # ADD COLUMN não aceita NOT NULL sem valor padrão
+            tipo = TIPOS_SQL.get(campo.tipo, 'TEXT')
+            self.cursor.execute(f"ALTER TABLE pacientes ADD COLUMN {campo.nome} {tipo}")
+        if novos:
+            self.conn.commit()
+    
+    def atualizar_gatilhos_estatisticas(self):
+        """Recria os triggers das estatísticas se os campos de FORMULARIO mudaram"""
+        try:
+            self.cursor.execute("BEGIN")
+            if criar_gatilhos_estatisticas(self.cursor):
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    def aplicar_migracoes(self):
+        """Atualiza o esquema do banco até a versão mais recente
+        
+        A versão atual fica em PRAGMA user_version. Cada migração pendente é
+        aplicada em uma transação própria, junto com a nova versão.
+        """
+        self.cursor.execute("PRAGMA user_version")
+        versao_atual = self.cursor.fetchone()[0]
+        
+        for versao, descricao, migracao in MIGRACOES:
+            if versao <= versao_atual:
+                continue
+            try:
+                self.cursor.execute("BEGIN")
+                migracao(self.cursor)
+                self.cursor.execute(f"PRAGMA user_version = {versao}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+    
+    def normalizar_datas(self, tamanho_lote=1000):
+        """Converte as datas DD/MM/AAAA já gravadas para AAAA-MM-DD
+        
+        Processa os registros em lotes por id; cada lote é gravado junto com
+        o último id processado, então uma execução interrompida continua de
+        onde parou. Valores que não são datas válidas são mantidos como estão.
+        """
+        self.cursor.execute(
+            "SELECT ultimo_id, concluida FROM tarefas_manutencao WHERE nome = 'normalizar_datas'"
+        )
+        ultimo_id, concluida = self.cursor.fetchone()
+        if concluida:
+            return
+        
+        colunas = ', '.join(COLUNAS_DATA)
+        atribuicoes = ', '.join(f"{coluna} = ?" for coluna in COLUNAS_DATA)
+        while True:
+            self.cursor.execute(f'''
+                SELECT id, {colunas} FROM pacientes
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (ultimo_id, tamanho_lote))
+            lote = self.cursor.fetchall()
+            if not lote:
+                break
+            
+            alterados = []
+            for reg in lote:
+                datas = []
+                for valor in reg[1:]:
+                    data = interpretar_data(valor) if isinstance(valor, str) else None
+                    datas.append(data.isoformat() if data else valor)
+                if datas != list(reg[1:]):
+                    alterados.append(datas + [reg[0]])
+            
+            ultimo_id = lote[-1][0]
+            self.cursor.executemany(f"UPDATE pacientes SET {atribuicoes} WHERE id = ?", alterados)
+            self.cursor.execute(
+                "UPDATE tarefas_manutencao SET ultimo_id = ? WHERE nome = 'normalizar_datas'",
+                (ultimo_id,)
+            )
+            self.conn.commit()
+        
+        self.cursor.execute("UPDATE tarefas_manutencao SET concluida = 1 WHERE nome = 'normalizar_datas'")
+        self.conn.commit()
+    
+    def carregar_cifra(self, chave):
+        """Retorna a CifraCampos do banco, ou None se a cifragem não estiver ativa
+        
+        Levanta ValueError se o banco for cifrado e a chave faltar ou não
+        conferir com o verificador gravado.
+        """
+        self.cursor.execute("SELECT sal, iteracoes, verificador, colunas FROM cifragem")
+        linha = self.cursor.fetchone()
+        if linha is None:
+            return None
+        if not chave:
+            raise ValueError("Banco com campos cifrados: informe a senha em FORMULARIO_DIU_CHAVE")
+        sal, iteracoes, verificador, colunas = linha
+        cifra = CifraCampos.de_senha(chave, sal, iteracoes)
+        if not hmac.compare_digest(cifra.verificador(), verificador):
+            raise ValueError("Senha de cifragem incorreta")
+        # Campos cifrados diferentes dos de FORMULARIO: cifrar_registros
+        # regrava os registros com a lista atual
+        self.colunas_cifradas_banco = tuple(colunas.split(',')) if colunas else ()
+        if self.colunas_cifradas_banco != ORDEM_CIFRADA:
+            self.cursor.execute(
+                "UPDATE tarefas_manutencao SET ultimo_id = 0, concluida = 0 WHERE nome = 'cifrar_registros'"
+            )
+            self.conn.commit()
+        return cifra
+    
+    def ativar_cifragem(self, chave):
+        """Passa a gravar cifrados os campos de COLUNAS_CIFRADAS
+        
+        Grava o sal e o verificador da senha e converte os registros e
+        rascunhos existentes. A partir daí o banco só abre com a mesma senha;
+        sem ela os campos cifrados não podem ser recuperados. Retorna o
+        número de registros convertidos.
+        """
+        if self.cifra is not None:
+            raise ValueError("A cifragem já está ativa neste banco")
+        if not chave:
+            raise ValueError("Informe a senha de cifragem em FORMULARIO_DIU_CHAVE")
+        
+        sal = os.urandom(16)
+        cifra = CifraCampos.de_senha(chave, sal)
+        with self.trava_escrita:
+            self.conn.execute(
+                "INSERT INTO cifragem (id, sal, iteracoes, verificador, colunas) VALUES (1, ?, ?, ?, ?)",
+                (sal, ITERACOES_CHAVE, cifra.verificador(), ','.join(ORDEM_CIFRADA))
+            )
+            self.conn.execute(
+                "UPDATE tarefas_manutencao SET ultimo_id = 0, concluida = 0 WHERE nome = 'cifrar_registros'"
+            )
+            self.conn.commit()
+            self.cifra = cifra
+            self.colunas_cifradas_banco = ORDEM_CIFRADA
+        return self.cifrar_registros()
+    
+    def cifrar_registros(self, tamanho_lote=1000):
+        """Cifra os registros gravados antes de a cifragem ser ativada
+        
+        Também regrava os registros quando os campos cifrados mudaram em
+        FORMULARIO: dados_cifrados é decifrado com a lista de colunas antiga
+        (colunas_cifradas_banco), os campos que deixaram de ser cifrados
+        voltam para as suas colunas e o restante é cifrado com a lista
+        atual. Como em normalizar_datas, cada lote é gravado junto com o
+        último id processado, e uma conversão interrompida continua na
+        próxima abertura do banco. No final o índice de busca e o banco são
+        reconstruídos (VACUUM) para não deixar os valores em texto em
+        páginas livres. Retorna o número de registros convertidos.
+        """
+        self.cursor.execute(
+            "SELECT ultimo_id, concluida FROM tarefas_manutencao WHERE nome = 'cifrar_registros'"
+        )
+        ultimo_id, concluida = self.cursor.fetchone()
+        if concluida:
+            return 0
+        
+        anteriores = self.colunas_cifradas_banco
+        # Campos lidos e regravados: os cifrados (antes e agora) e os das chaves de índice
+        colunas = list(dict.fromkeys(ORDEM_CIFRADA + anteriores + ('nome_completo', 'cpf', 'sus')))
+        colunas = [coluna for coluna in colunas if coluna in self.valid_columns]
+        atribuicoes = ', '.join(f"{coluna} = ?" for coluna in
+                                colunas + ['dados_cifrados', 'nome_normalizado', 'cpf_normalizado',
+                                           'sus_normalizado'])
+        convertidos = 0
+        with self.trava_escrita:
+            while True:
+                self.cursor.execute(f'''
+                    SELECT id, {', '.join(colunas)}, dados_cifrados FROM pacientes
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (ultimo_id, tamanho_lote))
+                lote = self.cursor.fetchall()
+                if not lote:
+                    break
+                
+                alterados = []
+                for id_registro, *valores, dados in lote:
+                    valores = dict(zip(colunas, valores))
+                    if dados is None and any(isinstance(valor, bytes) for valor in valores.values()):
+                        raise ValueError(f"Registro {id_registro}: campos cifrados um a um, em formato "
+                                         f"anterior a dados_cifrados, que não é mais aceito")
+                    if dados is not None:
+                        # Registros gravados depois da ativação (ou já
+                        # regravados) estão com a lista atual
+                        try:
+                            self.cifra.decifrar_linha(dados)
+                            continue
+                        except ValueError:
+                            valores.update(zip(anteriores, self.cifra.decifrar_linha(dados, anteriores)))
+                    alterados.append(
+                        [CifraCampos.OCULTO if coluna in COLUNAS_CIFRADAS else valores[coluna] for coluna in colunas]
+                        + [self.cifra.cifrar_linha([valores.get(coluna) for coluna in ORDEM_CIFRADA])]
+                        + chaves_indice(valores, self.cifra) + [id_registro]
+                    )
+                
+                ultimo_id = lote[-1][0]
+                self.cursor.executemany(f"UPDATE pacientes SET {atribuicoes} WHERE id = ?", alterados)
+                self.cursor.execute(
+                    "UPDATE tarefas_manutencao SET ultimo_id = ? WHERE nome = 'cifrar_registros'",
+                    (ultimo_id,)
+                )
+                self.conn.commit()
+                convertidos += len(alterados)
+            
+            marcadores = ', '.join('?' * len(ORDEM_CIFRADA))
+            self.cursor.execute(f'''
+                SELECT rowid, campo, valor FROM rascunho_respostas
+                WHERE campo IN ({marcadores}) AND typeof(valor) = 'text'
+            ''', ORDEM_CIFRADA)
+            self.cursor.executemany(
+                "UPDATE rascunho_respostas SET valor = ? WHERE rowid = ?",
+                [(self.cifra.cifrar(campo, valor), rowid) for rowid, campo, valor in self.cursor.fetchall()]
+            )
+            # O FTS5 só marca os termos antigos como apagados; reconstruir
+            # remove os nomes em texto do índice
+            if self.fts_disponivel:
+                self.cursor.execute("INSERT INTO pacientes_busca (pacientes_busca) VALUES ('rebuild')")
+            self.cursor.execute("UPDATE tarefas_manutencao SET concluida = 1 WHERE nome = 'cifrar_registros'")
+            self.cursor.execute("UPDATE cifragem SET colunas = ?", (','.join(ORDEM_CIFRADA),))
+            self.conn.commit()
+            self.colunas_cifradas_banco = ORDEM_CIFRADA
+            
+            self.conn.execute("VACUUM")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return convertidos
+    
+    def colunas_consulta(self, colunas, tabela=None):
+        """Lista de colunas de um SELECT em pacientes cujo resultado passa por decifrar_linhas
+        
+        Com cifragem ativa e alguma coluna cifrada entre as pedidas,
+        acrescenta dados_cifrados ao final. tabela é o apelido usado na
+        consulta, se houver.
+        """
+        if self.cifra is not None and not COLUNAS_CIFRADAS.isdisjoint(colunas):
+            colunas = (*colunas, 'dados_cifrados')
+        return ', '.join(f"{tabela}.{coluna}" if tabela else coluna for coluna in colunas)
+    
+    def decifrar_linhas(self, linhas, colunas):
+        """Decifra as colunas cifradas de linhas lidas do banco
+        
+        colunas é o nome da coluna em cada posição das linhas; a consulta
+        deve ter usado colunas_consulta. Sem cifragem ativa, devolve as
+        linhas como estão.
+        """
+        if self.cifra is None:
+            return linhas
+        return self.cifra.decifrar_lote(linhas, colunas)
+    
+    def verificar_planos_consulta(self):
+        """Verifica com EXPLAIN QUERY PLAN se as consultas críticas usam índice
+        
+        Retorna uma lista de (descrição, plano) das consultas que fariam
+        varredura completa da tabela; lista vazia indica que está tudo certo.
+        """
+        consultas = list(CONSULTAS_CRITICAS)
+        if self.fts_disponivel:
+            consultas.append((
+                "Busca por nome",
+                "SELECT p.id FROM pacientes_busca JOIN pacientes p ON p.id = pacientes_busca.rowid "
+                "WHERE pacientes_busca MATCH ?",
+                ('"silva"*',)
+            ))
+        
+        problemas = []
+        with self.leitura() as cursor:
+            for descricao, query, parametros in consultas:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query}", parametros)
+                plano = [linha[3] for linha in cursor.fetchall()]
+                if any(etapa.startswith('SCAN') and 'VIRTUAL TABLE' not in etapa for etapa in plano):
+                    problemas.append((descricao, plano))
+        return problemas
+    
+    def resumo_diagnostico(self):
+        """Tamanho do banco, consultas críticas sem índice e medições das instruções SQL
+        
+        As medições (MetricasBanco.como_dicionario) acumulam desde a abertura
+        do banco por este processo.
+        """
+        with self.leitura() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM pacientes")
+            registros = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_count")
+            paginas = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_size")
+            tamanho_pagina = cursor.fetchone()[0]
+        wal = f"{self.db_name}-wal"
+        return {
+            'banco': {
+                'arquivo': self.db_name,
+                'registros': registros,
+                'tamanho_mb': paginas * tamanho_pagina / 1024 ** 2,
+                'wal_mb': os.path.getsize(wal) / 1024 ** 2 if os.path.exists(wal) else 0.0,
+            },
+            'consultas_sem_indice': [{'consulta': descricao, 'plano': plano}
+                                     for descricao, plano in self.verificar_planos_consulta()],
+            'arquivo_lentas': self.metricas.arquivo_lentas,
+            **self.metricas.como_dicionario(),
+        }
     
     def get_input(self, prompt, required=False, tipo="texto", min_val=None, max_val=None):
         """Obtém input do usuário com validação"""
         while True:
-            valor = input(prompt).strip()
+            valor = self.entrada(prompt).strip()
             
             if not valor and required:
                 print("Este campo é obrigatório!")
@@ -129,173 +1992,38 @@ class FormularioDIU:
             if not valor:
                 return None
             
-            if tipo == "numero":
-                try:
-                    num = int(valor)
-                    if min_val is not None and num < min_val:
-                        print(f"Por favor, digite um número maior ou igual a {min_val}!")
-                        continue
-                    if max_val is not None and num > max_val:
-                        print(f"Por favor, digite um número menor ou igual a {max_val}!")
-                        continue
-                    return num
-                except ValueError:
-                    print("Por favor, digite um número válido!")
-                    continue
-            elif tipo == "decimal":
-                try:
-                    return float(valor)
-                except ValueError:
-                    print("Por favor, digite um número decimal válido!")
-                    continue
-            elif tipo == "sim_nao":
-                if valor.lower() in ['s', 'sim', 'n', 'não', 'nao']:
-                    return 's' if valor.lower() in ['s', 'sim'] else 'n'
-                else:
-                    print("Por favor, digite 's' ou 'n'!")
-                    continue
-            
-            return valor
-    
-    def coletar_identificacao(self):
-        """Coleta dados de identificação do paciente"""
-        print("\n" + "="*60)
-        print("IDENTIFICAÇÃO")
-        print("="*60)
-        
-        dados = {}
-        dados['nome_completo'] = self.get_input("Nome completo: ", required=True)
-        dados['data_nascimento'] = self.get_input("Data de nascimento (DD/MM/AAAA): ")
-        dados['telefone'] = self.get_input("Telefone: ")
-        dados['cpf'] = self.get_input("CPF: ")
-        dados['sus'] = self.get_input("SUS: ")
-        dados['cor'] = self.get_input("Cor: ")
-        dados['religiao'] = self.get_input("Religião: ")
-        dados['profissao'] = self.get_input("Profissão: ")
-        dados['escolaridade'] = self.get_input("Escolaridade: ")
-        dados['endereco'] = self.get_input("Endereço: ")
-        dados['local_atendimento'] = self.get_input("Local de atendimento: ")
-        
-        return dados
-    
-    def coletar_motivacao(self):
-        """Coleta dados sobre motivação para inserção do DIU"""
-        print("\n" + "="*60)
-        print("MOTIVAÇÃO PARA INSERÇÃO DO DIU")
-        print("="*60)
-        print("Marque as opções aplicáveis (s/n):")
-        
-        dados = {}
-        dados['motivo_contracepcao'] = 1 if self.get_input("1. Contracepção (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_pos_aborto'] = 1 if self.get_input("2. Pós aborto (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_sua'] = 1 if self.get_input("3. SUA (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_doenca_hematologica'] = 1 if self.get_input("4. Doença hematológica (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_transplantada'] = 1 if self.get_input("5. Transplantada (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_mioma'] = 1 if self.get_input("6. Mioma (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_endometriose'] = 1 if self.get_input("7. Endometriose (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_dor_pelvica'] = 1 if self.get_input("8. Dor pélvica (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_tpm'] = 1 if self.get_input("9. TPM (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_terapia_pos_menopausa'] = 1 if self.get_input("10. Terapia pós menopausa (s/n): ", tipo="sim_nao") == 's' else 0
-        dados['motivo_outro'] = self.get_input("Outro motivo (descreva): ")
-        
-        return dados
-    
-    def coletar_dados_ginecologicos(self):
-        """Coleta dados ginecológicos"""
-        print("\n" + "="*60)
-        print("DADOS GINECOLÓGICOS")
-        print("="*60)
-        
-        dados = {}
-        dados['dum'] = self.get_input("Data da última menstruação (DUM) (DD/MM/AAAA): ")
-        dados['ultima_co'] = self.get_input("Última C.O: ")
-        dados['cm_regularidade'] = self.get_input("C.M (regular/irregular): ")
-        dados['cm_duracao_dias'] = self.get_input("Duração em dias: ", tipo="numero")
-        dados['teve_ist'] = self.get_input("Já teve IST? (s/n): ", tipo="sim_nao")
-        dados['parceiro_fixo'] = self.get_input("Possui parceiro fixo? (s/n): ", tipo="sim_nao")
-        dados['alto_risco_ist'] = self.get_input("Alto risco de IST? (s/n): ", tipo="sim_nao")
-        dados['uso_mac'] = self.get_input("Uso de MAC? (s/n): ", tipo="sim_nao")
-        if dados['uso_mac'] == 's':
-            dados['uso_mac_qual'] = self.get_input("Qual MAC: ")
-        else:
-            dados['uso_mac_qual'] = None
-        dados['anemia'] = self.get_input("Anemia? (s/n): ", tipo="sim_nao")
-        dados['sangramento_aumentado'] = self.get_input("Sangramento uterino aumentado na menstruação? (s/n): ", tipo="sim_nao")
-        dados['dipa_3meses'] = self.get_input("DIPA nos últimos 3 meses? (s/n): ", tipo="sim_nao")
-        dados['ist_ativa'] = self.get_input("IST ativa? (s/n): ", tipo="sim_nao")
-        if dados['ist_ativa'] == 's':
-            dados['ist_ativa_qual'] = self.get_input("Qual IST: ")
-        else:
-            dados['ist_ativa_qual'] = None
-        dados['hiv_aids'] = self.get_input("HIV/AIDS? (s/n): ", tipo="sim_nao")
-        dados['uso_antirretrovirais'] = self.get_input("Uso de antirretrovirais? (s/n): ", tipo="sim_nao")
-        if dados['uso_antirretrovirais'] == 's':
-            dados['antirretrovirais_quais'] = self.get_input("Quais antirretrovirais: ")
-        else:
-            dados['antirretrovirais_quais'] = None
-        dados['sangramento_nao_investigado'] = self.get_input("Sangramento uterino não investigado? (s/n): ", tipo="sim_nao")
-        dados['cancer_cervical'] = self.get_input("Câncer cervical? (s/n): ", tipo="sim_nao")
-        
-        return dados
+            try:
+                return converter_valor(valor, tipo, min_val, max_val)
+            except ValueError as erro:
+                print(erro)
+                continue
     
-    def coletar_historia_obstetrica(self):
-        """Coleta história obstétrica"""
-        print("\n" + "="*60)
-        print("HISTÓRIA OBSTÉTRICA")
-        print("="*60)
+    def coletar_secao(self, registro, titulo, instrucao, campos, respondidos=(), ao_responder=None):
+        """Pergunta os campos de uma seção do formulário e preenche o registro
         
-        dados = {}
-        dados['gesta'] = self.get_input("Gesta: ", tipo="numero")
-        dados['para'] = self.get_input("Para: ", tipo="numero")
-        dados['cesarea'] = self.get_input("Cesárea: ", tipo="numero")
-        dados['abortos'] = self.get_input("Abortos: ", tipo="numero")
-        dados['data_ultimo_parto'] = self.get_input("Data do último parto (DD/MM/AAAA): ")
-        dados['data_ultimo_aborto'] = self.get_input("Data do último aborto (DD/MM/AAAA): ")
-        dados['infeccao_pos_parto_aborto'] = self.get_input("Teve infecção pós-parto ou pós-aborto? (s/n): ", tipo="sim_nao")
+        Campos em respondidos (vindos de um rascunho) não são perguntados de
+        novo; ao_responder(campo, valor) é chamado a cada resposta.
+        """
+        if all(campo.nome in respondidos for campo in campos):
+            return
         
-        return dados
-    
-    def coletar_insercao_diu(self):
-        """Coleta dados sobre inserção do DIU"""
         print("\n" + "="*60)
-        print("INSERÇÃO DO DIU")
+        print(titulo)
         print("="*60)
+        if instrucao:
+            print(instrucao)
         
-        dados = {}
-        dados['informada_contraindicacoes'] = self.get_input("Foi informada sobre contraindicações e efeitos? (s/n): ", tipo="sim_nao")
-        dados['diu_escolhido'] = self.get_input("DIU escolhido (TCU/Levonorgestrel): ")
-        dados['peso_kg'] = self.get_input("Peso (kg): ", tipo="decimal")
-        dados['altura_cm'] = self.get_input("Altura (cm): ", tipo="decimal")
-        dados['pa_mmhg'] = self.get_input("PA (mmHg): ")
-        dados['data_insercao'] = self.get_input("Data de inserção (DD/MM/AAAA): ")
-        dados['data_primeira_revisao'] = self.get_input("Data da primeira revisão (DD/MM/AAAA): ")
-        dados['exame_pelvico'] = self.get_input("Exame pélvico (normal/anormal): ")
-        dados['cervicite_purulenta'] = self.get_input("Cervicite purulenta? (s/n): ", tipo="sim_nao")
-        dados['confirma_elegibilidade'] = self.get_input("Confirma elegibilidade para o DIU? (s/n): ", tipo="sim_nao")
-        dados['insercao_resultado'] = self.get_input("Inserção (fácil/difícil/não realizada): ")
-        if dados['insercao_resultado'] in ['difícil', 'dificil', 'não realizada', 'nao realizada']:
-            dados['insercao_motivo'] = self.get_input("Motivo: ")
-        else:
-            dados['insercao_motivo'] = None
-        dados['posicao_uterina'] = self.get_input("Posição uterina (AVF/MVF/RVF): ")
-        dados['reflexo_vaginal'] = self.get_input("Reflexo vaginal? (s/n): ", tipo="sim_nao")
-        dados['uso_analgesia'] = self.get_input("Uso de analgesia? (s/n): ", tipo="sim_nao")
-        if dados['uso_analgesia'] == 's':
-            dados['analgesia_qual'] = self.get_input("Qual analgesia: ")
-        else:
-            dados['analgesia_qual'] = None
-        dados['uso_dilatadores'] = self.get_input("Uso de dilatadores cervicais? (s/n): ", tipo="sim_nao")
-        dados['histerometria_cm'] = self.get_input("Histerometria (cm): ", tipo="decimal")
-        dados['dor_nota'] = self.get_input("Nota de dor na inserção (1-10): ", tipo="numero", min_val=1, max_val=10)
-        dados['dor_momento'] = self.get_input("Em qual momento (Histerometria/Liberação do DIU/Fixação do colo do útero/Outro): ")
-        dados['dificuldade_insercao'] = self.get_input("Dificuldade na inserção (sem dificuldade/dificuldade esperada/mais difícil que o esperado/não foi possível inserir): ")
-        if 'dificuldade' in dados['dificuldade_insercao'].lower() or 'difícil' in dados['dificuldade_insercao'].lower():
-            dados['motivo_dificuldade'] = self.get_input("Motivo da dificuldade: ")
-        else:
-            dados['motivo_dificuldade'] = None
-        dados['inserido_por'] = self.get_input("Inserido por (staff/residente/enfermeira/estudante/MFC/supervisor): ")
-        
-        return dados
+        for campo in campos:
+            if campo.nome in respondidos:
+                continue
+            if not campo_aplicavel(campo.nome, registro):
+                setattr(registro, campo.nome, None)
+                continue
+            min_val, max_val = campo.limites or (None, None)
+            valor = self.get_input(campo.pergunta, campo.obrigatorio, campo.tipo, min_val, max_val)
+            setattr(registro, campo.nome, valor)
+            if ao_responder:
+                ao_responder(campo.nome, valor)
     
     def novo_registro(self):
         """Cria um novo registro completo de paciente"""
@@ -303,65 +2031,304 @@ class FormularioDIU:
         print("NOVO REGISTRO DE PACIENTE")
         print("#"*60)
         
-        # Coletar todos os dados
-        dados = {}
-        dados.update(self.coletar_identificacao())
-        dados.update(self.coletar_motivacao())
-        dados.update(self.coletar_dados_ginecologicos())
-        dados.update(self.coletar_historia_obstetrica())
-        dados.update(self.coletar_insercao_diu())
+        registro, respondidos, rascunho = RegistroPaciente(), set(), None
+        pendentes = self.rascunhos_pendentes()
+        if pendentes:
+            print("\nRascunhos não concluídos:")
+            for id_rascunho, nome, respostas, atualizado_em in pendentes:
+                print(f"[{id_rascunho}] {nome or '(sem nome)'} - {respostas} resposta(s), última em {atualizado_em}")
+            escolha = self.get_input("Número do rascunho para continuar [Enter = novo registro]: ", tipo="numero")
+            if escolha in [pendente[0] for pendente in pendentes]:
+                rascunho = escolha
+                registro, respondidos = self.carregar_rascunho(rascunho)
+                print(f"\nContinuando o rascunho #{rascunho} ({len(respondidos)} resposta(s) já dada(s)).")
+            elif escolha is not None:
+                print("\nRascunho não encontrado; iniciando um novo registro.")
         
-        # Confirmar salvamento
-        print("\n" + "-"*60)
-        confirma = self.get_input("Deseja salvar este registro? (s/n): ", tipo="sim_nao")
+        def ao_responder(campo, valor):
+            # Cada resposta vai para o rascunho na hora; o rascunho só é
+            # criado na primeira resposta
+            nonlocal rascunho
+            if rascunho is None:
+                rascunho = self.criar_rascunho()
+            self.salvar_resposta(rascunho, campo, valor)
+        
+        try:
+            # Coletar todos os dados
+            for titulo, instrucao, campos in FORMULARIO:
+                self.coletar_secao(registro, titulo, instrucao, campos, respondidos, ao_responder)
+                # Depois da identificação, avisar se a paciente parece já estar registrada
+                if any(campo.nome in CAMPOS_DUPLICIDADE for campo in campos):
+                    if not self.confirmar_duplicados(registro):
+                        if rascunho is not None:
+                            self.descartar_rascunho(rascunho)
+                        print("\n✗ Registro cancelado.")
+                        return
+            
+            # Confirmar salvamento
+            print("\n" + "-"*60)
+            confirma = self.get_input("Deseja salvar este registro? (s/n): ", tipo="sim_nao")
+        except (KeyboardInterrupt, EOFError):
+            if rascunho is None:
+                print("\n\n✗ Registro cancelado.")
+            else:
+                print(f"\n\n✗ Interrompido. As respostas foram guardadas no rascunho #{rascunho};")
+                print("escolha \"Novo Registro\" para continuar de onde parou.")
+            return
         
         if confirma == 's':
-            # Validar que todas as colunas são válidas
-            invalid_columns = set(dados.keys()) - self.valid_columns
-            if invalid_columns:
-                print(f"\n✗ Erro: Colunas inválidas detectadas: {invalid_columns}")
+            try:
+                id_registro = self.inserir_registro(registro, rascunho)
+            except ValueError as erro:
+                print(f"\n✗ Erro: {erro}")
                 return
             
-            # Montar query de inserção com colunas validadas
-            colunas = ', '.join(dados.keys())
-            placeholders = ', '.join(['?' for _ in dados])
-            query = f"INSERT INTO pacientes ({colunas}) VALUES ({placeholders})"
-            
-            self.cursor.execute(query, list(dados.values()))
-            self.conn.commit()
-            
             print("\n✓ Registro salvo com sucesso!")
-            print(f"ID do registro: {self.cursor.lastrowid}")
+            print(f"ID do registro: {id_registro}")
         else:
+            if rascunho is not None:
+                self.descartar_rascunho(rascunho)
             print("\n✗ Registro cancelado.")
     
+    def criar_rascunho(self):
+        """Cria um rascunho vazio e retorna o id"""
+        with self.trava_escrita:
+            cursor = self.conn.execute("INSERT INTO rascunhos DEFAULT VALUES")
+            self.conn.commit()
+        return cursor.lastrowid
+    
+    def salvar_resposta(self, rascunho, campo, valor):
+        """Acrescenta uma resposta ao rascunho (um INSERT e um commit curtos)"""
+        if self.cifra is not None and campo in COLUNAS_CIFRADAS:
+            valor = self.cifra.cifrar(campo, valor)
+        with self.trava_escrita:
+            self.conn.execute(
+                "INSERT INTO rascunho_respostas (rascunho, campo, valor) VALUES (?, ?, ?)",
+                (rascunho, campo, valor)
+            )
+            self.conn.commit()
+    
+    def rascunhos_pendentes(self):
+        """Lista (id, nome, respostas, última resposta) dos rascunhos não concluídos"""
+        with self.leitura() as cursor:
+            cursor.execute('''
+                SELECT r.id,
+                       (SELECT valor FROM rascunho_respostas
+                        WHERE rascunho = r.id AND campo = 'nome_completo'
+                        ORDER BY rowid DESC LIMIT 1),
+                       COUNT(rr.rascunho),
+                       COALESCE(MAX(rr.respondido_em), r.criado_em)
+                FROM rascunhos r
+                LEFT JOIN rascunho_respostas rr ON rr.rascunho = r.id
+                GROUP BY r.id
+                ORDER BY r.id
+            ''')
+            rascunhos = cursor.fetchall()
+        if self.cifra is None:
+            return rascunhos
+        return [(rascunho, self.cifra.decifrar('nome_completo', nome), *resto)
+                for rascunho, nome, *resto in rascunhos]
+    
+    def carregar_rascunho(self, rascunho):
+        """Retorna (RegistroPaciente, campos respondidos) de um rascunho"""
+        registro = RegistroPaciente()
+        respondidos = set()
+        with self.leitura() as cursor:
+            cursor.execute(
+                "SELECT campo, valor FROM rascunho_respostas WHERE rascunho = ? ORDER BY rowid",
+                (rascunho,)
+            )
+            for campo, valor in cursor.fetchall():
+                # Ignora campos que deixaram de existir no formulário
+                if campo in COLUNAS_FORMULARIO:
+                    if self.cifra is not None:
+                        valor = self.cifra.decifrar(campo, valor)
+                    setattr(registro, campo, valor)
+                    respondidos.add(campo)
+        return registro, respondidos
+    
+    def descartar_rascunho(self, rascunho):
+        """Apaga um rascunho e suas respostas"""
+        with self.trava_escrita:
+            self.conn.execute("DELETE FROM rascunho_respostas WHERE rascunho = ?", (rascunho,))
+            self.conn.execute("DELETE FROM rascunhos WHERE id = ?", (rascunho,))
+            self.conn.commit()
+    
+    def inserir_registro(self, dados, rascunho=None):
+        """Valida e grava um registro; retorna o id
+        
+        dados é um RegistroPaciente, como o montado pelo formulário, ou um
+        dicionário coluna -> valor lido de JSON. Levanta ValueError se algum
+        valor for inválido. Se rascunho for informado, ele é apagado na mesma
+        transação, para não poder ser gravado duas vezes.
+        """
+        registro = validar_registro(dados)
+        
+        with self.trava_escrita:
+            try:
+                cursor = self.conn.execute(SQL_INSERIR_PACIENTE, registro.valores_insercao(self.cifra))
+                if rascunho is not None:
+                    self.conn.execute("DELETE FROM rascunho_respostas WHERE rascunho = ?", (rascunho,))
+                    self.conn.execute("DELETE FROM rascunhos WHERE id = ?", (rascunho,))
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+        return cursor.lastrowid
+    
+    def inserir_verificando_duplicados(self, dados):
+        """Grava o registro e informa os ids de registros da mesma paciente
+        
+        Usado pela linha de comando e pelo servidor, que não podem perguntar
+        antes de gravar: retorna {'id': ..., 'possiveis_duplicados': [...]}.
+        """
+        registro = validar_registro(dados)
+        duplicados = [linha[0] for linha in self.possiveis_duplicados(registro)]
+        return {'id': self.inserir_registro(registro), 'possiveis_duplicados': duplicados}
+    
+    def obter_paciente(self, id_registro):
+        """Retorna o RegistroPaciente com o id informado, ou None"""
+        with self.leitura() as cursor:
+            cursor.execute(f"SELECT {self.colunas_consulta(COLUNAS_PACIENTES)} FROM pacientes WHERE id = ?",
+                           (id_registro,))
+            linha = cursor.fetchone()
+        if linha is None:
+            return None
+        return RegistroPaciente.de_linha(self.decifrar_linhas([linha], COLUNAS_PACIENTES)[0])
+    
+    def obter_registro(self, id_registro):
+        """Retorna o registro como dicionário coluna -> valor, ou None"""
+        registro = self.obter_paciente(id_registro)
+        return registro.como_dicionario() if registro else None
+    
+    def paginar_registros(self, ordem='id', apos=None, antes=None, limite=10,
+                          local_atendimento=None, diu_escolhido=None):
+        """Retorna uma página de registros, dos mais recentes para os mais antigos
+        
+        Paginação por chave (keyset): apos recebe a chave do último registro
+        da página atual e traz a próxima página (mais antigos); antes recebe a
+        chave do primeiro registro e traz a página anterior (mais recentes).
+        A chave é o id (ordem='id') ou o par (data_insercao, id)
+        (ordem='data_insercao'; registros sem data de inserção não entram).
+        Cada página é uma busca em índice, com o mesmo custo em qualquer
+        profundidade.
+        """
+        if ordem == 'id':
+            chave = "id"
+            ordenacao = "id {direcao}"
+        elif ordem == 'data_insercao':
+            chave = "(data_insercao, id)"
+            ordenacao = "data_insercao {direcao}, id {direcao}"
+        else:
+            raise ValueError(f"Ordem inválida: {ordem}")
+        
+        condicoes = []
+        parametros = []
+        if ordem == 'data_insercao':
+            condicoes.append("data_insercao IS NOT NULL")
+        if local_atendimento:
+            condicoes.append("local_atendimento = ?")
+            parametros.append(local_atendimento)
+        if diu_escolhido:
+            condicoes.append("diu_escolhido = ?")
+            parametros.append(diu_escolhido)
+        
+        marcador = "?" if ordem == 'id' else "(?, ?)"
+        cursor_chave = antes if antes is not None else apos
+        if cursor_chave is not None:
+            condicoes.append(f"{chave} {'>' if antes is not None else '<'} {marcador}")
+            parametros.extend([cursor_chave] if ordem == 'id' else cursor_chave)
+        
+        # Página anterior: percorre em ordem crescente e inverte o resultado
+        direcao = "ASC" if antes is not None else "DESC"
+        ordenacao = ordenacao.format(direcao=direcao)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        
+        with self.leitura() as cursor:
+            cursor.execute(f'''
+                SELECT {self.colunas_consulta(COLUNAS_RESUMO)}
+                FROM pacientes
+                {where}
+                ORDER BY {ordenacao}
+                LIMIT ?
+            ''', parametros + [limite])
+            registros = self.decifrar_linhas(cursor.fetchall(), COLUNAS_RESUMO)
+        
+        if antes is not None:
+            registros.reverse()
+        return registros
+    
+    def chave_registro(self, registro, ordem='id'):
+        """Retorna a chave de paginação de um registro retornado por paginar_registros"""
+        return registro[0] if ordem == 'id' else (registro[4], registro[0])
+    
+    def exibir_resumo(self, registros):
+        """Exibe o resumo de uma lista de registros"""
+        for reg in registros:
+            print(f"\nID: {reg[0]}")
+            print(f"Nome: {reg[1]}")
+            print(f"Data Nascimento: {formatar_data(reg[2]) or 'N/A'}")
+            print(f"Telefone: {reg[3] or 'N/A'}")
+            print(f"Data Inserção DIU: {formatar_data(reg[4]) or 'N/A'}")
+            print(f"Data Registro: {reg[5]}")
+            print("-"*60)
+    
     def listar_registros(self, limite=10):
         """Lista os últimos registros salvos"""
         print("\n" + "="*60)
         print(f"ÚLTIMOS {limite} REGISTROS")
         print("="*60)
         
-        self.cursor.execute('''
-            SELECT id, nome_completo, data_nascimento, telefone, data_insercao, data_registro
-            FROM pacientes
-            ORDER BY id DESC
-            LIMIT ?
-        ''', (limite,))
+        registros = self.paginar_registros(limite=limite)
+        
+        if not registros:
+            print("Nenhum registro encontrado.")
+            return
+        
+        self.exibir_resumo(registros)
+    
+    def navegar_registros(self, limite=10):
+        """Navega pelos registros página a página, com filtros opcionais"""
+        print("\n" + "="*60)
+        print("LISTAR REGISTROS")
+        print("="*60)
         
-        registros = self.cursor.fetchall()
+        ordem = self.get_input("Ordenar por (1) registro ou (2) data de inserção do DIU [1]: ")
+        ordem = 'data_insercao' if ordem == '2' else 'id'
+        local_atendimento = self.get_input("Local de atendimento [todos]: ")
+        diu_escolhido = self.get_input("DIU escolhido [todos]: ")
         
+        filtros = {'ordem': ordem, 'limite': limite,
+                   'local_atendimento': local_atendimento, 'diu_escolhido': diu_escolhido}
+        registros = self.paginar_registros(**filtros)
         if not registros:
-            print("Nenhum registro encontrado.")
+            print("\nNenhum registro encontrado.")
             return
         
-        for reg in registros:
-            print(f"\nID: {reg[0]}")
-            print(f"Nome: {reg[1]}")
-            print(f"Data Nascimento: {reg[2] or 'N/A'}")
-            print(f"Telefone: {reg[3] or 'N/A'}")
-            print(f"Data Inserção DIU: {reg[4] or 'N/A'}")
-            print(f"Data Registro: {reg[5]}")
-            print("-"*60)
+        pagina = 1
+        while True:
+            print(f"\n--- Página {pagina} ---")
+            self.exibir_resumo(registros)
+            
+            acao = (self.get_input("[p] próxima, [a] anterior, [s] sair [p]: ") or 'p').lower()
+            if acao == 'p':
+                proxima = self.paginar_registros(apos=self.chave_registro(registros[-1], ordem), **filtros)
+                if not proxima:
+                    print("\nNão há registros mais antigos.")
+                    continue
+                registros = proxima
+                pagina += 1
+            elif acao == 'a':
+                anterior = self.paginar_registros(antes=self.chave_registro(registros[0], ordem), **filtros)
+                if not anterior:
+                    print("\nNão há registros mais recentes.")
+                    continue
+                registros = anterior
+                pagina -= 1
+            elif acao == 's':
+                break
+            else:
+                print("\n✗ Opção inválida! Tente novamente.")
     
     def buscar_paciente(self):
         """Busca pacientes por nome"""
@@ -369,30 +2336,35 @@ class FormularioDIU:
         print("BUSCAR PACIENTE")
         print("="*60)
         
-        nome = self.get_input("Digite o nome (ou parte do nome) para buscar: ", required=True)
-        
-        self.cursor.execute('''
-            SELECT id, nome_completo, data_nascimento, telefone, cpf, data_insercao
-            FROM pacientes
-            WHERE nome_completo LIKE ?
-            ORDER BY nome_completo
-        ''', (f'%{nome}%',))
-        
-        registros = self.cursor.fetchall()
+        limite = 100
+        while True:
+            nome = self.get_input("Digite o nome (ou parte do nome) para buscar: ", required=True)
+            try:
+                # Um a mais que o limite, só para saber se há mais resultados
+                registros = self.buscar_por_nome(nome, limite + 1)
+                break
+            except ValueError as erro:
+                print(f"\n✗ Erro: {erro}")
         
         if not registros:
             print(f"\nNenhum paciente encontrado com o nome '{nome}'.")
             return
         
-        print(f"\n{len(registros)} paciente(s) encontrado(s):\n")
+        if len(registros) > limite:
+            mais_antigo = min(reg[0] for reg in registros)
+            registros = [reg for reg in registros if reg[0] != mais_antigo]
+            print(f"\nMais de {limite} pacientes encontrados; exibindo os {limite} registros mais recentes. "
+                  f"Digite mais do nome para refinar a busca.\n")
+        else:
+            print(f"\n{len(registros)} paciente(s) encontrado(s):\n")
         
         for reg in registros:
             print(f"ID: {reg[0]}")
             print(f"Nome: {reg[1]}")
-            print(f"Data Nascimento: {reg[2] or 'N/A'}")
+            print(f"Data Nascimento: {formatar_data(reg[2]) or 'N/A'}")
             print(f"Telefone: {reg[3] or 'N/A'}")
             print(f"CPF: {reg[4] or 'N/A'}")
-            print(f"Data Inserção DIU: {reg[5] or 'N/A'}")
+            print(f"Data Inserção DIU: {formatar_data(reg[5]) or 'N/A'}")
             print("-"*60)
         
         # Opção de ver detalhes
@@ -401,28 +2373,667 @@ class FormularioDIU:
             id_registro = self.get_input("Digite o ID do registro: ", tipo="numero")
             self.ver_detalhes_registro(id_registro)
     
+    def buscar_por_nome(self, nome, limite=100):
+        """Busca pacientes por nome, sem diferenciar acentos e maiúsculas
+        
+        Cada palavra digitada é tratada como prefixo de uma palavra do nome
+        ("jos sil" encontra "José da Silva"). Com mais de limite resultados,
+        ficam os limite registros mais recentes: o índice devolve os
+        candidatos na ordem do id e a consulta para no limite, sem ordenar
+        todos os nomes encontrados. O resultado vem ordenado por nome.
+        """
+        tokens = normalizar_texto(nome).split()
+        if not tokens:
+            return []
+        if self.cifra is not None:
+            return self.buscar_por_nome_cifrado(tokens, limite)
+        
+        with self.leitura() as cursor:
+            if self.fts_disponivel:
+                consulta = ' '.join(f'"{token}"*' for token in tokens)
+                cursor.execute('''
+                    SELECT p.id, p.nome_completo, p.data_nascimento, p.telefone, p.cpf, p.data_insercao
+                    FROM pacientes_busca
+                    JOIN pacientes p ON p.id = pacientes_busca.rowid
+                    WHERE pacientes_busca MATCH ?
+                    ORDER BY pacientes_busca.rowid DESC
+                    LIMIT ?
+                ''', (consulta, limite))
+            else:
+                # Sem FTS5: mesma semântica de prefixo por palavra, com varredura
+                condicoes = ' AND '.join(["(' ' || nome_normalizado) LIKE ?"] * len(tokens))
+                cursor.execute(f'''
+                    SELECT id, nome_completo, data_nascimento, telefone, cpf, data_insercao
+                    FROM pacientes
+                    WHERE {condicoes}
+                    ORDER BY id DESC
+                    LIMIT ?
+                ''', [f'% {token}%' for token in tokens] + [limite])
+            return sorted(cursor.fetchall(), key=lambda reg: (reg[1], reg[0]))
+    
+    def buscar_por_nome_cifrado(self, tokens, limite):
+        """Busca por nome em banco com cifragem ativa
+        
+        nome_normalizado guarda hashes dos prefixos das palavras (ver
+        CifraCampos.tokens_nome), então o índice encontra os candidatos sem
+        decifrar nada. Os candidatos são lidos dos mais recentes para os mais
+        antigos, em lotes decifrados de uma vez, até completar o limite; o
+        resultado vem ordenado por nome. Se todas as palavras têm de
+        PREFIXO_CEGO_MINIMO a PREFIXO_CEGO_MAXIMO letras o índice já é
+        exato; senão cada candidato é conferido com o nome decifrado, e
+        palavras com menos de PREFIXO_CEGO_MINIMO letras só filtram os
+        candidatos. Se nenhuma palavra chega a PREFIXO_CEGO_MINIMO letras
+        ("Lu Li"), procura o nome completo exato, pelo token do nome
+        inteiro.
+        """
+        chaves = [chave for chave in map(self.cifra.token_busca, tokens) if chave]
+        if not chaves:
+            chaves = [self.cifra.token_nome(' '.join(tokens))]
+        
+        with self.leitura() as cursor:
+            if self.fts_disponivel:
+                cursor.execute(f'''
+                    SELECT {self.colunas_consulta(COLUNAS_BUSCA, 'p')}
+                    FROM pacientes_busca
+                    JOIN pacientes p ON p.id = pacientes_busca.rowid
+                    WHERE pacientes_busca MATCH ?
+                    ORDER BY pacientes_busca.rowid DESC
+                ''', (' '.join(f'"{chave}"' for chave in chaves),))
+            else:
+                condicoes = ' AND '.join(["(' ' || nome_normalizado || ' ') LIKE ?"] * len(chaves))
+                cursor.execute(f'''
+                    SELECT {self.colunas_consulta(COLUNAS_BUSCA)} FROM pacientes
+                    WHERE {condicoes}
+                    ORDER BY id DESC
+                ''', [f'% {chave} %' for chave in chaves])
+            
+            conferir = not all(PREFIXO_CEGO_MINIMO <= len(token) <= PREFIXO_CEGO_MAXIMO for token in tokens)
+            # As palavras normalizadas são separadas por um espaço: " token"
+            # no nome com um espaço à frente é uma palavra começando por token
+            inicios = [f" {token}" for token in tokens]
+            encontrados = []
+            while len(encontrados) < limite:
+                linhas = cursor.fetchmany(limite)
+                if not linhas:
+                    break
+                for linha in self.decifrar_linhas(linhas, COLUNAS_BUSCA):
+                    if conferir:
+                        nome = f" {normalizar_texto(linha[1])}"
+                        if not all(inicio in nome for inicio in inicios):
+                            continue
+                    encontrados.append(linha)
+        return sorted(encontrados[:limite], key=lambda reg: (reg[1], reg[0]))
+    
     def ver_detalhes_registro(self, id_registro):
         """Exibe todos os detalhes de um registro específico"""
-        self.cursor.execute('SELECT * FROM pacientes WHERE id = ?', (id_registro,))
-        registro = self.cursor.fetchone()
+        registro = self.obter_paciente(id_registro)
         
         if not registro:
             print(f"\nRegistro com ID {id_registro} não encontrado.")
             return
         
-        # Obter nomes das colunas
-        colunas = [desc[0] for desc in self.cursor.description]
-        
         print("\n" + "="*60)
         print(f"DETALHES DO REGISTRO #{id_registro}")
         print("="*60)
         
-        for i, coluna in enumerate(colunas):
-            if registro[i] is not None:
-                print(f"{coluna}: {registro[i]}")
+        for coluna, valor in registro:
+            if valor is not None:
+                valor = formatar_data(valor) if coluna in COLUNAS_DATA else valor
+                print(f"{coluna}: {valor}")
+    
+    def possiveis_duplicados(self, registro):
+        """Procura registros da mesma paciente: mesmo CPF, mesmo SUS ou mesmo nome e nascimento
+        
+        registro é um RegistroPaciente (ou dicionário) com os valores já
+        convertidos. Cada critério é uma consulta por índice (com cifragem
+        ativa, sobre os índices cegos). Retorna uma lista de (id,
+        nome_completo, data_nascimento, cpf, sus, local_atendimento,
+        critérios coincidentes).
+        """
+        criterios = []
+        nome, cpf, sus = chaves_indice(registro, self.cifra)
+        if cpf:
+            criterios.append(("CPF", "cpf_normalizado = ?", (cpf,)))
+        if sus:
+            criterios.append(("SUS", "sus_normalizado = ?", (sus,)))
+        if nome and registro.get('data_nascimento'):
+            criterios.append(("nome e nascimento", "data_nascimento = ? AND nome_normalizado = ?",
+                              (registro.get('data_nascimento'), nome)))
+        
+        encontrados = {}
+        with self.leitura() as cursor:
+            for descricao, condicao, parametros in criterios:
+                cursor.execute(f'''
+                    SELECT {self.colunas_consulta(COLUNAS_DUPLICADO)}
+                    FROM pacientes
+                    WHERE {condicao}
+                    LIMIT 20
+                ''', parametros)
+                for linha in self.decifrar_linhas(cursor.fetchall(), COLUNAS_DUPLICADO):
+                    encontrados.setdefault(linha[0], (linha, []))[1].append(descricao)
+        return [linha + (', '.join(motivos),) for linha, motivos in encontrados.values()]
+    
+    def confirmar_duplicados(self, registro):
+        """Avisa se a paciente parece já estar registrada; retorna False para cancelar"""
+        duplicados = self.possiveis_duplicados(registro)
+        if not duplicados:
+            return True
+        
+        print("\n⚠ Esta paciente pode já estar registrada:")
+        for id_registro, nome, nascimento, cpf, sus, local, motivos in duplicados:
+            print(f"  ID {id_registro}: {nome} | Nasc.: {formatar_data(nascimento) or '-'} | "
+                  f"CPF: {cpf or '-'} | SUS: {sus or '-'} | {local or '-'} (mesmo {motivos})")
+        return self.get_input("Continuar o novo registro mesmo assim? (s/n): ", tipo="sim_nao") != 'n'
+    
+    def agrupar_duplicados(self, limiar=0.85, tamanho_lote=5000):
+        """Agrupa os registros que parecem ser da mesma paciente
+        
+        Sem comparar todos os pares: CPF e SUS iguais saem de um GROUP BY nos
+        índices, e a semelhança de nomes (difflib) só é calculada dentro de
+        blocos com a mesma data de nascimento e a mesma inicial do nome, lidos
+        em lotes na ordem do índice (data_nascimento, nome_normalizado). Com
+        cifragem ativa os nomes do bloco são decifrados para a comparação.
+        Retorna os grupos (listas de ids), dos maiores para os menores.
+        """
+        pais = {}
+        
+        def raiz(id_registro):
+            pais.setdefault(id_registro, id_registro)
+            while pais[id_registro] != id_registro:
+                pais[id_registro] = pais[pais[id_registro]]
+                id_registro = pais[id_registro]
+            return id_registro
+        
+        def unir(ids):
+            primeiro = raiz(ids[0])
+            for outro in ids[1:]:
+                pais[raiz(outro)] = primeiro
+        
+        def comparar_bloco(bloco):
+            # bloco: registros com a mesma data de nascimento; compara por inicial
+            por_inicial = {}
+            for id_registro, nome in bloco:
+                por_inicial.setdefault(nome[:1], []).append((id_registro, nome))
+            for nomes in por_inicial.values():
+                for i, (id_a, nome_a) in enumerate(nomes):
+                    # SequenceMatcher guarda as informações da segunda sequência
+                    comparador = difflib.SequenceMatcher(None, b=nome_a, autojunk=False)
+                    for id_b, nome_b in nomes[i + 1:]:
+                        comparador.set_seq1(nome_b)
+                        if nome_a == nome_b or (comparador.real_quick_ratio() >= limiar
+                                                and comparador.quick_ratio() >= limiar
+                                                and comparador.ratio() >= limiar):
+                            unir([id_a, id_b])
+        
+        with self.leitura() as cursor:
+            for coluna in ('cpf_normalizado', 'sus_normalizado'):
+                cursor.execute(f'''
+                    SELECT group_concat(id) FROM pacientes
+                    WHERE {coluna} IS NOT NULL
+                    GROUP BY {coluna}
+                    HAVING COUNT(*) > 1
+                ''')
+                for (ids,) in cursor.fetchall():
+                    unir([int(id_registro) for id_registro in ids.split(',')])
+            
+            # Com cifragem, nome_normalizado só serve para paginar; o nome vem
+            # de dados_cifrados
+            nome_cifrado = ", dados_cifrados" if self.cifra is not None else ""
+            posicao_nome = ORDEM_CIFRADA.index('nome_completo') if self.cifra is not None else None
+            ultimo = ('', '', 0)
+            bloco, nascimento_bloco = [], None
+            while True:
+                cursor.execute(f'''
+                    SELECT data_nascimento, nome_normalizado, id{nome_cifrado} FROM pacientes
+                    WHERE data_nascimento IS NOT NULL
+                      AND (data_nascimento, nome_normalizado, id) > (?, ?, ?)
+                    ORDER BY data_nascimento, nome_normalizado, id
+                    LIMIT ?
+                ''', ultimo + (tamanho_lote,))
+                linhas = cursor.fetchall()
+                for nascimento, nome, id_registro, *cifrado in linhas:
+                    if nascimento != nascimento_bloco:
+                        comparar_bloco(bloco)
+                        bloco, nascimento_bloco = [], nascimento
+                    if cifrado and cifrado[0] is not None:
+                        nome = normalizar_texto(self.cifra.decifrar_linha(cifrado[0])[posicao_nome])
+                    bloco.append((id_registro, nome))
+                if len(linhas) < tamanho_lote:
+                    break
+                ultimo = linhas[-1][:3]
+            comparar_bloco(bloco)
+        
+        grupos = {}
+        for id_registro in pais:
+            grupos.setdefault(raiz(id_registro), []).append(id_registro)
+        return sorted((sorted(ids) for ids in grupos.values() if len(ids) > 1),
+                      key=lambda ids: (-len(ids), ids[0]))
+    
+    def duplicados(self):
+        """Lista os grupos de registros que parecem ser da mesma paciente"""
+        print("\n" + "="*60)
+        print("POSSÍVEIS PACIENTES DUPLICADAS")
+        print("="*60)
+        
+        inicio = time.perf_counter()
+        grupos = self.agrupar_duplicados()
+        print(f"{len(grupos)} grupo(s) encontrado(s) em {time.perf_counter() - inicio:.1f}s")
+        
+        colunas = ['id', 'nome_completo', 'data_nascimento', 'cpf', 'sus', 'local_atendimento', 'data_insercao']
+        for numero, grupo in enumerate(grupos[:20], start=1):
+            print(f"\nGrupo {numero}:")
+            for id_registro in grupo:
+                registro = self.obter_paciente(id_registro)
+                print(f"  ID {registro.id}: {registro.nome_completo} | "
+                      f"Nasc.: {formatar_data(registro.data_nascimento) or '-'} | "
+                      f"CPF: {registro.cpf or '-'} | SUS: {registro.sus or '-'} | "
+                      f"{registro.local_atendimento or '-'} | "
+                      f"Inserção: {formatar_data(registro.data_insercao) or '-'}")
+        
+        if len(grupos) > 20:
+            print(f"\n... e mais {len(grupos) - 20} grupo(s).")
+        if grupos and self.get_input("\nSalvar a lista completa em CSV? (s/n): ", tipo="sim_nao") == 's':
+            nome_arquivo = f"duplicados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            with open(nome_arquivo, 'w', newline='', encoding='utf-8') as arquivo_csv:
+                writer = csv.writer(arquivo_csv)
+                writer.writerow(['grupo'] + colunas)
+                for numero, grupo in enumerate(grupos, start=1):
+                    for id_registro in grupo:
+                        registro = self.obter_paciente(id_registro)
+                        writer.writerow([numero] + [getattr(registro, coluna) for coluna in colunas])
+            print(f"✓ Arquivo: {nome_arquivo}")
+    
+    def revisoes_pendentes(self, data_inicio, data_fim, apos=None, limite=50):
+        """Lista pacientes com primeira revisão entre data_inicio e data_fim
+        
+        As datas são AAAA-MM-DD. O resultado vem ordenado por data da revisão
+        e id, uma página por vez: para a página seguinte, passe em apos o par
+        (data_primeira_revisao, id) do último registro recebido. Cada página
+        é uma busca no índice de data_primeira_revisao, com custo constante.
+        """
+        ultima_data, ultimo_id = apos or ('', 0)
+        with self.leitura() as cursor:
+            cursor.execute(f'''
+                SELECT {self.colunas_consulta(COLUNAS_REVISAO)}
+                FROM pacientes
+                WHERE data_primeira_revisao BETWEEN ? AND ?
+                  AND (data_primeira_revisao, id) > (?, ?)
+                ORDER BY data_primeira_revisao, id
+                LIMIT ?
+            ''', (data_inicio, data_fim, ultima_data, ultimo_id, limite))
+            return self.decifrar_linhas(cursor.fetchall(), COLUNAS_REVISAO)
+    
+    def revisoes_novas(self, data_inicio, data_fim, nome_lista='diaria'):
+        """Lista as revisões no período entre os registros feitos desde a última execução
+        
+        O último id visto por cada lista fica em tarefas_manutencao, então
+        cada execução lê apenas os registros novos (id > último id), e não a
+        tabela inteira.
+        """
+        tarefa = f"revisoes:{nome_lista}"
+        self.cursor.execute("INSERT OR IGNORE INTO tarefas_manutencao (nome) VALUES (?)", (tarefa,))
+        self.cursor.execute("SELECT ultimo_id FROM tarefas_manutencao WHERE nome = ?", (tarefa,))
+        ultimo_id = self.cursor.fetchone()[0]
+        
+        self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM pacientes")
+        maior_id = self.cursor.fetchone()[0]
+        
+        self.cursor.execute(f'''
+            SELECT {self.colunas_consulta(COLUNAS_REVISAO)}
+            FROM pacientes
+            WHERE id > ? AND id <= ?
+              AND data_primeira_revisao BETWEEN ? AND ?
+            ORDER BY data_primeira_revisao, id
+        ''', (ultimo_id, maior_id, data_inicio, data_fim))
+        registros = self.decifrar_linhas(self.cursor.fetchall(), COLUNAS_REVISAO)
+        
+        self.cursor.execute("UPDATE tarefas_manutencao SET ultimo_id = ? WHERE nome = ?", (maior_id, tarefa))
+        self.conn.commit()
+        return registros
+    
+    def lista_revisoes(self):
+        """Exibe os pacientes com primeira revisão em um período"""
+        print("\n" + "="*60)
+        print("REVISÕES AGENDADAS")
+        print("="*60)
+        
+        hoje = date.today()
+        data_inicio = self.get_input(f"Revisões a partir de (DD/MM/AAAA) [{hoje.strftime('%d/%m/%Y')}]: ", tipo="data")
+        data_inicio = data_inicio or hoje.isoformat()
+        fim_padrao = interpretar_data(data_inicio) + timedelta(days=7)
+        data_fim = self.get_input(f"Revisões até (DD/MM/AAAA) [{fim_padrao.strftime('%d/%m/%Y')}]: ", tipo="data")
+        data_fim = data_fim or fim_padrao.isoformat()
+        apenas_novas = self.get_input("Apenas pacientes registrados desde a última consulta? (s/n) [n]: ",
+                                      tipo="sim_nao") == 's'
+        
+        def exibir(registros):
+            for reg in registros:
+                print(f"\n{formatar_data(reg[3])} - ID: {reg[0]} - {reg[1]}")
+                print(f"Telefone: {reg[2] or 'N/A'} | Local: {reg[5] or 'N/A'} | "
+                      f"DIU: {reg[6] or 'N/A'} | Inserção: {formatar_data(reg[4]) or 'N/A'}")
+        
+        if apenas_novas:
+            registros = self.revisoes_novas(data_inicio, data_fim)
+            if not registros:
+                print("\nNenhum paciente novo com revisão no período.")
+                return
+            exibir(registros)
+            print(f"\n{len(registros)} paciente(s) novo(s) com revisão no período.")
+            return
+        
+        apos = None
+        total = 0
+        while True:
+            registros = self.revisoes_pendentes(data_inicio, data_fim, apos)
+            if not registros:
+                if not total:
+                    print("\nNenhum paciente com revisão no período.")
+                break
+            exibir(registros)
+            total += len(registros)
+            apos = (registros[-1][3], registros[-1][0])
+            print("-"*60)
+            continuar = self.get_input(f"{total} paciente(s) exibido(s). Ver mais? (s/n): ", tipo="sim_nao")
+            if continuar != 's':
+                break
+    
+    def relatorio_estatisticas(self, mes_inicio=None, mes_fim=None):
+        """Retorna as estatísticas mensais já consolidadas
+        
+        Lê apenas a tabela de resumo (uma linha por mês e grupo), sem
+        percorrer os pacientes. Meses no formato AAAA-MM; registros sem data
+        de inserção válida aparecem com mês ''. Retorna
+        {mes: {dimensao: {valor: {total, tentativas, sucesso, soma_dor, qtd_dor}}}}.
+        """
+        condicoes = ["total <> 0"]
+        parametros = []
+        if mes_inicio:
+            condicoes.append("mes >= ?")
+            parametros.append(mes_inicio)
+        if mes_fim:
+            condicoes.append("mes <= ?")
+            parametros.append(mes_fim)
+        
+        relatorio = {}
+        with self.leitura() as cursor:
+            cursor.execute(f'''
+                SELECT mes, dimensao, valor, total, tentativas, sucesso, soma_dor, qtd_dor
+                FROM estatisticas_mensais
+                WHERE {' AND '.join(condicoes)}
+                ORDER BY mes, dimensao, valor
+            ''', parametros)
+            for mes, dimensao, valor, total, tentativas, sucesso, soma_dor, qtd_dor in cursor:
+                relatorio.setdefault(mes, {}).setdefault(dimensao, {})[valor] = {
+                    'total': total, 'tentativas': tentativas, 'sucesso': sucesso,
+                    'soma_dor': soma_dor, 'qtd_dor': qtd_dor,
+                }
+        return relatorio
+    
+    def reconstruir_estatisticas(self):
+        """Recalcula as estatísticas mensais do zero a partir dos pacientes"""
+        self.cursor.execute("DELETE FROM estatisticas_mensais")
+        self.cursor.execute(f"INSERT INTO estatisticas_mensais {sql_calcular_estatisticas()}")
+        self.conn.commit()
+    
+    def verificar_estatisticas(self):
+        """Compara a tabela de resumo com um recálculo completo
+        
+        Retorna a lista de (mes, dimensao, valor) divergentes; vazia se a
+        tabela estiver consistente.
+        """
+        self.cursor.execute(f'''
+            WITH calculado AS ({sql_calcular_estatisticas()}),
+            resumo AS (
+                SELECT mes, dimensao, valor, total, tentativas, sucesso, soma_dor, qtd_dor
+                FROM estatisticas_mensais
+                WHERE total <> 0
+            )
+            -- Cada EXCEPT em sua subconsulta: operadores compostos são avaliados
+            -- da esquerda para a direita, sem precedência
+            SELECT mes, dimensao, valor FROM (SELECT * FROM calculado EXCEPT SELECT * FROM resumo)
+            UNION
+            SELECT mes, dimensao, valor FROM (SELECT * FROM resumo EXCEPT SELECT * FROM calculado)
+        ''')
+        return self.cursor.fetchall()
+    
+    def estatisticas(self):
+        """Exibe o relatório mensal de estatísticas"""
+        print("\n" + "="*60)
+        print("ESTATÍSTICAS MENSAIS")
+        print("="*60)
+        print("1. Ver relatório")
+        print("2. Verificar consistência")
+        print("3. Recalcular do zero")
+        
+        opcao = self.get_input("Escolha uma opção (1-3) [1]: ") or '1'
+        
+        if opcao == '2':
+            divergencias = self.verificar_estatisticas()
+            if divergencias:
+                print(f"\n✗ {len(divergencias)} grupo(s) divergente(s). Use a opção 3 para recalcular.")
+            else:
+                print("\n✓ Estatísticas consistentes com os registros.")
+            return
+        if opcao == '3':
+            self.reconstruir_estatisticas()
+            print("\n✓ Estatísticas recalculadas.")
+            return
+        if opcao != '1':
+            print("\n✗ Opção inválida!")
+            return
+        
+        mes_inicio = self.get_input("Mês inicial (AAAA-MM) [todos]: ")
+        mes_fim = self.get_input("Mês final (AAAA-MM) [todos]: ")
+        relatorio = self.relatorio_estatisticas(mes_inicio, mes_fim)
+        
+        if not relatorio:
+            print("\nNenhum registro no período.")
+            return
+        
+        for mes, dimensoes in relatorio.items():
+            total = dimensoes['total']['']
+            print("\n" + "-"*60)
+            print(f"MÊS: {mes or 'sem data de inserção'} - {total['total']} registro(s)")
+            if total['tentativas']:
+                taxa = 100 * total['sucesso'] / total['tentativas']
+                print(f"Taxa de sucesso da inserção: {taxa:.1f}% ({total['sucesso']}/{total['tentativas']})")
+            
+            for dimensao, titulo in (('diu_escolhido', "DIU escolhido"), ('motivo', "Motivos"),
+                                     ('dificuldade_insercao', "Dificuldade na inserção")):
+                if dimensao in dimensoes:
+                    print(f"{titulo}:")
+                    for valor, contagem in dimensoes[dimensao].items():
+                        print(f"  {valor or 'não informado'}: {contagem['total']}")
+            
+            for dimensao, titulo in (('dor_momento', "Dor média por momento"),
+                                     ('inserido_por', "Dor média por profissional")):
+                grupos = {v: c for v, c in dimensoes.get(dimensao, {}).items() if c['qtd_dor']}
+                if grupos:
+                    print(f"{titulo}:")
+                    for valor, contagem in grupos.items():
+                        media = contagem['soma_dor'] / contagem['qtd_dor']
+                        print(f"  {valor or 'não informado'}: {media:.1f} (n={contagem['qtd_dor']})")
+    
+    def colunas_exportaveis(self):
+        """Retorna as colunas da tabela de pacientes, na ordem, sem as internas"""
+        with self.leitura() as cursor:
+            cursor.execute("PRAGMA table_info(pacientes)")
+            return [col[1] for col in cursor.fetchall() if col[1] not in COLUNAS_INTERNAS]
+    
+    def iterar_lotes(self, colunas=None, data_inicio=None, data_fim=None,
+                     local_atendimento=None, tamanho_lote=1000):
+        """Percorre os registros em lotes, paginando pelo id
+        
+        Cada lote é uma consulta curta (WHERE id > ? LIMIT ?), então nenhuma
+        transação de leitura fica aberta durante toda a exportação e a memória
+        usada depende apenas do tamanho do lote. As datas (AAAA-MM-DD) filtram
+        pela data de inserção do DIU.
+        """
+        exportaveis = self.colunas_exportaveis()
+        if colunas is None:
+            colunas = exportaveis
+        invalid_columns = set(colunas) - set(exportaveis)
+        if invalid_columns:
+            raise ValueError(f"Colunas inválidas: {invalid_columns}")
+        
+        condicoes = ["id > ?"]
+        parametros = []
+        if data_inicio:
+            condicoes.append("data_insercao >= ?")
+            parametros.append(data_inicio)
+        if data_fim:
+            condicoes.append("data_insercao <= ?")
+            parametros.append(data_fim)
+        if local_atendimento:
+            condicoes.append("local_atendimento = ?")
+            parametros.append(local_atendimento)
+        
+        query = f'''
+            SELECT id, {self.colunas_consulta(colunas)}
+            FROM pacientes
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY id
+            LIMIT ?
+        '''
+        
+        ultimo_id = 0
+        with self.leitura() as cursor:
+            while True:
+                cursor.execute(query, [ultimo_id] + parametros + [tamanho_lote])
+                lote = cursor.fetchall()
+                if not lote:
+                    break
+                ultimo_id = lote[-1][0]
+                yield self.decifrar_linhas([reg[1:] for reg in lote], colunas)
+                if len(lote) < tamanho_lote:
+                    break
+    
+    def exportar_registros(self, nome_arquivo, colunas=None, data_inicio=None, data_fim=None,
+                           local_atendimento=None, compactar=False, tamanho_lote=1000,
+                           progresso=None):
+        """Exporta registros para CSV gravando lote a lote
+        
+        Retorna o número de registros exportados. Com compactar=True o arquivo
+        é gravado em gzip. Se informado, progresso(total) é chamado após cada
+        lote.
+        """
+        abrir = gzip.open if compactar else open
+        with abrir(nome_arquivo, 'wt', newline='', encoding='utf-8') as arquivo_csv:
+            return self.escrever_csv(arquivo_csv, colunas, data_inicio, data_fim,
+                                     local_atendimento, tamanho_lote, progresso)
+    
+    def escrever_csv(self, arquivo_csv, colunas=None, data_inicio=None, data_fim=None,
+                     local_atendimento=None, tamanho_lote=1000, progresso=None):
+        """Escreve os registros em CSV, lote a lote, em um arquivo de texto já aberto"""
+        if colunas is None:
+            colunas = self.colunas_exportaveis()
+        
+        total = 0
+        writer = csv.writer(arquivo_csv)
+        writer.writerow(colunas)
+        for lote in self.iterar_lotes(colunas, data_inicio, data_fim,
+                                      local_atendimento, tamanho_lote):
+            writer.writerows(lote)
+            total += len(lote)
+            if progresso:
+                progresso(total)
+        return total
+    
+    def exportar_colunar(self, destino, colunas=None, data_inicio=None, data_fim=None,
+                         local_atendimento=None, tamanho_grupo=65536, progresso=None, descartados=None):
+        """Exporta registros em formato colunar tipado para análise
+        
+        Com pyarrow grava um arquivo Parquet com um grupo de linhas por lote:
+        motivos e campos s/n viram booleanos, medidas viram float, datas viram
+        date e campos categóricos usam codificação por dicionário. Sem pyarrow
+        (mas com NumPy) grava um diretório com um arquivo .npz por lote.
+        Valores antigos que não podem ser convertidos (texto em coluna
+        numérica, data inválida) são exportados como ausentes e contados em
+        descartados, se informado: {coluna: quantidade}. Retorna o número de
+        registros exportados.
+        """
+        if colunas is None:
+            colunas = self.colunas_exportaveis()
+        tipos = [tipo_coluna(coluna) for coluna in colunas]
+        lotes = self.iterar_lotes(colunas, data_inicio, data_fim, local_atendimento, tamanho_grupo)
+        
+        if pa is not None:
+            gravar = self.gravar_parquet
+        elif np is not None:
+            gravar = self.gravar_npz
+        else:
+            raise RuntimeError("A exportação colunar requer pyarrow ou numpy instalados")
+        
+        total = 0
+        for n in gravar(destino, colunas, tipos, lotes, descartados):
+            total += n
+            if progresso:
+                progresso(total)
+        return total
+    
+    def gravar_parquet(self, destino, colunas, tipos, lotes, descartados=None):
+        """Grava os lotes como grupos de linhas de um arquivo Parquet"""
+        tipos_arrow = {
+            'flag': pa.bool_(),
+            'sim_nao': pa.bool_(),
+            'data': pa.date32(),
+            'timestamp': pa.timestamp('s'),
+            'numero': pa.int64(),
+            'decimal': pa.float64(),
+            'categoria': pa.string(),
+            'texto': pa.string(),
+        }
+        schema = pa.schema([
+            (coluna, pa.dictionary(pa.int32(), pa.string()) if tipo == 'categoria' else tipos_arrow[tipo])
+            for coluna, tipo in zip(colunas, tipos)
+        ])
+        
+        with pq.ParquetWriter(destino, schema) as writer:
+            for lote in lotes:
+                arrays = []
+                for i, (coluna, tipo) in enumerate(zip(colunas, tipos)):
+                    valores = converter_coluna(tipo, [reg[i] for reg in lote], coluna, descartados)
+                    array = pa.array(valores, type=tipos_arrow[tipo])
+                    if tipo == 'categoria':
+                        array = array.dictionary_encode()
+                    arrays.append(array)
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                yield len(lote)
+    
+    def gravar_npz(self, destino, colunas, tipos, lotes, descartados=None):
+        """Grava cada lote como um arquivo .npz tipado dentro do diretório destino
+        
+        Campos s/n e motivos são int8 (1, 0, -1 ausente), inteiros ausentes são
+        indicados por <coluna>__valido, datas são datetime64[D] e categorias
+        são códigos int32 (-1 ausente) com o vocabulário em <coluna>__categorias.
+        """
+        os.makedirs(destino, exist_ok=True)
+        for numero, lote in enumerate(lotes):
+            arrays = {}
+            for i, (coluna, tipo) in enumerate(zip(colunas, tipos)):
+                valores = converter_coluna(tipo, [reg[i] for reg in lote], coluna, descartados)
+                if tipo in ('flag', 'sim_nao'):
+                    arrays[coluna] = np.array([-1 if v is None else int(v) for v in valores], dtype=np.int8)
+                elif tipo in ('data', 'timestamp'):
+                    unidade = 'D' if tipo == 'data' else 's'
+                    arrays[coluna] = np.array(valores, dtype=f'datetime64[{unidade}]')
+                elif tipo == 'decimal':
+                    arrays[coluna] = np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+                elif tipo == 'numero':
+                    arrays[coluna] = np.array([0 if v is None else v for v in valores], dtype=np.int64)
+                    arrays[f'{coluna}__valido'] = np.array([v is not None for v in valores], dtype=bool)
+                elif tipo == 'categoria':
+                    categorias = sorted({v for v in valores if v is not None})
+                    codigos = {v: n for n, v in enumerate(categorias)}
+                    arrays[coluna] = np.array([codigos.get(v, -1) for v in valores], dtype=np.int32)
+                    arrays[f'{coluna}__categorias'] = np.array(categorias, dtype=str)
+                else:
+                    arrays[coluna] = np.array(['' if v is None else v for v in valores], dtype=str)
+            np.savez(os.path.join(destino, f'parte_{numero:05d}.npz'), **arrays)
+            yield len(lote)
     
     def exportar_csv(self):
-        """Exporta todos os registros para um arquivo CSV"""
+        """Exporta os registros para um arquivo CSV"""
         print("\n" + "="*60)
         print("EXPORTAR PARA CSV")
         print("="*60)
@@ -431,25 +3042,455 @@ class FormularioDIU:
         if not nome_arquivo:
             nome_arquivo = "export"
         
+        colunas = self.get_input("Colunas, separadas por vírgula [todas]: ")
+        if colunas:
+            colunas = [c.strip() for c in colunas.split(',') if c.strip()]
+            invalid_columns = set(colunas) - set(self.colunas_exportaveis())
+            if invalid_columns:
+                print(f"\n✗ Erro: Colunas inválidas: {invalid_columns}")
+                return
+        data_inicio = self.get_input("Inserções a partir de (DD/MM/AAAA) [sem limite]: ", tipo="data")
+        data_fim = self.get_input("Inserções até (DD/MM/AAAA) [sem limite]: ", tipo="data")
+        local_atendimento = self.get_input("Local de atendimento [todos]: ")
+        compactar = self.get_input("Compactar com gzip? (s/n) [n]: ", tipo="sim_nao") == 's'
+        
         nome_arquivo = f"{nome_arquivo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        if compactar:
+            nome_arquivo += ".gz"
         
-        self.cursor.execute('SELECT * FROM pacientes')
-        registros = self.cursor.fetchall()
+        def progresso(total):
+            print(f"\r{total} registro(s) exportado(s)...", end='', flush=True)
         
-        if not registros:
+        total = self.exportar_registros(nome_arquivo, colunas, data_inicio, data_fim,
+                                        local_atendimento, compactar, progresso=progresso)
+        
+        if not total:
+            os.remove(nome_arquivo)
             print("Nenhum registro para exportar.")
             return
         
-        # Obter nomes das colunas
-        colunas = [desc[0] for desc in self.cursor.description]
+        print(f"\n✓ {total} registro(s) exportado(s) com sucesso!")
+        print(f"Arquivo: {nome_arquivo}")
+    
+    def ler_arquivo_importacao(self, caminho, codificacao='utf-8-sig'):
+        """Lê (número da linha, registro) de um arquivo CSV ou JSONL
+        
+        No JSONL o registro é o texto da linha, ainda não interpretado: um
+        JSON inválido é rejeitado como as demais linhas, em importar_registros.
+        """
+        with open(caminho, newline='', encoding=codificacao) as arquivo:
+            if caminho.lower().endswith(('.jsonl', '.ndjson')):
+                for numero, linha in enumerate(arquivo, start=1):
+                    if linha.strip():
+                        yield numero, linha
+            else:
+                leitor = csv.DictReader(arquivo)
+                inicio = 2
+                for registro in leitor:
+                    yield inicio, registro
+                    inicio = leitor.line_num + 1
+    
+    def conferir_codificacao(self, caminho, codificacao='utf-8-sig'):
+        """Lê o arquivo inteiro antes da importação para recusar uma codificação errada
+        
+        Sem isso, um byte inválido no meio do arquivo interromperia a
+        importação com lotes anteriores já gravados.
+        """
+        with open(caminho, newline='', encoding=codificacao) as arquivo:
+            try:
+                while arquivo.read(1 << 20):
+                    pass
+            except UnicodeDecodeError as erro:
+                raise ValueError(f"O arquivo não está na codificação {codificacao} (byte inválido na "
+                                 f"posição {erro.start}); informe a codificação, por exemplo latin-1") from None
+    
+    def importar_registros(self, caminho, tamanho_lote=1000, arquivo_erros=None, progresso=None,
+                           codificacao='utf-8-sig'):
+        """Importa registros em lote de um arquivo CSV ou JSONL
+        
+        Cada linha passa pelas mesmas validações do formulário. A coluna id,
+        presente nos arquivos de exportar_registros, é ignorada: os
+        registros importados recebem ids novos. As linhas válidas são
+        gravadas com executemany, uma transação por lote, com a
+        sincronização em disco por linha desligada durante a carga. As linhas
+        rejeitadas, inclusive linhas JSONL que não são JSON válido, vão para
+        arquivo_erros (padrão: <arquivo>.erros.csv), com o número da linha
+        no arquivo. Um arquivo que não está em codificacao é recusado antes
+        do primeiro lote. Retorna um dicionário com inseridos, rejeitados, segundos e
+        registros_por_segundo.
+        """
+        if arquivo_erros is None:
+            arquivo_erros = f"{caminho}.erros.csv"
+        self.conferir_codificacao(caminho, codificacao)
+        
+        inicio = time.perf_counter()
+        inseridos = 0
+        rejeitados = 0
+        erros_csv = None
+        writer_erros = None
+        lote = []
+        
+        def gravar_lote():
+            # Cada lote com a trava de escrita, como inserir_registro: o
+            # servidor pode estar gravando pela mesma conexão
+            with self.trava_escrita:
+                try:
+                    self.cursor.executemany(SQL_INSERIR_PACIENTE, lote)
+                    self.conn.commit()
+                except sqlite3.Error:
+                    self.conn.rollback()
+                    raise
+        
+        with self.trava_escrita:
+            self.cursor.execute("PRAGMA synchronous")
+            synchronous = self.cursor.fetchone()[0]
+            self.cursor.execute("PRAGMA synchronous = OFF")
+        try:
+            for numero, registro in self.ler_arquivo_importacao(caminho, codificacao):
+                try:
+                    if isinstance(registro, str):
+                        registro = json.loads(registro)
+                    if not isinstance(registro, dict):
+                        raise ValueError("Linha não é um objeto JSON")
+                    if 'id' in registro:
+                        registro = {coluna: valor for coluna, valor in registro.items() if coluna != 'id'}
+                    lote.append(validar_registro(registro).valores_insercao(self.cifra))
+                except ValueError as erro:
+                    rejeitados += 1
+                    if writer_erros is None:
+                        erros_csv = open(arquivo_erros, 'w', newline='', encoding='utf-8')
+                        writer_erros = csv.writer(erros_csv)
+                        writer_erros.writerow(['linha', 'erro', 'registro'])
+                    if not isinstance(registro, str):
+                        registro = json.dumps(registro, ensure_ascii=False)
+                    writer_erros.writerow([numero, str(erro), registro.rstrip('\r\n')])
+                    continue
+                
+                if len(lote) >= tamanho_lote:
+                    gravar_lote()
+                    inseridos += len(lote)
+                    lote = []
+                    if progresso:
+                        progresso(inseridos, rejeitados)
+            
+            if lote:
+                gravar_lote()
+                inseridos += len(lote)
+                if progresso:
+                    progresso(inseridos, rejeitados)
+        finally:
+            with self.trava_escrita:
+                self.cursor.execute(f"PRAGMA synchronous = {synchronous}")
+            if erros_csv:
+                erros_csv.close()
+        
+        segundos = time.perf_counter() - inicio
+        return {
+            'inseridos': inseridos,
+            'rejeitados': rejeitados,
+            'arquivo_erros': arquivo_erros if rejeitados else None,
+            'segundos': segundos,
+            'registros_por_segundo': inseridos / segundos if segundos else 0.0,
+        }
+    
+    def importar_arquivo(self):
+        """Importa registros de um arquivo CSV ou JSONL"""
+        print("\n" + "="*60)
+        print("IMPORTAR REGISTROS")
+        print("="*60)
+        print("Aceita CSV (cabeçalho com os nomes das colunas) ou JSONL (um registro por linha).")
+        
+        caminho = self.get_input("Caminho do arquivo: ", required=True)
+        if not os.path.exists(caminho):
+            print(f"\n✗ Arquivo não encontrado: {caminho}")
+            return
+        codificacao = self.get_input("Codificação do arquivo [utf-8]: ") or 'utf-8-sig'
+        
+        def progresso(inseridos, rejeitados):
+            print(f"\r{inseridos} registro(s) importado(s), {rejeitados} rejeitado(s)...", end='', flush=True)
+        
+        try:
+            resultado = self.importar_registros(caminho, progresso=progresso, codificacao=codificacao)
+        except LookupError:
+            print(f"\n✗ Erro: codificação desconhecida: {codificacao}")
+            return
+        except (OSError, ValueError, sqlite3.Error) as erro:
+            print(f"\n✗ Erro: {erro}")
+            return
+        
+        print(f"\n✓ {resultado['inseridos']} registro(s) importado(s) em {resultado['segundos']:.1f}s "
+              f"({resultado['registros_por_segundo']:.0f} registros/s)")
+        if resultado['rejeitados']:
+            print(f"✗ {resultado['rejeitados']} registro(s) rejeitado(s). Veja: {resultado['arquivo_erros']}")
+    
+    def exportar_analise(self):
+        """Exporta os registros em formato colunar tipado"""
+        print("\n" + "="*60)
+        print("EXPORTAR PARA ANÁLISE")
+        print("="*60)
+        
+        if pa is None and np is None:
+            print("\n✗ Erro: instale pyarrow (recomendado) ou numpy para usar esta opção.")
+            return
+        
+        nome_arquivo = self.get_input("Nome do arquivo (sem extensão) [export]: ")
+        if not nome_arquivo:
+            nome_arquivo = "export"
+        
+        data_inicio = self.get_input("Inserções a partir de (DD/MM/AAAA) [sem limite]: ", tipo="data")
+        data_fim = self.get_input("Inserções até (DD/MM/AAAA) [sem limite]: ", tipo="data")
+        local_atendimento = self.get_input("Local de atendimento [todos]: ")
+        
+        nome_arquivo = f"{nome_arquivo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Sem pyarrow o destino é um diretório de arquivos .npz
+        if pa is not None:
+            nome_arquivo += ".parquet"
         
-        with open(nome_arquivo, 'w', newline='', encoding='utf-8') as arquivo_csv:
-            writer = csv.writer(arquivo_csv)
-            writer.writerow(colunas)
-            writer.writerows(registros)
+        def progresso(total):
+            print(f"\r{total} registro(s) exportado(s)...", end='', flush=True)
         
-        print(f"\n✓ {len(registros)} registro(s) exportado(s) com sucesso!")
+        descartados = {}
+        total = self.exportar_colunar(nome_arquivo, data_inicio=data_inicio, data_fim=data_fim,
+                                      local_atendimento=local_atendimento, progresso=progresso,
+                                      descartados=descartados)
+        
+        print(f"\n✓ {total} registro(s) exportado(s) com sucesso!")
         print(f"Arquivo: {nome_arquivo}")
+        for coluna, quantidade in descartados.items():
+            print(f"⚠ {coluna}: {quantidade} valor(es) inválido(s) exportado(s) como ausente(s)")
+    
+    def backup(self, destino, paginas=256, pausa=0.005, progresso=None):
+        """Copia o banco para destino com a API de backup online do SQLite
+        
+        Copia paginas páginas por passo e espera pausa segundos entre os
+        passos, então as gravações continuam durante o backup. A fonte é a
+        própria conexão de escrita: o que ela grava durante a cópia entra no
+        backup sem recomeçar (gravações de outros processos fazem a cópia
+        recomeçar). O backup é gravado em <destino>.tmp, conferido com
+        integrity_check e só então renomeado. Se informado,
+        progresso(copiadas, total) é chamado a cada passo. Retorna o
+        resultado de verificar_banco mais segundos.
+        """
+        temporario = f"{destino}.tmp"
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        
+        def entre_passos(status, restantes, total):
+            if progresso:
+                progresso(total - restantes, total)
+            # O sleep de Connection.backup só vale quando o banco está
+            # ocupado; a pausa entre passos é feita aqui, fora do lock da
+            # conexão, para as gravações terem a vez
+            if restantes:
+                time.sleep(pausa)
+        
+        inicio = time.perf_counter()
+        copia = sqlite3.connect(temporario)
+        try:
+            self.conn.backup(copia, pages=paginas, progress=entre_passos, sleep=pausa)
+            # Backup em um arquivo só, sem -wal/-shm
+            copia.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            copia.close()
+        # As leituras do backup impedem o checkpoint e o WAL cresce durante a
+        # cópia; o checkpoint é feito aqui, em outra conexão, e não no commit
+        # da próxima gravação
+        with contextlib.closing(self.conectar()) as conn:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        
+        verificacao = verificar_banco(temporario)
+        if verificacao['integridade'] != 'ok':
+            os.remove(temporario)
+            raise ValueError(f"Backup com problemas de integridade: {verificacao['integridade'][:5]}")
+        os.replace(temporario, destino)
+        verificacao['arquivo'] = destino
+        verificacao['segundos'] = time.perf_counter() - inicio
+        return verificacao
+    
+    def exportar_alteracoes(self, destino, desde=0):
+        """Grava em destino (JSONL, gzip se terminar em .gz) as alterações após o número desde
+        
+        A primeira linha é o cabeçalho {origem, desde, ate, versao_esquema};
+        cada linha seguinte é {seq, operacao, id, registro}, uma por paciente
+        alterado, com o registro como está agora (operacao 'U', inclusive
+        para inserções) ou sem registro (operacao 'D'). Várias alterações do
+        mesmo paciente viram uma linha só. Tudo é lido em uma única transação
+        de leitura, então o arquivo corresponde exatamente às alterações até
+        ate. Retorna o cabeçalho mais alteracoes (número de linhas).
+        """
+        abrir = gzip.open if destino.endswith('.gz') else open
+        total = 0
+        with self.leitura() as cursor, abrir(destino, 'wt', encoding='utf-8') as arquivo:
+            # Sem pool de leitura, a conexão principal pode já estar em uma transação
+            transacao = not cursor.connection.in_transaction
+            if transacao:
+                cursor.execute("BEGIN")
+            try:
+                cursor.execute("SELECT origem FROM replicacao")
+                origem = cursor.fetchone()[0]
+                cursor.execute("PRAGMA user_version")
+                versao = cursor.fetchone()[0]
+                cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes")
+                ate = max(cursor.fetchone()[0], desde)
+                cursor.execute("PRAGMA table_info(pacientes)")
+                colunas = [col[1] for col in cursor.fetchall()]
+                
+                cabecalho = {'origem': origem, 'desde': desde, 'ate': ate, 'versao_esquema': versao}
+                arquivo.write(json.dumps(cabecalho) + "\n")
+                
+                # Última alteração de cada paciente no intervalo, com o registro atual
+                cursor.execute(f'''
+                    SELECT a.seq, a.paciente, {', '.join(f'p.{coluna}' for coluna in colunas)}
+                    FROM (SELECT paciente, MAX(seq) AS seq FROM alteracoes
+                          WHERE seq > ? AND seq <= ?
+                          GROUP BY paciente) a
+                    LEFT JOIN pacientes p ON p.id = a.paciente
+                    ORDER BY a.seq
+                ''', (desde, ate))
+                for seq, paciente, *valores in cursor:
+                    if valores[0] is None:
+                        alteracao = {'seq': seq, 'operacao': 'D', 'id': paciente}
+                    else:
+                        registro = {coluna: valor_para_json(valor) for coluna, valor in zip(colunas, valores)}
+                        alteracao = {'seq': seq, 'operacao': 'U', 'id': paciente, 'registro': registro}
+                    arquivo.write(json.dumps(alteracao, ensure_ascii=False) + "\n")
+                    total += 1
+            finally:
+                if transacao:
+                    cursor.execute("COMMIT")
+        return dict(cabecalho, alteracoes=total)
+    
+    def aplicar_alteracoes(self, caminho):
+        """Aplica um arquivo gerado por exportar_alteracoes em outro banco
+        
+        O banco deve ter partido de um backup da origem (ou de arquivos de
+        alterações anteriores). A posição já aplicada de cada origem fica em
+        tarefas_manutencao; arquivos já aplicados são ignorados e um arquivo
+        que deixe um intervalo sem aplicar é recusado. O arquivo inteiro é
+        aplicado em uma transação. Retorna {origem, ate, aplicadas}.
+        """
+        abrir = gzip.open if caminho.endswith('.gz') else open
+        with abrir(caminho, 'rt', encoding='utf-8') as arquivo:
+            cabecalho = json.loads(arquivo.readline() or 'null')
+            if not isinstance(cabecalho, dict) or 'origem' not in cabecalho:
+                raise ValueError(f"{caminho} não é um arquivo de alterações")
+            self.cursor.execute("PRAGMA user_version")
+            if cabecalho['versao_esquema'] > self.cursor.fetchone()[0]:
+                raise ValueError("As alterações são de uma versão mais nova do programa; atualize-o antes")
+            
+            tarefa = f"replicacao:{cabecalho['origem']}"
+            aplicadas = 0
+            with self.trava_escrita:
+                self.cursor.execute("INSERT OR IGNORE INTO tarefas_manutencao (nome) VALUES (?)", (tarefa,))
+                self.cursor.execute("SELECT ultimo_id FROM tarefas_manutencao WHERE nome = ?", (tarefa,))
+                ultimo = self.cursor.fetchone()[0]
+                self.conn.commit()
+                if cabecalho['ate'] <= ultimo:
+                    return {'origem': cabecalho['origem'], 'ate': ultimo, 'aplicadas': 0}
+                if cabecalho['desde'] > ultimo:
+                    raise ValueError(f"Faltam as alterações {ultimo + 1} a {cabecalho['desde']} desta origem")
+                
+                comandos = {}
+                try:
+                    for linha in arquivo:
+                        alteracao = json.loads(linha)
+                        if alteracao['operacao'] == 'D':
+                            self.cursor.execute("DELETE FROM pacientes WHERE id = ?", (alteracao['id'],))
+                        else:
+                            registro = alteracao['registro']
+                            colunas = tuple(registro)
+                            if colunas not in comandos:
+                                # Aqui as colunas internas são aceitas: a réplica recebe o
+                                # registro inteiro, inclusive dados_cifrados e os índices
+                                invalid_columns = set(colunas) - self.valid_columns
+                                if invalid_columns:
+                                    raise ValueError(f"Colunas inválidas: {invalid_columns}")
+                                comandos[colunas] = (
+                                    f"INSERT INTO pacientes ({', '.join(colunas)}) "
+                                    f"VALUES ({', '.join('?' * len(colunas))}) "
+                                    f"ON CONFLICT(id) DO UPDATE SET "
+                                    + ', '.join(f"{coluna} = excluded.{coluna}" for coluna in colunas if coluna != 'id')
+                                )
+                            self.cursor.execute(comandos[colunas], [valor_de_json(v) for v in registro.values()])
+                        aplicadas += 1
+                    self.cursor.execute("UPDATE tarefas_manutencao SET ultimo_id = ? WHERE nome = ?",
+                                        (cabecalho['ate'], tarefa))
+                    self.conn.commit()
+                except Exception:
+                    self.conn.rollback()
+                    raise
+        return {'origem': cabecalho['origem'], 'ate': cabecalho['ate'], 'aplicadas': aplicadas}
+    
+    def fazer_backup(self):
+        """Faz um backup do banco sem interromper o uso do sistema"""
+        print("\n" + "="*60)
+        print("BACKUP DO BANCO DE DADOS")
+        print("="*60)
+        
+        padrao = f"backup_formulario_diu_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        destino = self.get_input(f"Arquivo do backup [{padrao}]: ") or padrao
+        
+        def progresso(copiadas, total):
+            print(f"\r{copiadas}/{total} páginas copiadas...", end='', flush=True)
+        
+        try:
+            resultado = self.backup(destino, progresso=progresso)
+        except (ValueError, OSError, sqlite3.Error) as erro:
+            print(f"\n✗ Erro no backup: {erro}")
+            return
+        print(f"\n✓ Backup verificado: {resultado['registros']} registro(s) em {destino} "
+              f"({resultado['segundos']:.1f}s)")
+        print("Guarde uma cópia fora deste computador.")
+    
+    def diagnostico(self):
+        """Mostra onde o banco está gastando tempo e as operações lentas"""
+        print("\n" + "="*60)
+        print("DIAGNÓSTICO")
+        print("="*60)
+        
+        dados = self.resumo_diagnostico()
+        banco = dados['banco']
+        print(f"Banco: {banco['arquivo']} - {banco['registros']} registro(s), "
+              f"{banco['tamanho_mb']:.1f} MB (WAL {banco['wal_mb']:.1f} MB)")
+        for problema in dados['consultas_sem_indice']:
+            print(f"⚠ {problema['consulta']} sem índice: {' / '.join(problema['plano'])}")
+        if not dados['consultas_sem_indice']:
+            print("✓ Todas as consultas críticas usam índice.")
+        
+        if dados['limite_lento_ms'] is None:
+            print("\nMedições das instruções SQL desligadas (consulta_lenta_ms = None).")
+            return
+        totais = dados['totais']
+        print(f"\nDesde {dados['desde']}: {totais['chamadas']} instrução(ões) SQL, "
+              f"{totais['total_ms'] / 1000:.2f}s no banco, {totais['erros']} erro(s), "
+              f"{totais['lentas']} lenta(s) (acima de {dados['limite_lento_ms']} ms)")
+        
+        print("\nInstruções que mais consumiram tempo:")
+        for medidas in dados['instrucoes'][:10]:
+            print(f"{medidas['total_ms']:>10.1f} ms em {medidas['chamadas']}x | "
+                  f"p50 ≤ {medidas['p50_ms']:.2f} ms | p99 ≤ {medidas['p99_ms']:.2f} ms | "
+                  f"máx {medidas['max_ms']:.1f} ms | {medidas['linhas']} linha(s)")
+            print(f"    {medidas['sql'][:100]}")
+        
+        if dados['lentas']:
+            print("\nOperações lentas recentes:")
+            for ocorrencia in dados['lentas'][-5:]:
+                print(f"{ocorrencia['quando']} | {ocorrencia['ms']:.1f} ms | {ocorrencia['linhas']} linha(s) | "
+                      f"{ocorrencia['sql'][:80]}")
+                if ocorrencia['plano']:
+                    print(f"    plano: {' / '.join(ocorrencia['plano'])}")
+        if dados['arquivo_lentas']:
+            print(f"\nHistórico das operações lentas: {dados['arquivo_lentas']}")
+        
+        destino = self.get_input("\nSalvar as métricas em JSON (nome do arquivo) [Enter = não salvar]: ")
+        if destino:
+            try:
+                with open(destino, 'w', encoding='utf-8') as arquivo:
+                    json.dump(dados, arquivo, ensure_ascii=False, indent=2, default=str)
+            except OSError as erro:
+                print(f"\n✗ Erro ao salvar: {erro}")
+                return
+            print(f"✓ Métricas salvas em {destino}")
     
     def menu_principal(self):
         """Exibe o menu principal do sistema"""
@@ -458,41 +3499,365 @@ class FormularioDIU:
             print("SISTEMA DE FORMULÁRIO DIU")
             print("="*60)
             print("1. Novo Registro - Criar um novo registro de paciente")
-            print("2. Listar Registros - Ver os últimos registros salvos")
+            print("2. Listar Registros - Navegar pelos registros salvos")
             print("3. Buscar Paciente - Buscar registros por nome")
             print("4. Exportar para CSV - Exportar todos os dados para arquivo CSV")
-            print("5. Sair - Encerrar o sistema")
+            print("5. Exportar para Análise - Exportar em formato colunar (Parquet/NumPy)")
+            print("6. Importar Registros - Carregar registros de arquivo CSV/JSONL")
+            print("7. Revisões Agendadas - Pacientes com primeira revisão no período")
+            print("8. Estatísticas - Relatório mensal consolidado")
+            print("9. Possíveis Duplicados - Pacientes registradas mais de uma vez")
+            print("10. Backup - Copiar o banco de dados com segurança")
+            print("11. Diagnóstico - Tempo gasto no banco e operações lentas")
+            print("12. Sair - Encerrar o sistema")
             print("="*60)
             
-            opcao = self.get_input("Escolha uma opção (1-5): ")
+            opcao = self.get_input("Escolha uma opção (1-12): ")
             
             if opcao == '1':
                 self.novo_registro()
             elif opcao == '2':
-                self.listar_registros()
+                self.navegar_registros()
             elif opcao == '3':
                 self.buscar_paciente()
             elif opcao == '4':
                 self.exportar_csv()
             elif opcao == '5':
+                self.exportar_analise()
+            elif opcao == '6':
+                self.importar_arquivo()
+            elif opcao == '7':
+                self.lista_revisoes()
+            elif opcao == '8':
+                self.estatisticas()
+            elif opcao == '9':
+                self.duplicados()
+            elif opcao == '10':
+                self.fazer_backup()
+            elif opcao == '11':
+                self.diagnostico()
+            elif opcao == '12':
                 print("\nEncerrando o sistema...")
                 break
             else:
                 print("\n✗ Opção inválida! Tente novamente.")
     
     def __del__(self):
-        """Fecha a conexão com o banco de dados"""
+        """Fecha as conexões com o banco de dados"""
+        while not self.leitores.empty():
+            self.leitores.get_nowait().close()
         if self.conn:
             self.conn.close()
 
 
-def main():
+class ManipuladorHTTP(BaseHTTPRequestHandler):
+    """Atende as requisições HTTP/JSON do servidor local
+    
+    POST /registros          insere um registro (corpo JSON)
+    GET  /registros?nome=    busca por nome
+    GET  /registros/<id>     detalhes de um registro
+    GET  /exportar           CSV (filtros: inicio, fim, local, colunas)
+    GET  /diagnostico        medições das instruções SQL e operações lentas
+    """
+    
+    def log_message(self, formato, *args):
+        if not self.server.silencioso:
+            super().log_message(formato, *args)
+    
+    def responder_json(self, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+    
+    def responder_erro_banco(self, erro):
+        """Erro do SQLite: 503 se o banco está ocupado (o cliente pode repetir), 500 nos demais"""
+        self.log_error("Erro no banco: %s", erro)
+        if 'database is locked' in str(erro):
+            self.responder_json(503, {'erro': "Banco ocupado por outra gravação; tente novamente"})
+        else:
+            self.responder_json(500, {'erro': f"Erro no banco de dados: {erro}"})
+    
+    def do_GET(self):
+        app = self.server.app
+        url = urlparse(self.path)
+        parametros = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        partes = [parte for parte in url.path.split('/') if parte]
+        
+        try:
+            if partes == ['registros']:
+                registros = app.buscar_por_nome(parametros.get('nome', ''), int(parametros.get('limite', 100)))
+                self.responder_json(200, [dict(zip(COLUNAS_BUSCA, reg)) for reg in registros])
+            elif len(partes) == 2 and partes[0] == 'registros' and partes[1].isdigit():
+                registro = app.obter_registro(int(partes[1]))
+                if registro is None:
+                    self.responder_json(404, {'erro': f"Registro com ID {partes[1]} não encontrado"})
+                else:
+                    self.responder_json(200, registro)
+            elif partes == ['exportar']:
+                self.exportar(app, parametros)
+            elif partes == ['diagnostico']:
+                self.responder_json(200, app.resumo_diagnostico())
+            else:
+                self.responder_json(404, {'erro': "Recurso não encontrado"})
+        except ValueError as erro:
+            self.responder_json(400, {'erro': str(erro)})
+        except sqlite3.Error as erro:
+            self.responder_erro_banco(erro)
+    
+    def do_POST(self):
+        if urlparse(self.path).path.strip('/') != 'registros':
+            self.responder_json(404, {'erro': "Recurso não encontrado"})
+            return
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+            dados = json.loads(self.rfile.read(tamanho) or b'null')
+            if not isinstance(dados, dict):
+                raise ValueError("O registro deve ser um objeto JSON")
+            self.responder_json(201, self.server.app.inserir_verificando_duplicados(dados))
+        except ValueError as erro:
+            self.responder_json(400, {'erro': str(erro)})
+        except sqlite3.Error as erro:
+            self.responder_erro_banco(erro)
+    
+    def exportar(self, app, parametros):
+        """Envia o CSV à medida que os lotes são lidos, sem montar o arquivo em memória"""
+        colunas = parametros['colunas'].split(',') if parametros.get('colunas') else None
+        data_inicio = converter_valor(parametros['inicio'], "data") if parametros.get('inicio') else None
+        data_fim = converter_valor(parametros['fim'], "data") if parametros.get('fim') else None
+        invalid_columns = set(colunas or ()) - set(app.colunas_exportaveis())
+        if invalid_columns:
+            raise ValueError(f"Colunas inválidas: {invalid_columns}")
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        saida = io.TextIOWrapper(self.wfile, encoding='utf-8', newline='', write_through=True)
+        try:
+            app.escrever_csv(saida, colunas, data_inicio, data_fim, parametros.get('local'))
+        except (ValueError, sqlite3.Error) as erro:
+            # O cabeçalho 200 já foi enviado: só resta interromper o CSV
+            self.log_error("Exportação interrompida: %s", erro)
+        finally:
+            saida.detach()
+
+
+class ServidorDIU(ThreadingHTTPServer):
+    """Servidor HTTP/JSON local para vários terminais usarem um mesmo banco
+    
+    As requisições são atendidas por um pool fixo de threads. Leituras usam
+    o pool de conexões somente leitura; gravações passam pela conexão única
+    de escrita, uma de cada vez.
+    """
+    
+    def __init__(self, endereco, app, threads=8, silencioso=False):
+        super().__init__(endereco, ManipuladorHTTP)
+        self.app = app
+        self.silencioso = silencioso
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+    
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def imprimir_json(dados):
+    """Imprime o resultado de um comando em JSON"""
+    print(json.dumps(dados, ensure_ascii=False, indent=2, default=str))
+
+
+def executar_comando(args):
+    """Executa um subcomando da linha de comando e retorna o resultado"""
+    # Comandos sobre arquivos de backup, sem abrir o banco (que pode estar danificado)
+    if args.comando == 'verificar':
+        return verificar_banco(args.arquivo)
+    if args.comando == 'restaurar':
+        return restaurar_backup(args.arquivo, args.db)
+    
+    app = FormularioDIU(args.db)
+    
+    if args.comando == 'inserir':
+        if args.arquivo:
+            with open(args.arquivo, encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        else:
+            dados = json.load(sys.stdin)
+        if not isinstance(dados, dict):
+            raise ValueError("O registro deve ser um objeto JSON")
+        return app.inserir_verificando_duplicados(dados)
+    
+    if args.comando == 'buscar':
+        return [dict(zip(COLUNAS_BUSCA, reg)) for reg in app.buscar_por_nome(args.nome, args.limite)]
+    
+    if args.comando == 'detalhes':
+        registro = app.obter_registro(args.id)
+        if registro is None:
+            raise ValueError(f"Registro com ID {args.id} não encontrado")
+        return registro
+    
+    if args.comando == 'exportar':
+        colunas = args.colunas.split(',') if args.colunas else None
+        data_inicio = converter_valor(args.inicio, "data") if args.inicio else None
+        data_fim = converter_valor(args.fim, "data") if args.fim else None
+        if args.formato == 'colunar':
+            descartados = {}
+            total = app.exportar_colunar(args.arquivo, colunas, data_inicio, data_fim, args.local,
+                                         descartados=descartados)
+            return {'registros': total, 'arquivo': args.arquivo, 'valores_descartados': descartados}
+        else:
+            total = app.exportar_registros(args.arquivo, colunas, data_inicio, data_fim,
+                                           args.local, args.gzip)
+        return {'registros': total, 'arquivo': args.arquivo}
+    
+    if args.comando == 'importar':
+        return app.importar_registros(args.arquivo, args.lote, codificacao=args.codificacao)
+    
+    if args.comando == 'estatisticas':
+        return app.relatorio_estatisticas(args.inicio, args.fim)
+    
+    if args.comando == 'servidor':
+        servidor = ServidorDIU((args.host, args.porta), app, args.threads)
+        print(f"Servidor em http://{args.host}:{args.porta} (Ctrl+C para encerrar)", file=sys.stderr)
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+        return {'servidor': 'encerrado'}
+    
+    if args.comando == 'revisoes':
+        data_inicio = converter_valor(args.inicio, "data")
+        data_fim = converter_valor(args.fim, "data")
+        if args.novas:
+            registros = app.revisoes_novas(data_inicio, data_fim, args.novas)
+        else:
+            registros = app.revisoes_pendentes(data_inicio, data_fim, limite=args.limite)
+        return [dict(zip(COLUNAS_REVISAO, reg)) for reg in registros]
+    
+    if args.comando == 'duplicados':
+        return app.agrupar_duplicados(args.limiar)
+    
+    if args.comando == 'cifrar':
+        return {'registros_cifrados': app.ativar_cifragem(os.environ.get('FORMULARIO_DIU_CHAVE'))}
+    
+    if args.comando == 'backup':
+        return app.backup(args.destino, args.paginas, args.pausa)
+    
+    if args.comando == 'alteracoes':
+        return app.exportar_alteracoes(args.destino, args.desde)
+    
+    if args.comando == 'aplicar':
+        return app.aplicar_alteracoes(args.arquivo)
+
+
+def criar_parser():
+    """Cria o parser da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Sistema de Formulário DIU. Sem subcomando, abre o menu interativo; "
+                    "com subcomando, executa sem interação e responde em JSON."
+    )
+    parser.add_argument('--db', default="formulario_diu.db", help="Arquivo do banco de dados")
+    subparsers = parser.add_subparsers(dest='comando')
+    
+    parser_inserir = subparsers.add_parser('inserir', help="Insere um registro a partir de um objeto JSON")
+    parser_inserir.add_argument('arquivo', nargs='?', help="Arquivo JSON (padrão: entrada padrão)")
+    
+    parser_buscar = subparsers.add_parser('buscar', help="Busca pacientes por nome")
+    parser_buscar.add_argument('nome')
+    parser_buscar.add_argument('--limite', type=int, default=100)
+    
+    parser_detalhes = subparsers.add_parser('detalhes', help="Mostra todos os campos de um registro")
+    parser_detalhes.add_argument('id', type=int)
+    
+    parser_exportar = subparsers.add_parser('exportar', help="Exporta registros para arquivo")
+    parser_exportar.add_argument('arquivo')
+    parser_exportar.add_argument('--formato', choices=['csv', 'colunar'], default='csv')
+    parser_exportar.add_argument('--colunas', help="Colunas separadas por vírgula")
+    parser_exportar.add_argument('--inicio', help="Inserções a partir de (DD/MM/AAAA)")
+    parser_exportar.add_argument('--fim', help="Inserções até (DD/MM/AAAA)")
+    parser_exportar.add_argument('--local', help="Local de atendimento")
+    parser_exportar.add_argument('--gzip', action='store_true', help="Compacta o CSV com gzip")
+    
+    parser_importar = subparsers.add_parser('importar', help="Importa registros de arquivo CSV/JSONL")
+    parser_importar.add_argument('arquivo')
+    parser_importar.add_argument('--lote', type=int, default=1000)
+    parser_importar.add_argument('--codificacao', default='utf-8-sig',
+                                 help="Codificação do arquivo (padrão: utf-8; por exemplo latin-1)")
+    
+    parser_estatisticas = subparsers.add_parser('estatisticas', help="Relatório mensal consolidado")
+    parser_estatisticas.add_argument('--inicio', help="Mês inicial (AAAA-MM)")
+    parser_estatisticas.add_argument('--fim', help="Mês final (AAAA-MM)")
+    
+    parser_revisoes = subparsers.add_parser('revisoes', help="Pacientes com primeira revisão no período")
+    parser_revisoes.add_argument('inicio', help="DD/MM/AAAA")
+    parser_revisoes.add_argument('fim', help="DD/MM/AAAA")
+    parser_revisoes.add_argument('--limite', type=int, default=50)
+    parser_revisoes.add_argument('--novas', metavar='LISTA',
+                                 help="Apenas registros novos desde a última execução desta lista")
+    
+    parser_duplicados = subparsers.add_parser('duplicados', help="Grupos de registros da mesma paciente")
+    parser_duplicados.add_argument('--limiar', type=float, default=0.85,
+                                   help="Semelhança mínima entre nomes (0 a 1)")
+    
+    subparsers.add_parser('cifrar', help="Ativa a cifragem dos campos identificadores "
+                                         "(senha em FORMULARIO_DIU_CHAVE)")
+    
+    parser_backup = subparsers.add_parser('backup', help="Backup online do banco, verificado")
+    parser_backup.add_argument('destino')
+    parser_backup.add_argument('--paginas', type=int, default=256, help="Páginas copiadas por passo")
+    parser_backup.add_argument('--pausa', type=float, default=0.005, help="Segundos de espera entre os passos")
+    
+    parser_verificar = subparsers.add_parser('verificar', help="Confere a integridade de um backup")
+    parser_verificar.add_argument('arquivo')
+    
+    parser_restaurar = subparsers.add_parser('restaurar', help="Restaura um backup sobre o banco (--db)")
+    parser_restaurar.add_argument('arquivo')
+    
+    parser_alteracoes = subparsers.add_parser('alteracoes', help="Exporta as alterações para replicação")
+    parser_alteracoes.add_argument('destino', help="Arquivo JSONL (.gz para compactar)")
+    parser_alteracoes.add_argument('--desde', type=int, default=0,
+                                   help="Último número de alteração já enviado (campo 'ate' do arquivo anterior)")
+    
+    parser_aplicar = subparsers.add_parser('aplicar', help="Aplica um arquivo de alterações de outro banco")
+    parser_aplicar.add_argument('arquivo')
+    
+    parser_servidor = subparsers.add_parser('servidor', help="Servidor HTTP/JSON local para vários terminais")
+    parser_servidor.add_argument('--host', default='127.0.0.1')
+    parser_servidor.add_argument('--porta', type=int, default=8000)
+    parser_servidor.add_argument('--threads', type=int, default=8)
+    
+    return parser
+
+
+def main(argv=None):
     """Função principal"""
+    args = criar_parser().parse_args(argv)
+    
+    if args.comando:
+        try:
+            imprimir_json(executar_comando(args))
+        except (ValueError, OSError, sqlite3.Error, LookupError) as erro:
+            print(json.dumps({'erro': str(erro)}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(1)
+        return
+    
     print("="*60)
     print("BEM-VINDO AO SISTEMA DE FORMULÁRIO DIU")
     print("="*60)
     
-    app = FormularioDIU()
+    try:
+        app = FormularioDIU(args.db)
+    except ValueError as erro:
+        print(f"\n✗ Erro: {erro}")
+        sys.exit(1)
     app.menu_principal()
     
     print("\nObrigado por usar o Sistema de Formulário DIU!")
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formulario_diu import FormularioDIU  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Banco novo, sem cifragem, em um diretório temporário"""
+    app = FormularioDIU(str(tmp_path / 'teste.db'), chave='')
+    yield app
+    app.conn.close()
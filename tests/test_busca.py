@@ -0,0 +1,20 @@
+from formulario_diu import RegistroPaciente
+
+
+def test_busca_limitada_fica_com_os_mais_recentes(app):
+    for nome in ("Maria Souza", "Ana Maria", "Mariana Lima", "Marta Costa", "Bia Silva"):
+        app.inserir_registro(RegistroPaciente(nome_completo=nome))
+    assert [reg[1] for reg in app.buscar_por_nome("mar")] == ["Ana Maria", "Maria Souza", "Mariana Lima",
+                                                              "Marta Costa"]
+    assert [reg[1] for reg in app.buscar_por_nome("mar", 2)] == ["Mariana Lima", "Marta Costa"]
+
+
+def test_menu_avisa_quando_a_busca_e_limitada(app, capsys):
+    for i in range(101):
+        app.inserir_registro(RegistroPaciente(nome_completo=f"Paciente {i}"))
+    respostas = iter(["paciente", "n"])
+    app.entrada = lambda prompt='': next(respostas)
+    app.buscar_paciente()
+    saida = capsys.readouterr().out
+    assert "Mais de 100 pacientes encontrados" in saida
+    assert "Nome: Paciente 0\n" not in saida and "Nome: Paciente 100\n" in saida
@@ -0,0 +1,142 @@
+import pytest
+
+import formulario_diu
+from formulario_diu import CifraCampos, FormularioDIU, RegistroPaciente
+
+pytest.importorskip('cryptography')
+
+
+@pytest.fixture
+def app_cifrado(app):
+    app.inserir_registro(RegistroPaciente(nome_completo="Maria da Conceição", cpf='123.456.789-09',
+                                          telefone='(11) 99999-0000', data_nascimento='1990-05-01'))
+    app.ativar_cifragem('senha de teste')
+    app.inserir_registro(RegistroPaciente(nome_completo="Ana Lima", cpf='987.654.321-00',
+                                          endereco='Rua A, 10', hiv_aids='n'))
+    return app
+
+
+def test_ida_e_volta(app_cifrado):
+    convertido, novo = app_cifrado.obter_paciente(1), app_cifrado.obter_paciente(2)
+    assert (convertido.nome_completo, convertido.cpf, convertido.sus) == ("Maria da Conceição",
+                                                                         '123.456.789-09', None)
+    assert (novo.nome_completo, novo.endereco, novo.hiv_aids) == ("Ana Lima", 'Rua A, 10', 'n')
+    
+    # Nas colunas só fica OCULTO; os valores estão em dados_cifrados
+    linhas = app_cifrado.conn.execute("SELECT nome_completo, cpf, telefone, dados_cifrados FROM pacientes")
+    for nome, cpf, telefone, dados in linhas:
+        assert (nome, cpf, telefone) == (CifraCampos.OCULTO,) * 3
+        assert b'Maria' not in dados and b'Ana' not in dados
+    
+    assert [reg[0] for reg in app_cifrado.buscar_por_nome("conce")] == [1]
+    assert [linha[0] for linha in app_cifrado.possiveis_duplicados({'cpf': '98765432100'})] == [2]
+    lote, = app_cifrado.iterar_lotes(['nome_completo', 'cpf', 'data_nascimento'])
+    assert lote == [("Maria da Conceição", '123.456.789-09', '1990-05-01'), ("Ana Lima", '987.654.321-00', None)]
+
+
+def test_valores_com_separador(app_cifrado):
+    id_registro = app_cifrado.inserir_registro(RegistroPaciente(nome_completo="Bia\x1fSouza", telefone='1\x1e2'))
+    registro = app_cifrado.obter_paciente(id_registro)
+    assert (registro.nome_completo, registro.telefone, registro.cpf) == ("Bia\x1fSouza", '1\x1e2', None)
+
+
+def test_alteracao_e_recusada(app_cifrado):
+    dados, = app_cifrado.conn.execute("SELECT dados_cifrados FROM pacientes WHERE id = 2").fetchone()
+    alterado = dados[:-1] + bytes([dados[-1] ^ 1])
+    app_cifrado.conn.execute("UPDATE pacientes SET dados_cifrados = ? WHERE id = 2", (alterado,))
+    app_cifrado.conn.commit()
+    with pytest.raises(ValueError, match="valor cifrado inválido"):
+        app_cifrado.obter_paciente(2)
+    
+    cifra = app_cifrado.cifra
+    with pytest.raises(ValueError):
+        cifra.decifrar_linha(CifraCampos.VERSAO_JSON + dados[1:])
+
+
+def test_valor_de_outra_coluna_e_recusado(app_cifrado):
+    cifra = app_cifrado.cifra
+    valor = cifra.cifrar('cpf', '12345678909')
+    assert cifra.decifrar('cpf', valor) == '12345678909'
+    with pytest.raises(ValueError):
+        cifra.decifrar('telefone', valor)
+    
+    dados = cifra.cifrar_linha(['a', 'b'], ('nome_completo', 'cpf'))
+    with pytest.raises(ValueError):
+        cifra.decifrar_linha(dados, ('cpf', 'nome_completo'))
+
+
+def test_nonces_unicos():
+    cifra = CifraCampos(bytes(32))
+    valores = [cifra.cifrar_linha(['Maria', None]) for _ in range(1000)]
+    nonces = {valor[1:1 + CifraCampos.TAMANHO_NONCE] for valor in valores}
+    assert len(nonces) == len(set(valores)) == 1000
+
+
+def test_chave_incorreta(app_cifrado, tmp_path):
+    app_cifrado.conn.close()
+    with pytest.raises(ValueError, match="Senha de cifragem incorreta"):
+        FormularioDIU(str(tmp_path / 'teste.db'), chave='outra senha')
+    with pytest.raises(ValueError, match="informe a senha"):
+        FormularioDIU(str(tmp_path / 'teste.db'), chave='')
+    
+    dados = CifraCampos(bytes(32)).cifrar_linha(['Maria'], ('nome_completo',))
+    with pytest.raises(ValueError):
+        CifraCampos(bytes(31) + b'\x01').decifrar_linha(dados, ('nome_completo',))
+    
+    app = FormularioDIU(str(tmp_path / 'teste.db'), chave='senha de teste')
+    assert app.obter_paciente(1).cpf == '123.456.789-09'
+    app.conn.close()
+
+
+def test_campo_passa_a_ser_cifrado(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'teste.db')
+    ordem = tuple(coluna for coluna in formulario_diu.ORDEM_CIFRADA if coluna != 'endereco')
+    with monkeypatch.context() as m:
+        m.setattr(formulario_diu, 'ORDEM_CIFRADA', ordem)
+        m.setattr(formulario_diu, 'COLUNAS_CIFRADAS', frozenset(ordem))
+        app = FormularioDIU(caminho, chave='senha de teste')
+        app.ativar_cifragem('senha de teste')
+        app.inserir_registro(RegistroPaciente(nome_completo="Ana Lima", endereco='Rua A, 10'))
+        app.conn.close()
+    
+    # Com endereco de volta à lista, a abertura regrava o registro
+    app = FormularioDIU(caminho, chave='senha de teste')
+    registro = app.obter_paciente(1)
+    assert (registro.nome_completo, registro.endereco) == ("Ana Lima", 'Rua A, 10')
+    endereco, colunas = app.conn.execute("SELECT endereco, colunas FROM pacientes, cifragem").fetchone()
+    assert endereco == CifraCampos.OCULTO
+    assert colunas == ','.join(formulario_diu.ORDEM_CIFRADA)
+    app.conn.close()
+
+
+def test_busca_por_nome_curto(app_cifrado):
+    app_cifrado.inserir_registro(RegistroPaciente(nome_completo="Lu Li"))
+    app_cifrado.inserir_registro(RegistroPaciente(nome_completo="Lu Li Souza"))
+    assert [reg[1] for reg in app_cifrado.buscar_por_nome("Al")] == []
+    assert [reg[1] for reg in app_cifrado.buscar_por_nome("lu li")] == ["Lu Li"]
+    assert [reg[1] for reg in app_cifrado.buscar_por_nome("Lu Sou")] == ["Lu Li Souza"]
+
+
+def test_menu_de_busca_pergunta_de_novo(app_cifrado, monkeypatch, capsys):
+    respostas = iter(["Ana", "Ana", "n"])
+    app_cifrado.entrada = lambda prompt='': next(respostas)
+    chamadas = []
+    
+    def buscar(nome, limite=100):
+        chamadas.append(nome)
+        if len(chamadas) == 1:
+            raise ValueError("dados_cifrados: valor cifrado inválido ou chave incorreta")
+        return [(2, "Ana Lima", None, None, None, None)]
+    
+    monkeypatch.setattr(app_cifrado, 'buscar_por_nome', buscar)
+    app_cifrado.buscar_paciente()
+    assert chamadas == ["Ana", "Ana"]
+    assert "valor cifrado inválido" in capsys.readouterr().out
+
+
+def test_colunas_internas_nao_sao_exportadas(app_cifrado, tmp_path):
+    for coluna in ('dados_cifrados', 'nome_normalizado', 'cpf_normalizado'):
+        with pytest.raises(ValueError, match="Colunas inválidas"):
+            next(app_cifrado.iterar_lotes(['id', coluna]))
+        with pytest.raises(ValueError, match="Colunas inválidas"):
+            app_cifrado.exportar_registros(str(tmp_path / 'exportacao.csv'), colunas=['id', coluna])
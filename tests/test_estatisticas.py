@@ -0,0 +1,63 @@
+import formulario_diu
+from formulario_diu import FormularioDIU, RegistroPaciente
+
+
+def popular(app):
+    for i, (diu, insercao) in enumerate([('TCU', '2024-01-10'), ('Levonorgestrel', '2024-01-20'),
+                                         ('TCU', '2024-02-05')]):
+        app.inserir_registro(RegistroPaciente(nome_completo=f"Paciente {i}", diu_escolhido=diu,
+                                              data_insercao=insercao, motivo_contracepcao=1,
+                                              insercao_resultado='fácil', dor_nota=3))
+
+
+def test_resumo_consistente_com_recalculo(app):
+    popular(app)
+    app.conn.execute("UPDATE pacientes SET diu_escolhido = 'Levonorgestrel' WHERE id = 1")
+    app.conn.execute("DELETE FROM pacientes WHERE id = 2")
+    app.conn.commit()
+    assert app.verificar_estatisticas() == []
+
+
+def test_linha_ausente_no_resumo_e_reportada(app):
+    popular(app)
+    app.conn.execute("DELETE FROM estatisticas_mensais WHERE dimensao = 'diu_escolhido'")
+    app.conn.commit()
+    divergentes = app.verificar_estatisticas()
+    assert ('2024-01', 'diu_escolhido', 'TCU') in divergentes
+    assert ('2024-02', 'diu_escolhido', 'TCU') in divergentes
+    
+    app.reconstruir_estatisticas()
+    assert app.verificar_estatisticas() == []
+
+
+def test_contagem_alterada_e_reportada(app):
+    popular(app)
+    app.conn.execute("UPDATE estatisticas_mensais SET total = total + 1 WHERE dimensao = 'total'")
+    app.conn.commit()
+    assert ('2024-01', 'total', '') in app.verificar_estatisticas()
+
+
+def test_motivo_novo_recria_triggers(tmp_path, monkeypatch):
+    # Banco criado quando motivo_tpm ainda não era uma dimensão das estatísticas
+    caminho = str(tmp_path / 'teste.db')
+    with monkeypatch.context() as m:
+        m.setattr(formulario_diu, 'DIMENSOES_ESTATISTICAS',
+                  [d for d in formulario_diu.DIMENSOES_ESTATISTICAS if d[1] != "'motivo_tpm'"])
+        m.setattr(formulario_diu, 'COLUNAS_ESTATISTICAS',
+                  [c for c in formulario_diu.COLUNAS_ESTATISTICAS if c != 'motivo_tpm'])
+        app = FormularioDIU(caminho, chave='')
+        app.inserir_registro(RegistroPaciente(nome_completo="Ana", data_insercao='2024-03-01', motivo_tpm=1))
+        app.conn.close()
+    
+    app = FormularioDIU(caminho, chave='')
+    gatilhos = dict(app.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                                     "AND name LIKE 'estatisticas_%'"))
+    assert gatilhos == formulario_diu.sql_gatilhos_estatisticas()
+    assert app.verificar_estatisticas() == []
+    
+    app.conn.execute("UPDATE pacientes SET motivo_tpm = 0 WHERE id = 1")
+    app.conn.commit()
+    assert app.verificar_estatisticas() == []
+    assert not app.conn.execute("SELECT 1 FROM estatisticas_mensais WHERE valor = 'motivo_tpm' "
+                                "AND total > 0").fetchall()
+    app.conn.close()
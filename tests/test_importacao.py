@@ -0,0 +1,119 @@
+import csv
+import json
+import threading
+
+import pytest
+
+from formulario_diu import FormularioDIU, RegistroPaciente
+
+
+def popular(app):
+    app.inserir_registro(RegistroPaciente(nome_completo="Maria da Conceição", data_nascimento='1990-05-01',
+                                          cpf='123.456.789-09', motivo_contracepcao=1, motivo_mioma=1,
+                                          uso_mac='s', uso_mac_qual="Pílula", peso_kg=61.5,
+                                          diu_escolhido='TCU', data_insercao='2024-01-10', dor_nota=3))
+    app.inserir_registro(RegistroPaciente(nome_completo="Ana, \"Lima\"", endereco="Rua A\nCasa 2",
+                                          teve_ist='n', gesta=2, data_insercao='2024-02-05'))
+
+
+def registros(app):
+    return [dict(registro, id=None) for registro in map(app.obter_paciente, (1, 2))]
+
+
+def test_importa_a_propria_exportacao(app, tmp_path):
+    popular(app)
+    assert app.exportar_registros(str(tmp_path / 'exportacao.csv')) == 2
+    
+    copia = FormularioDIU(str(tmp_path / 'copia.db'), chave='')
+    resultado = copia.importar_registros(str(tmp_path / 'exportacao.csv'))
+    assert (resultado['inseridos'], resultado['rejeitados']) == (2, 0)
+    assert registros(copia) == registros(app)
+    copia.conn.close()
+
+
+def test_data_registro_validada_na_importacao(app, tmp_path):
+    arquivo = tmp_path / 'fichas.csv'
+    arquivo.write_text("nome_completo,data_registro\n"
+                       "Ana,01/02/2019\n"
+                       "Bia,2019-02-01 08:30:00\n"
+                       "Carla,ontem\n", encoding='utf-8')
+    resultado = app.importar_registros(str(arquivo))
+    assert (resultado['inseridos'], resultado['rejeitados']) == (2, 1)
+    assert [app.obter_paciente(i).data_registro for i in (1, 2)] == ['2019-02-01 00:00:00', '2019-02-01 08:30:00']
+
+
+def test_exportacao_colunar_tolera_data_registro_antiga(app, tmp_path):
+    pytest.importorskip('numpy')
+    popular(app)
+    app.conn.execute("UPDATE pacientes SET data_registro = '01/02/2019' WHERE id = 1")
+    app.conn.commit()
+    assert app.exportar_colunar(str(tmp_path / 'analise'), colunas=['id', 'data_registro']) == 2
+
+
+def test_jsonl_aceita_booleanos(app, tmp_path):
+    arquivo = tmp_path / 'fichas.jsonl'
+    arquivo.write_text(json.dumps({'nome_completo': "Ana", 'motivo_mioma': True, 'motivo_tpm': False,
+                                   'teve_ist': False, 'uso_mac': True, 'uso_mac_qual': "DIU"}) + "\n"
+                       + json.dumps({'nome_completo': "Bia", 'gesta': True}) + "\n", encoding='utf-8')
+    resultado = app.importar_registros(str(arquivo))
+    assert (resultado['inseridos'], resultado['rejeitados']) == (1, 1)
+    registro = app.obter_paciente(1)
+    assert (registro.motivo_mioma, registro.motivo_tpm, registro.teve_ist, registro.uso_mac) == (1, 0, 'n', 's')
+
+
+def test_importacao_espera_a_trava_de_escrita(app, tmp_path):
+    arquivo = tmp_path / 'fichas.csv'
+    arquivo.write_text("nome_completo\nAna\n", encoding='utf-8')
+    with app.trava_escrita:
+        importacao = threading.Thread(target=app.importar_registros, args=(str(arquivo),))
+        importacao.start()
+        importacao.join(0.2)
+        assert importacao.is_alive()
+    importacao.join()
+    assert app.obter_paciente(1).nome_completo == "Ana"
+
+
+def test_linha_jsonl_invalida_e_rejeitada(app, tmp_path):
+    arquivo = tmp_path / 'fichas.jsonl'
+    arquivo.write_text('{"nome_completo": "Ana"}\n'
+                       '\n'
+                       '{"nome_completo": "Bia",\n'
+                       '{"nome_completo": "Carla"}\n', encoding='utf-8')
+    resultado = app.importar_registros(str(arquivo), tamanho_lote=1)
+    assert (resultado['inseridos'], resultado['rejeitados']) == (2, 1)
+    with open(resultado['arquivo_erros'], encoding='utf-8') as erros:
+        _, (linha, _, registro) = list(csv.reader(erros))
+    assert (linha, registro) == ('3', '{"nome_completo": "Bia",')
+
+
+def test_codificacao_errada_e_recusada_antes_de_gravar(app, tmp_path):
+    arquivo = tmp_path / 'fichas.csv'
+    arquivo.write_bytes("nome_completo\nAna\n".encode('utf-8') + "Conceição\n".encode('latin-1'))
+    with pytest.raises(ValueError, match="latin-1"):
+        app.importar_registros(str(arquivo), tamanho_lote=1)
+    assert app.conn.execute("SELECT COUNT(*) FROM pacientes").fetchone() == (0,)
+    
+    resultado = app.importar_registros(str(arquivo), codificacao='latin-1')
+    assert resultado['inseridos'] == 2
+    assert app.obter_paciente(2).nome_completo == "Conceição"
+
+
+def test_menu_de_importacao_mostra_o_erro(app, tmp_path, capsys):
+    arquivo = tmp_path / 'fichas.csv'
+    arquivo.write_bytes("nome_completo\nConceição\n".encode('latin-1'))
+    respostas = iter([str(arquivo), ""])
+    app.entrada = lambda prompt='': next(respostas)
+    app.importar_arquivo()
+    assert "✗ Erro: O arquivo não está na codificação" in capsys.readouterr().out
+
+
+def test_exportacao_colunar_tolera_numeros_antigos(app, tmp_path):
+    pytest.importorskip('numpy')
+    popular(app)
+    app.conn.execute("UPDATE pacientes SET gesta = 'dois', peso_kg = '61,5', data_insercao = 20240110 WHERE id = 1")
+    app.conn.execute("UPDATE pacientes SET peso_kg = 'n/d' WHERE id = 2")
+    app.conn.commit()
+    descartados = {}
+    assert app.exportar_colunar(str(tmp_path / 'analise'), colunas=['id', 'gesta', 'peso_kg', 'data_insercao'],
+                                descartados=descartados) == 2
+    assert descartados == {'gesta': 1, 'peso_kg': 1, 'data_insercao': 1}
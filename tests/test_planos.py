@@ -0,0 +1,16 @@
+from formulario_diu import CONSULTAS_CRITICAS, RegistroPaciente
+
+
+def test_consultas_criticas_usam_indice(app):
+    for i in range(200):
+        app.inserir_registro(RegistroPaciente(nome_completo=f"Paciente {i}", local_atendimento='UBS Centro'))
+    app.conn.execute("ANALYZE")
+    assert app.verificar_planos_consulta() == []
+
+
+def test_verificacao_detecta_varredura(app, monkeypatch):
+    monkeypatch.setattr('formulario_diu.CONSULTAS_CRITICAS', CONSULTAS_CRITICAS + [
+        ("Sem índice", "SELECT id FROM pacientes WHERE profissao = ?", ('',)),
+    ])
+    problemas = app.verificar_planos_consulta()
+    assert [descricao for descricao, _ in problemas] == ["Sem índice"]
@@ -0,0 +1,56 @@
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from formulario_diu import ServidorDIU
+
+
+@pytest.fixture
+def servidor(app):
+    servidor = ServidorDIU(('127.0.0.1', 0), app, threads=2, silencioso=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def requisitar(servidor, caminho, dados=None):
+    url = f"http://127.0.0.1:{servidor.server_address[1]}{caminho}"
+    corpo = json.dumps(dados).encode('utf-8') if dados is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=corpo)) as resposta:
+            return resposta.status, json.loads(resposta.read())
+    except urllib.error.HTTPError as erro:
+        return erro.code, json.loads(erro.read())
+
+
+def test_erros_do_banco_viram_json(servidor, monkeypatch):
+    def falhar(mensagem):
+        def funcao(*args, **kwargs):
+            raise sqlite3.OperationalError(mensagem)
+        return funcao
+    
+    app = servidor.app
+    monkeypatch.setattr(app, 'buscar_por_nome', falhar("database is locked"))
+    status, corpo = requisitar(servidor, '/registros?nome=Ana')
+    assert status == 503 and 'ocupado' in corpo['erro']
+    
+    monkeypatch.setattr(app, 'obter_registro', falhar("disk I/O error"))
+    status, corpo = requisitar(servidor, '/registros/1')
+    assert status == 500 and 'disk I/O error' in corpo['erro']
+    
+    monkeypatch.setattr(app, 'inserir_verificando_duplicados', falhar("database is locked"))
+    status, corpo = requisitar(servidor, '/registros', {'nome_completo': "Ana"})
+    assert status == 503
+    
+    status, corpo = requisitar(servidor, '/registros', [])
+    assert status == 400
+
+
+def test_exportar_recusa_colunas_internas(servidor):
+    status, corpo = requisitar(servidor, '/exportar?colunas=id,dados_cifrados')
+    assert status == 400 and 'dados_cifrados' in corpo['erro']